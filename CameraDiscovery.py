@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+import glob
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import cv2  # 导入OpenCV库，用于探测摄像头和视频流
+
+# 额外的视频源配置文件，每行一个RTSP地址或视频文件路径，发现时一并探测
+CAMERA_SOURCES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "camera_sources.txt")
+
+
+def camera_backend():
+    """
+    获取当前平台的摄像头采集后端：Windows 使用 DirectShow，Linux 使用 V4L2，其余平台由OpenCV自动选择。
+    """
+    if sys.platform.startswith("win"):
+        return cv2.CAP_DSHOW
+    if sys.platform.startswith("linux"):
+        return cv2.CAP_V4L2
+    return cv2.CAP_ANY
+
+
+def list_v4l2_devices():
+    """
+    列出 /dev/video* 中的视频采集设备编号（不打开设备）。
+
+    Returns:
+        list: 设备编号列表；非Linux平台返回空列表。
+
+    同一摄像头的元数据节点（sysfs 中 index 不为0）会被排除。
+    """
+    indices = []
+    for path in glob.glob("/dev/video*"):
+        match = re.fullmatch(r"/dev/video(\d+)", path)
+        if not match:
+            continue
+        index_file = "/sys/class/video4linux/video%s/index" % match.group(1)
+        try:
+            with open(index_file, 'r') as file:
+                if file.read().strip() != "0":
+                    continue
+        except OSError:
+            pass
+        indices.append(int(match.group(1)))
+    return sorted(indices)
+
+
+def load_configured_sources(path=CAMERA_SOURCES_FILE):
+    """
+    读取配置文件中的额外视频源，忽略空行和以 # 开头的注释。
+
+    Returns:
+        list: 视频源字符串列表。
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as file:
+        return [line.strip() for line in file if line.strip() and not line.strip().startswith("#")]
+
+
+def probe_source(source, backend=cv2.CAP_ANY, timeout=2.0):
+    """
+    探测视频源能否打开并读到画面。
+
+    Args:
+        source (int|str): 摄像头编号、RTSP地址或视频文件路径。
+        backend (int): 摄像头编号使用的采集后端。
+        timeout (float): 打开和读取的超时时间（秒），网络视频流由OpenCV自身控制超时。
+
+    Returns:
+        bool: 能读到画面时返回 True。无论成功与否都会释放采集对象。
+    """
+    cap = None
+    try:
+        if isinstance(source, int):
+            cap = cv2.VideoCapture(source, backend)
+        else:
+            ms = int(timeout * 1000)
+            cap = cv2.VideoCapture(source, cv2.CAP_ANY,
+                                   [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, ms, cv2.CAP_PROP_READ_TIMEOUT_MSEC, ms])
+        return cap.isOpened() and cap.grab()
+    except cv2.error:
+        return False
+    finally:
+        if cap is not None:
+            cap.release()
+
+
+class CameraDiscovery:
+    def __init__(self, sources=None, ttl=60.0, timeout=2.0, max_test_cameras=3, max_workers=8):
+        """
+        并行探测摄像头和视频源，结果带有效期缓存并在后台刷新。
+
+        Args:
+            sources (list): 额外探测的RTSP地址或视频文件路径，默认读取 CAMERA_SOURCES_FILE。
+            ttl (float): 探测结果的有效期（秒），过期后在后台重新探测。
+            timeout (float): 单个视频源的探测超时（秒），超时视为不可用。
+            max_test_cameras (int): 无法列出设备节点时（如Windows）探测的摄像头编号数量。
+            max_workers (int): 并行探测的线程数。
+
+        get 总是立即返回：已有结果时返回缓存，否则返回未经打开验证的设备列表，
+        探测在后台线程中完成，页面加载不会等待设备探测。
+        正在采集的视频源（见 acquire）不会被重新打开探测，直接视为可用。
+        """
+        self.sources = sources
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_test_cameras = max_test_cameras
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._cameras = None  # 最近一次探测结果
+        self._updated = 0.0
+        self._refreshing = None  # 正在运行的后台探测线程
+        self._in_use = {}  # 正在采集的视频源名称 -> 使用次数
+
+    def candidates(self):
+        """
+        需要探测的视频源：Linux 上为 /dev/video* 设备，其他平台为前若干个摄像头编号，另加配置的视频源。
+        """
+        indices = list_v4l2_devices() if sys.platform.startswith("linux") else list(range(self.max_test_cameras))
+        sources = self.sources if self.sources is not None else load_configured_sources()
+        return indices + [s for s in sources if s not in indices]
+
+    def probe(self):
+        """
+        并行探测所有候选视频源，返回可用的视频源名称。
+
+        Returns:
+            list: 可用视频源的名称（摄像头编号或视频源字符串），顺序与候选列表一致。
+        """
+        candidates = self.candidates()
+        if not candidates:
+            return []
+        with self._lock:
+            busy = set(self._in_use)
+        backend = camera_backend()
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(candidates)))
+        try:
+            # 正在采集的设备通常无法被再次打开，不探测而直接视为可用，避免它从列表中消失
+            futures = [None if str(source) in busy else executor.submit(probe_source, source, backend, self.timeout)
+                       for source in candidates]
+            deadline = time.time() + self.timeout
+            available = []
+            for source, future in zip(candidates, futures):
+                try:
+                    if future is None or future.result(timeout=max(0.0, deadline - time.time())):
+                        available.append(str(source))
+                except TimeoutError:
+                    pass  # 超时的探测线程结束后会自行释放采集对象
+            return available
+        finally:
+            executor.shutdown(wait=False)
+
+    def acquire(self, *sources):
+        """
+        标记视频源开始采集，采集期间重新探测时不打开这些视频源。
+
+        Args:
+            *sources: 视频源名称（与 get 返回的名称相同）。
+        """
+        with self._lock:
+            for source in map(str, sources):
+                self._in_use[source] = self._in_use.get(source, 0) + 1
+
+    def release(self, *sources):
+        """
+        标记视频源结束采集，与 acquire 成对调用。
+        """
+        with self._lock:
+            for source in map(str, sources):
+                count = self._in_use.get(source, 0) - 1
+                if count > 0:
+                    self._in_use[source] = count
+                else:
+                    self._in_use.pop(source, None)
+
+    def refresh(self, wait=False):
+        """
+        在后台线程中重新探测；已有探测在运行时不重复启动。
+
+        Args:
+            wait (bool): 是否等待探测完成。
+        """
+        with self._lock:
+            thread = self._refreshing
+            if thread is None:
+                thread = self._refreshing = threading.Thread(target=self._refresh, daemon=True)
+                thread.start()
+        if wait:
+            thread.join()
+
+    def _refresh(self):
+        try:
+            cameras = self.probe()
+            with self._lock:
+                self._cameras, self._updated = cameras, time.time()
+        finally:
+            with self._lock:
+                self._refreshing = None
+
+    def get(self):
+        """
+        获取可用视频源列表，不等待探测。
+
+        Returns:
+            list: 可用视频源名称列表。
+        """
+        with self._lock:
+            cameras, updated = self._cameras, self._updated
+        if cameras is None or time.time() - updated > self.ttl:
+            self.refresh()
+        if cameras is None:
+            # 尚未完成首次探测：Linux 返回已存在的设备节点，其他平台返回默认摄像头
+            indices = list_v4l2_devices() if sys.platform.startswith("linux") else [0]
+            return [str(i) for i in indices]
+        return list(cameras)
+
+
+_discovery = None
+_discovery_lock = threading.Lock()
+
+
+def camera_discovery():
+    """
+    获取进程内共享的 CameraDiscovery 实例，所有页面会话共用同一份缓存。
+    """
+    global _discovery
+    with _discovery_lock:
+        if _discovery is None:
+            _discovery = CameraDiscovery()
+        return _discovery
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
+
+import cv2  # 导入OpenCV库，用于解码和缩放图像
+import numpy as np
+import yaml
+
+IMG_FORMATS = ("bmp", "jpeg", "jpg", "png", "tif", "tiff", "webp")
+
+
+def letterbox(image, imgsz, color=(114, 114, 114)):
+    """
+    按比例缩放图像并填充为 imgsz x imgsz 的正方形。
+
+    Args:
+        image (numpy.ndarray): 输入BGR图像。
+        imgsz (int): 目标边长。
+        color (tuple): 填充颜色。
+
+    Returns:
+        tuple: (填充后的图像, 缩放比例, (左侧填充, 上方填充))。
+    """
+    h0, w0 = image.shape[:2]
+    ratio = min(imgsz / h0, imgsz / w0)
+    w, h = int(round(w0 * ratio)), int(round(h0 * ratio))
+    if (w, h) != (w0, h0):
+        image = cv2.resize(image, (w, h), interpolation=cv2.INTER_LINEAR)
+    left, top = (imgsz - w) // 2, (imgsz - h) // 2
+    out = cv2.copyMakeBorder(image, top, imgsz - h - top, left, imgsz - w - left,
+                             cv2.BORDER_CONSTANT, value=color)
+    return out, ratio, (left, top)
+
+
+def img2label_path(img_path):
+    """
+    根据YOLO目录约定，由图像路径得到标注文件路径（images -> labels，扩展名改为.txt）。
+    """
+    sa, sb = f"{os.sep}images{os.sep}", f"{os.sep}labels{os.sep}"
+    return sb.join(img_path.rsplit(sa, 1)).rsplit(".", 1)[0] + ".txt"
+
+
+def _file_hash(*paths):
+    sha = hashlib.sha1()
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    sha.update(chunk)
+        sha.update(b"\0")  # 分隔图像与标注，标注缺失时哈希也会不同
+    return sha.hexdigest()
+
+
+class CachedSplit:
+    def __init__(self, cache_dir, split):
+        """
+        以内存映射方式读取已缓存的数据集划分。
+
+        Args:
+            cache_dir (str): 缓存目录。
+            split (str): 划分名称，如 train 或 val。
+        """
+        with open(os.path.join(cache_dir, f"{split}.json"), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.imgsz = self.manifest["imgsz"]
+        self.files = [item["file"] for item in self.manifest["files"]]
+        self.index = {f: i for i, f in enumerate(self.files)}  # 图像路径 -> 缓存下标
+        self.images = np.load(os.path.join(cache_dir, f"{split}_images.npy"), mmap_mode="r")
+        label_index = np.load(os.path.join(cache_dir, f"{split}_labels.npz"))
+        self._labels = label_index["labels"]  # (M, 5)：类别, x, y, w, h（相对于填充后的图像归一化）
+        self._offsets = label_index["offsets"]  # 第i张图像的标注为 labels[offsets[i]:offsets[i+1]]
+        self.ori_shapes = label_index["ori_shapes"]
+
+    def __len__(self):
+        return len(self.files)
+
+    def labels(self, i):
+        """
+        获取第 i 张图像的标注。
+
+        Returns:
+            numpy.ndarray: (n, 5) 数组，每行为类别和归一化的xywh。
+        """
+        return self._labels[self._offsets[i]:self._offsets[i + 1]]
+
+
+class DatasetCache:
+    def __init__(self, data_path, imgsz=640, cache_dir=None, workers=None):
+        """
+        将数据集预先解码并letterbox为内存映射的uint8数组。
+
+        Args:
+            data_path (str): 数据集yaml文件路径。
+            imgsz (int): 缓存图像的边长，与训练的imgsz一致。
+            cache_dir (str): 缓存目录，默认为数据集目录下的 cache_<imgsz>。
+            workers (int): 解码和计算哈希使用的线程数，默认为CPU核心数。
+
+        缓存按划分保存为 <split>_images.npy（N x imgsz x imgsz x 3）、<split>_labels.npz（标注索引）
+        和 <split>.json（文件列表、哈希与imgsz）。任何图像或标注文件的内容变化、文件增删或imgsz变化都会使缓存失效。
+        """
+        self.data_path = data_path
+        self.imgsz = int(imgsz)
+        with open(data_path, "r", encoding="utf-8") as f:
+            self.data = yaml.safe_load(f)
+        self.root = self.data.get("path") or os.path.dirname(data_path)
+        self.cache_dir = cache_dir or os.path.join(self.root, f"cache_{self.imgsz}")
+        self.workers = workers or os.cpu_count() or 1
+
+    def split_files(self, split):
+        """
+        列出指定划分下的所有图像文件（排序后），规则与ultralytics一致。
+        """
+        sources = self.data[split]
+        files = []
+        for source in sources if isinstance(sources, list) else [sources]:
+            source = source if os.path.isabs(source) else os.path.join(self.root, source)
+            if os.path.isdir(source):
+                files += glob.glob(os.path.join(source, "**", "*.*"), recursive=True)
+            elif os.path.isfile(source):  # 文本文件，每行一个图像路径
+                parent = os.path.dirname(source)
+                with open(source, "r", encoding="utf-8") as f:
+                    for line in f.read().strip().splitlines():
+                        line = line.strip()
+                        files.append(os.path.join(parent, line[2:]) if line.startswith("./") else line)
+        return sorted(os.path.abspath(f) for f in files if f.rsplit(".", 1)[-1].lower() in IMG_FORMATS)
+
+    def _hashes(self, files):
+        with ThreadPoolExecutor(self.workers) as pool:
+            return list(pool.map(lambda f: _file_hash(f, img2label_path(f)), files))
+
+    def is_valid(self, split, files=None, hashes=None, check_hashes=True):
+        """
+        检查指定划分的缓存是否与当前数据集和imgsz一致。
+
+        Args:
+            check_hashes (bool): 是否核对文件内容的哈希，为 False 时只核对文件列表和imgsz。
+        """
+        manifest_path = os.path.join(self.cache_dir, f"{split}.json")
+        if not os.path.exists(manifest_path):
+            return False
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        files = files if files is not None else self.split_files(split)
+        if manifest.get("imgsz") != self.imgsz or [item["file"] for item in manifest["files"]] != files:
+            return False
+        if not check_hashes:
+            return True
+        hashes = hashes if hashes is not None else self._hashes(files)
+        return [item["hash"] for item in manifest["files"]] == hashes
+
+    def _load_one(self, image_path):
+        image = cv2.imdecode(np.fromfile(image_path, dtype=np.uint8), cv2.IMREAD_COLOR)  # 兼容中文路径
+        if image is None:
+            raise FileNotFoundError(f"无法读取图像：{image_path}")
+        h0, w0 = image.shape[:2]
+        image, ratio, (left, top) = letterbox(image, self.imgsz)
+
+        labels = np.zeros((0, 5), dtype=np.float32)
+        label_path = img2label_path(image_path)
+        if os.path.exists(label_path):
+            with open(label_path, "r", encoding="utf-8") as f:
+                rows = [line.split() for line in f.read().strip().splitlines() if line.strip()]
+            if rows:
+                labels = np.array([row[:5] for row in rows], dtype=np.float32)
+                # 将相对原图归一化的xywh转换为相对填充后图像归一化的xywh
+                labels[:, 1] = (labels[:, 1] * w0 * ratio + left) / self.imgsz
+                labels[:, 2] = (labels[:, 2] * h0 * ratio + top) / self.imgsz
+                labels[:, 3] = labels[:, 3] * w0 * ratio / self.imgsz
+                labels[:, 4] = labels[:, 4] * h0 * ratio / self.imgsz
+        return image, labels, (h0, w0)
+
+    def build(self, split, files=None, hashes=None):
+        """
+        解码并letterbox指定划分的所有图像，写入缓存。
+        """
+        files = files if files is not None else self.split_files(split)
+        hashes = hashes if hashes is not None else self._hashes(files)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        manifest_path = os.path.join(self.cache_dir, f"{split}.json")
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)  # 重建期间旧清单失效，避免中断后误用不完整的缓存
+
+        images_path = os.path.join(self.cache_dir, f"{split}_images.npy")
+        tmp_path = images_path + ".tmp.npy"
+        images = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8,
+                                           shape=(len(files), self.imgsz, self.imgsz, 3))
+        all_labels, ori_shapes = [None] * len(files), np.zeros((len(files), 2), dtype=np.int32)
+
+        def work(i):
+            image, labels, shape = self._load_one(files[i])
+            images[i] = image  # 直接写入内存映射文件
+            all_labels[i], ori_shapes[i] = labels, shape
+
+        # OpenCV解码和缩放时会释放GIL，线程池即可充分利用多核
+        with ThreadPoolExecutor(self.workers) as pool:
+            list(pool.map(work, range(len(files))))
+        images.flush()
+        del images
+        os.replace(tmp_path, images_path)
+
+        offsets = np.zeros(len(files) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(lb) for lb in all_labels])
+        labels = np.concatenate(all_labels) if all_labels else np.zeros((0, 5), dtype=np.float32)
+        np.savez(os.path.join(self.cache_dir, f"{split}_labels.npz"),
+                 labels=labels, offsets=offsets, ori_shapes=ori_shapes)
+
+        # 清单最后写入，保证只有完整的缓存才会被认为有效
+        manifest = {"imgsz": self.imgsz, "files": [{"file": f, "hash": h} for f, h in zip(files, hashes)]}
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+    def prepare(self, split):
+        """
+        确保指定划分的缓存有效（必要时重建），并返回可读取的缓存。
+
+        Returns:
+            CachedSplit: 内存映射的缓存数据。
+        """
+        files = self.split_files(split)
+        hashes = self._hashes(files)
+        if not self.is_valid(split, files, hashes):
+            print(f"正在生成 {split} 数据集缓存（imgsz={self.imgsz}）：{self.cache_dir}")
+            self.build(split, files, hashes)
+        return CachedSplit(self.cache_dir, split)
+
+    def open(self, split):
+        """
+        打开已由 prepare 验证过的缓存，只核对清单中的文件列表和imgsz，不重新计算哈希。
+
+        Returns:
+            CachedSplit: 内存映射的缓存数据；清单缺失或不一致时退回 prepare 重建。
+
+        训练和评估在开始前统一调用 prepare（见 run_train_model.py、ModelBenchmark.run），
+        之后每次构建数据集只读取清单，并发的多个训练不会各自重新计算整个划分的哈希。
+        """
+        if self.is_valid(split, check_hashes=False):
+            return CachedSplit(self.cache_dir, split)
+        return self.prepare(split)
+
+    def prepare_all(self, splits=("train", "val")):
+        """
+        准备所有划分的缓存。
+        """
+        return {split: self.prepare(split) for split in splits if split in self.data}
+
+
+try:
+    from ultralytics.data.dataset import YOLODataset
+    from ultralytics.models.yolo.detect import DetectionTrainer, DetectionValidator
+    from ultralytics.utils import colorstr
+    from ultralytics.utils.torch_utils import de_parallel
+except ImportError:  # 仅准备缓存时不需要ultralytics
+    YOLODataset = DetectionTrainer = DetectionValidator = None
+else:
+    class CachedYOLODataset(YOLODataset):
+        def __init__(self, *args, cache_split=None, **kwargs):
+            """
+            从 DatasetCache 读取图像和标注的YOLO数据集，跳过JPEG解码与缩放。
+
+            Args:
+                cache_split (CachedSplit): 对应划分的缓存。
+            """
+            self.cache_split = cache_split
+            super().__init__(*args, **kwargs)
+
+        def get_labels(self):
+            labels = []
+            size = self.cache_split.imgsz
+            for im_file in self.im_files:
+                lb = self.cache_split.labels(self.cache_split.index[os.path.abspath(im_file)])
+                labels.append({
+                    "im_file": im_file,
+                    "shape": (size, size),
+                    "cls": lb[:, 0:1].copy(),
+                    "bboxes": lb[:, 1:].copy(),
+                    "segments": [],
+                    "keypoints": None,
+                    "normalized": True,
+                    "bbox_format": "xywh",
+                })
+            return labels
+
+        def load_image(self, i, rect_mode=True):
+            image = np.array(self.cache_split.images[self.cache_split.index[os.path.abspath(self.im_files[i])]])
+            if self.augment:
+                # 维护马赛克增强使用的缓冲区
+                self.buffer.append(i)
+                if len(self.buffer) >= self.max_buffer:
+                    self.buffer.pop(0)
+            return image, image.shape[:2], image.shape[:2]
+
+    def build_cached_dataset(cfg, img_path, batch, data, mode, stride):
+        """
+        构建读取缓存的数据集，参数与ultralytics的build_yolo_dataset保持一致。
+        """
+        split = "train" if mode == "train" else "val"
+        cache_split = DatasetCache(cfg.data, cfg.imgsz).open(split)  # 缓存已在训练或评估开始前验证
+        return CachedYOLODataset(
+            cache_split=cache_split,
+            img_path=img_path,
+            imgsz=cfg.imgsz,
+            batch_size=batch,
+            augment=mode == "train",
+            hyp=cfg,
+            rect=cfg.rect or mode == "val",
+            cache=None,  # 缓存已在磁盘上，无需再占用内存
+            single_cls=cfg.single_cls or False,
+            stride=int(stride),
+            pad=0.0 if mode == "train" else 0.5,
+            prefix=colorstr(f"{mode}: "),
+            task=cfg.task,
+            classes=cfg.classes,
+            data=data,
+            fraction=cfg.fraction if mode == "train" else 1.0,
+        )
+
+    class CachedDetectionValidator(DetectionValidator):
+        def build_dataset(self, img_path, mode="val", batch=None):
+            return build_cached_dataset(self.args, img_path, batch, self.data, mode, self.stride)
+
+    class CachedDetectionTrainer(DetectionTrainer):
+        def build_dataset(self, img_path, mode="train", batch=None):
+            gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+            return build_cached_dataset(self.args, img_path, batch, self.data, mode, gs)
+
+        def get_validator(self):
+            self.loss_names = "box_loss", "cls_loss", "dfl_loss"
+            # 验证阶段同样读取缓存
+            return CachedDetectionValidator(self.test_loader, save_dir=self.save_dir, args=copy(self.args),
+                                            _callbacks=self.callbacks)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import struct
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa  # 可选依赖，缺失时使用NPZ格式
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+META_KEY = b"dlcv"  # Arrow schema 中保存名称表的元数据键
+# 导出的列及其类型
+EXPORT_COLUMNS = {
+    "frame": np.int64,  # 帧序号
+    "timestamp": np.float64,  # 记录时间戳
+    "source": np.int32,  # 视频源/文件，下标对应 sources
+    "class_id": np.int32,  # 模型输出的类别编号
+    "label": np.int32,  # 类别名称，下标对应 labels
+    "x1": np.float32,
+    "y1": np.float32,
+    "x2": np.float32,
+    "y2": np.float32,
+    "score": np.float32,  # 置信度
+    "time_spent": np.float32,  # 推理用时
+}
+
+
+def _export_arrays(store, rows=None):
+    cols = store.columns(rows)
+    box = cols["box"]
+    arrays = {
+        "frame": cols["frame"],
+        "timestamp": cols["timestamp"],
+        "source": cols["source"],
+        "class_id": cols["class_id"],
+        "label": cols["class_code"],
+        "x1": box[:, 0], "y1": box[:, 1], "x2": box[:, 2], "y2": box[:, 3],
+        "score": cols["score"],
+        "time_spent": cols["time_spent"],
+    }
+    return {name: np.ascontiguousarray(arrays[name], dtype=dtype) for name, dtype in EXPORT_COLUMNS.items()}
+
+
+def export_detections(store, path, class_names=None, rows=None, fmt=None):
+    """
+    将识别记录导出为列式二进制文件。
+
+    Args:
+        store (DetectionLogStore): 识别记录。
+        path (str): 导出路径，没有扩展名时按格式自动添加 .arrow 或 .npz。
+        class_names (list): 模型的类别名称（按类别编号），写入文件元数据。
+        rows (numpy.ndarray): 导出的行号，None 表示全部记录。
+        fmt (str): "arrow" 或 "npz"，默认有pyarrow时使用Arrow IPC。
+
+    Returns:
+        str: 导出的文件路径。
+
+    两种格式都不压缩，读取时可以直接内存映射（见 DetectionReader）。
+    """
+    fmt = fmt or ("arrow" if pa is not None else "npz")
+    if not os.path.splitext(path)[1]:
+        path = path + "." + fmt
+    arrays = _export_arrays(store, rows)
+    meta = {
+        "sources": list(store.file_names),
+        "labels": list(store.class_names),
+        "class_names": list(class_names) if class_names is not None else None,
+    }
+    if fmt == "arrow":
+        table = pa.table(arrays).replace_schema_metadata({META_KEY: json.dumps(meta, ensure_ascii=False)})
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        # 名称表以UTF-8字节数组保存，避免读取时需要pickle
+        meta_bytes = np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+        with open(path, "wb") as file:
+            np.savez(file, meta=meta_bytes, **arrays)
+    return path
+
+
+def _npz_memmap(path):
+    # 对未压缩的NPZ文件中的每个数组建立内存映射，不读取数据
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as file:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError("压缩的NPZ文件不能内存映射：%s" % info.filename)
+            file.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack("<HH", file.read(4))
+            file.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(file)
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=file.tell(), shape=shape,
+                                         order="F" if fortran else "C")
+    return arrays
+
+
+class DetectionReader:
+    def __init__(self, path):
+        """
+        以内存映射方式读取 export_detections 导出的识别记录，用于分析和回放。
+
+        Args:
+            path (str): .arrow 或 .npz 文件路径。
+
+        各列为映射到文件的只读numpy数组，打开文件几乎不读取数据，只有访问到的部分才会载入内存。
+        """
+        self.path = path
+        if path.endswith(".arrow"):
+            if pa is None:
+                raise ImportError("读取Arrow文件需要安装pyarrow")
+            self._source = pa.memory_map(path, "r")
+            table = pa.ipc.open_file(self._source).read_all()
+            meta = json.loads(table.schema.metadata[META_KEY].decode("utf-8"))
+            self.columns = {}
+            for name in table.column_names:
+                column = table.column(name)
+                chunk = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+                self.columns[name] = chunk.to_numpy(zero_copy_only=column.num_chunks == 1)
+        else:
+            self._source = None
+            arrays = _npz_memmap(path)
+            meta = json.loads(bytes(arrays.pop("meta")).decode("utf-8"))
+            self.columns = arrays
+        self.sources = meta["sources"]
+        self.labels = meta["labels"]
+        self.class_names = meta["class_names"]
+
+    def __len__(self):
+        return len(self.columns["frame"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def boxes(self):
+        """
+        (N, 4) 边界框 [x1, y1, x2, y2]（会复制为新数组）。
+        """
+        return np.stack([self.columns[k] for k in ("x1", "y1", "x2", "y2")], axis=1)
+
+    def frame(self, frame_index):
+        """
+        获取某一帧的全部识别记录的行范围（帧序号按记录顺序递增）。
+
+        Returns:
+            slice: 行范围，可直接用于索引各列。
+        """
+        frames = self.columns["frame"]
+        return slice(int(np.searchsorted(frames, frame_index, "left")),
+                     int(np.searchsorted(frames, frame_index, "right")))
+
+    def to_frame(self, rows=slice(None)):
+        """
+        将指定行生成为DataFrame，附加视频源和类别名称列。
+
+        Returns:
+            pd.DataFrame: 识别记录表格。
+        """
+        frame = pd.DataFrame({name: np.asarray(col[rows]) for name, col in self.columns.items()})
+        frame["source_name"] = [self.sources[i] for i in frame["source"]]
+        frame["label_name"] = [self.labels[i] for i in frame["label"]]
+        return frame
+
+    def close(self):
+        """释放内存映射。"""
+        self.columns = {}
+        if self._source is not None:
+            self._source.close()
+            self._source = None
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+import time
+
+import numpy as np
+import pandas as pd
+
+# 统计窗口：名称 -> 窗口长度（秒），None 表示整个会话
+STATS_WINDOWS = {"1分钟": 60, "10分钟": 600, "全程": None}
+
+
+class ClassStatistics:
+    def __init__(self, class_names, windows=None, num_bins=10):
+        """
+        按类别增量维护检测统计信息。
+
+        Args:
+            class_names (list): 类别名称列表，下标即类别ID。
+            windows (dict): 统计窗口，名称 -> 窗口长度（秒），None 表示整个会话。
+            num_bins (int): 置信度直方图的分箱数量。
+
+        以一秒为粒度的环形缓冲区保存每秒的计数、置信度之和与直方图；每个滑动窗口另外维护一份累加和，
+        新数据加入时累加、桶移出窗口时扣减，因此每帧的更新代价只与类别数有关，与历史长度无关。
+        """
+        self.class_names = list(class_names)
+        self.windows = dict(windows or STATS_WINDOWS)
+        self.num_bins = num_bins
+        self.num_classes = len(self.class_names)
+        self._sliding = {name: sec for name, sec in self.windows.items() if sec is not None}
+        self.horizon = max(self._sliding.values(), default=1)  # 环形缓冲区覆盖的秒数
+        self.reset()
+
+    def _zeros(self, *lead):
+        return {
+            "counts": np.zeros(lead + (self.num_classes,), dtype=np.int64),
+            "score_sum": np.zeros(lead + (self.num_classes,), dtype=np.float64),
+            "hist": np.zeros(lead + (self.num_classes, self.num_bins), dtype=np.int64),
+            "frames": np.zeros(lead, dtype=np.int64),
+        }
+
+    def reset(self):
+        """
+        清空所有统计数据。
+        """
+        self._buckets = self._zeros(self.horizon)  # 每秒一个桶
+        self._bucket_sec = np.full(self.horizon, -1, dtype=np.int64)  # 每个桶对应的绝对秒数
+        self._window_sums = {name: self._zeros() for name in self._sliding}
+        self._session = self._zeros()
+        self.start_time = None
+        self._current_sec = None
+
+    def _advance(self, sec):
+        """
+        将当前时间推进到 sec，扣减移出各窗口的桶并清空即将复用的桶。
+        """
+        if self._current_sec is None:
+            self._current_sec = sec
+            self._bucket_sec[sec % self.horizon] = sec
+            return
+        if sec <= self._current_sec:
+            return
+        if sec - self._current_sec >= self.horizon:
+            # 间隔超过缓冲区长度，所有滑动窗口内的数据都已过期
+            for sums in self._window_sums.values():
+                for arr in sums.values():
+                    arr[...] = 0
+            for arr in self._buckets.values():
+                arr[...] = 0
+            self._bucket_sec[:] = -1
+        else:
+            for t in range(self._current_sec + 1, sec + 1):
+                for name, length in self._sliding.items():
+                    expired = t - length
+                    idx = expired % self.horizon
+                    if self._bucket_sec[idx] == expired:
+                        for key, arr in self._window_sums[name].items():
+                            arr -= self._buckets[key][idx]
+                idx = t % self.horizon
+                for arr in self._buckets.values():
+                    arr[idx] = 0
+                self._bucket_sec[idx] = -1
+        self._bucket_sec[sec % self.horizon] = sec
+        self._current_sec = sec
+
+    def update(self, class_ids, scores, timestamp=None):
+        """
+        加入一帧的检测结果。
+
+        Args:
+            class_ids (array-like): 本帧各目标的类别ID。
+            scores (array-like): 本帧各目标的置信度。
+            timestamp (float): 帧时间戳（秒），默认为当前时间。
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        if self.start_time is None:
+            self.start_time = timestamp
+        self._advance(int(timestamp))
+
+        class_ids = np.asarray(class_ids, dtype=np.int64).reshape(-1)
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+        valid = (class_ids >= 0) & (class_ids < self.num_classes)
+        class_ids, scores = class_ids[valid], scores[valid]
+
+        bins = np.clip((scores * self.num_bins).astype(np.int64), 0, self.num_bins - 1)
+        delta = {
+            "counts": np.bincount(class_ids, minlength=self.num_classes),
+            "score_sum": np.bincount(class_ids, weights=scores, minlength=self.num_classes),
+            "hist": np.bincount(class_ids * self.num_bins + bins,
+                                minlength=self.num_classes * self.num_bins).reshape(self.num_classes,
+                                                                                    self.num_bins),
+            "frames": 1,
+        }
+
+        idx = self._current_sec % self.horizon
+        for key, value in delta.items():
+            self._buckets[key][idx] += value
+            self._session[key] += value
+            for sums in self._window_sums.values():
+                sums[key] += value
+
+    def _window(self, name, now=None):
+        """
+        获取指定窗口的累加数据和有效时长。
+        """
+        if self.start_time is None:
+            return self._zeros(), 0.0
+        now = time.time() if now is None else now
+        self._advance(int(now))  # 让长时间没有新帧的窗口也能正确过期
+        elapsed = max(now - self.start_time, 1.0)
+        length = self.windows[name]
+        if length is None:
+            return self._session, elapsed
+        return self._window_sums[name], min(float(length), elapsed)
+
+    def summary(self, name, now=None):
+        """
+        生成指定窗口的按类别统计表。
+
+        Args:
+            name (str): 窗口名称，如“1分钟”。
+            now (float): 当前时间，默认为 time.time()。
+
+        Returns:
+            pd.DataFrame: 包含类别、数量、每秒数量和平均置信度的表格，只保留出现过的类别。
+        """
+        sums, duration = self._window(name, now)
+        counts = sums["counts"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_conf = np.where(counts > 0, sums["score_sum"] / counts, 0.0)
+        df = pd.DataFrame({
+            "类别": self.class_names,
+            "数量": counts,
+            "每秒": np.round(counts / duration, 3) if duration > 0 else 0.0,
+            "平均置信度": np.round(mean_conf, 3),
+        })
+        return df[df["数量"] > 0].sort_values("数量", ascending=False).reset_index(drop=True)
+
+    def confidence_histogram(self, name, now=None):
+        """
+        生成指定窗口内所有类别合计的置信度直方图。
+
+        Returns:
+            pd.DataFrame: 以置信度区间为索引的目标数量。
+        """
+        sums, _ = self._window(name, now)
+        edges = np.linspace(0, 1, self.num_bins + 1)
+        index = ["%.1f-%.1f" % (lo, hi) for lo, hi in zip(edges[:-1], edges[1:])]
+        return pd.DataFrame({"数量": sums["hist"].sum(axis=0)}, index=index)
+
+    def frame_count(self, name, now=None):
+        """
+        指定窗口内处理过的帧数。
+        """
+        sums, _ = self._window(name, now)
+        return int(sums["frames"])
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from YOLOv8v5Model import YOLOv8v5Detector, ini_params
+
+
+def default_pool_size(device=None):
+    """
+    根据可用的计算资源确定副本数量。
+
+    Args:
+        device (str): 推理设备，默认使用 ini_params 中的设备。
+
+    Returns:
+        int: GPU 上为2（一个副本推理时另一个可以准备数据）；CPU 上单个副本的推理已经使用多个线程，
+            按每4个逻辑核心一个副本计算，最少1个、最多4个。
+    """
+    device = device or ini_params['device']
+    if str(device).startswith('cuda'):
+        return 2
+    return max(1, min(4, (os.cpu_count() or 1) // 4))
+
+
+class DetectorPool:
+    def __init__(self, model_path, size=None, params=None, factory=YOLOv8v5Detector, window=10.0, history=500):
+        """
+        模型副本池：多个会话或线程并发推理时，每次调用借出一个独占的副本，推理参数随调用传入。
+
+        Args:
+            model_path (str): 模型权重路径。
+            size (int): 副本数量上限，默认由 default_pool_size 确定。
+            params (dict): 创建副本时的参数，与 ini_params 合并，每个副本持有自己的副本。
+            factory (type): 副本的检测器类。
+            window (float): 计算利用率的时间窗口（秒）。
+            history (int): 统计等待时间使用的最近借出次数。
+
+        创建时加载一个副本，其余副本在所有已有副本都在使用时才加载，达到上限后调用方排队等待。
+        提供与检测器相同的 preprocess/predict/postprocess/names 接口，可以直接传给 MultiSourceProcessor。
+        """
+        self.model_path = model_path
+        self.params = dict(ini_params, **(params or {}))
+        self.size = size or default_pool_size(self.params['device'])
+        self.factory = factory
+        self.window = window
+        self.checkouts = 0  # 累计借出次数
+        self.in_use = 0  # 正在使用的副本数
+        self._replicas = []
+        self._loading = 0  # 正在加载的副本数
+        self._idle = []  # 空闲副本，后进先出使最近用过的副本优先被复用
+        self._waiters = deque()  # 等待副本的调用方 [事件, 分配的副本]，先到先得
+        self._lock = threading.Lock()
+        self._wait = deque(maxlen=history)  # 最近的等待时间（秒）
+        self._busy = deque()  # 最近一个时间窗口内的 (结束时间, 使用时长)
+        self._created = time.time()
+        self._idle.append(self._load())
+
+    def _load(self):
+        detector = self.factory(dict(self.params))
+        detector.load_model(self.model_path)
+        with self._lock:
+            self._replicas.append(detector)
+        return detector
+
+    def _acquire(self, timeout):
+        with self._lock:
+            if self._idle and not self._waiters:
+                return self._idle.pop()
+            grow = len(self._replicas) + self._loading < self.size
+            if grow:
+                self._loading += 1
+            else:
+                waiter = [threading.Event(), None]
+                self._waiters.append(waiter)
+        if grow:
+            try:
+                return self._load()
+            finally:
+                with self._lock:
+                    self._loading -= 1
+        if not waiter[0].wait(timeout):
+            with self._lock:
+                if waiter[1] is None:
+                    self._waiters.remove(waiter)
+                    raise TimeoutError("等待模型副本超时（%d 个副本均在使用）" % self.size)
+        return waiter[1]  # 超时的同时被分配了副本时仍然使用该副本
+
+    def _release(self, detector):
+        # 归还的副本直接交给等待最久的调用方，避免刚归还的线程立即再次取走
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter[1] = detector
+                waiter[0].set()
+            else:
+                self._idle.append(detector)
+
+    @contextlib.contextmanager
+    def checkout(self, timeout=None):
+        """
+        借出一个副本，离开 with 语句块时归还。
+
+        Args:
+            timeout (float): 最长等待时间（秒），None 表示一直等待；超时抛出 TimeoutError。
+
+        Yields:
+            YOLOv8v5Detector: 在 with 语句块内由调用方独占的检测器。
+        """
+        t0 = time.time()
+        detector = self._acquire(timeout)
+        t1 = time.time()
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self._wait.append(t1 - t0)
+        try:
+            yield detector
+        finally:
+            t2 = time.time()
+            with self._lock:
+                self.in_use -= 1
+                self._busy.append((t2, t2 - t1))
+            self._release(detector)
+
+    @property
+    def names(self):
+        """模型的类别名称。"""
+        return self._replicas[0].names
+
+    def preprocess(self, img):
+        return img
+
+    def predict(self, img, **kwargs):
+        """
+        借出一个副本完成一次推理。
+
+        Args:
+            img (numpy.ndarray|list): 单张图像或图像列表。
+            **kwargs: 本次推理的参数（如 conf、iou、imgsz），不会修改任何共享的参数。
+
+        Returns:
+            list: 与 YOLOv8v5Detector.predict 相同的结果。
+        """
+        with self.checkout() as detector:
+            return detector.predict(img, **kwargs)
+
+    def postprocess(self, pred):
+        # 后处理只读取类别名称，不需要借出副本
+        return self._replicas[0].postprocess(pred)
+
+    def metrics(self):
+        """
+        副本池的使用情况。
+
+        Returns:
+            dict: 副本数量、正在使用的副本数、累计借出次数、最近时间窗口内的利用率以及等待时间的均值和P95（毫秒）。
+        """
+        now = time.time()
+        with self._lock:
+            while self._busy and self._busy[0][0] < now - self.window:
+                self._busy.popleft()
+            start = max(now - self.window, self._created)
+            busy = sum(min(duration, end - start) for end, duration in self._busy)
+            replicas = len(self._replicas)
+            wait = np.asarray(self._wait) * 1000
+            return {
+                "replicas": replicas,
+                "size": self.size,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "utilization": round(min(1.0, busy / (max(now - start, 1e-6) * replicas)), 3),
+                "wait_mean_ms": round(float(wait.mean()), 1) if len(wait) else 0.0,
+                "wait_p95_ms": round(float(np.percentile(wait, 95)), 1) if len(wait) else 0.0,
+            }
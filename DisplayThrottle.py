@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import functools
+import time
+
+import cv2  # 导入OpenCV库，用于缩放和JPEG编码
+
+DISPLAY_SIZE = (1080, int(1080 * (9 / 16)))  # 页面显示分辨率（宽, 高）
+# 读取浏览器积压量所依赖的Streamlit内部属性已验证过的版本范围（主版本, 次版本），与 requirements.txt 一致
+BACKLOG_STREAMLIT_VERSIONS = ((1, 18), (1, 29))
+
+
+@functools.lru_cache(maxsize=None)
+def _backlog_supported():
+    # 只在验证过的Streamlit版本上读取内部属性，其他版本只按时间间隔限流
+    try:
+        import streamlit
+        version = tuple(int(v) for v in streamlit.__version__.split(".")[:2])
+    except (ImportError, ValueError):
+        return False
+    return BACKLOG_STREAMLIT_VERSIONS[0] <= version <= BACKLOG_STREAMLIT_VERSIONS[1]
+
+
+def _browser_backlog():
+    """
+    估计当前会话尚未发送到浏览器的字节数。
+
+    Returns:
+        int: 等待写入websocket的字节数；Streamlit版本不在 BACKLOG_STREAMLIT_VERSIONS 范围内或无法获取时返回 None。
+
+    依赖Streamlit与Tornado的内部属性，只在验证过的版本上读取，其他版本或读取失败时安全地返回 None。
+    """
+    if not _backlog_supported():
+        return None
+    try:
+        from streamlit.runtime import Runtime
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx()
+        info = Runtime.instance()._session_mgr.get_active_session_info(ctx.session_id)
+        stream = info.client.ws_connection.stream
+        return stream._total_write_index - stream._total_write_done_index
+    except Exception:
+        return None
+
+
+class DisplayThrottle:
+    def __init__(self, max_fps=10, display_size=DISPLAY_SIZE, jpeg_quality=80, max_backlog_frames=2):
+        """
+        限制推送到页面的画面帧率，使推理帧率不受页面刷新的影响。
+
+        Args:
+            max_fps (float): 页面画面的最大刷新帧率。
+            display_size (tuple): 显示分辨率（宽, 高）。
+            jpeg_quality (int): JPEG编码质量。
+            max_backlog_frames (int): 浏览器积压超过多少帧的数据量时跳过推送。
+
+        只有需要推送的帧才会被缩放并编码为JPEG（每帧只编码一次），直接以字节形式交给Streamlit，
+        避免其对numpy图像再做PNG编码。进度条、表格等其他控件通过 due 按固定间隔批量刷新。
+        """
+        self.max_fps = max_fps
+        self.display_size = display_size
+        self.jpeg_quality = jpeg_quality
+        self.max_backlog_frames = max_backlog_frames
+        self.pushed = 0  # 已推送的画面数
+        self.skipped = 0  # 被跳过的画面数
+        self._last_push = 0.0
+        self._push_cost = 0.0  # 最近一次推送的耗时
+        self._last_bytes = 0  # 最近一次推送的数据量
+        self._last_due = {}
+
+    def should_push(self, now=None):
+        """
+        判断当前帧是否应推送到页面。
+
+        Returns:
+            bool: 距上次推送已超过帧间隔且浏览器没有积压时返回 True。
+        """
+        now = time.time() if now is None else now
+        interval = 1.0 / self.max_fps if self.max_fps > 0 else 0.0
+        # 推送本身耗时超过帧间隔时自动降低推送频率，保证大部分时间用于推理
+        if now - self._last_push < max(interval, 2 * self._push_cost):
+            self.skipped += 1
+            return False
+        backlog = _browser_backlog()
+        if backlog is not None and self._last_bytes and backlog > self.max_backlog_frames * self._last_bytes:
+            self.skipped += 1  # 浏览器跟不上，丢弃本帧而不是继续排队
+            return False
+        return True
+
+    def encode(self, image):
+        """
+        将图像缩放到显示分辨率并编码为JPEG。
+
+        Returns:
+            bytes: JPEG数据。
+        """
+        if (image.shape[1], image.shape[0]) != self.display_size:
+            image = cv2.resize(image, self.display_size)
+        ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        return buffer.tobytes()
+
+    def push(self, items):
+        """
+        推送一组画面到页面。
+
+        Args:
+            items (list): (占位符, BGR图像, 标题) 元组列表。
+        """
+        t1 = time.time()
+        total = 0
+        for placeholder, image, caption in items:
+            data = self.encode(image)
+            total += len(data)
+            placeholder.image(data, caption=caption)
+        self._last_push = time.time()
+        self._push_cost = self._last_push - t1
+        self._last_bytes = total
+        self.pushed += 1
+
+    def due(self, key, interval=0.5, now=None):
+        """
+        按固定间隔批量刷新其他控件（进度条、表格等）。
+
+        Args:
+            key (str): 控件名称。
+            interval (float): 刷新间隔（秒）。
+
+        Returns:
+            bool: 距该控件上次刷新已超过 interval 时返回 True 并记录本次刷新时间。
+        """
+        now = time.time() if now is None else now
+        if now - self._last_due.get(key, 0.0) < interval:
+            return False
+        self._last_due[key] = now
+        return True
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import cv2  # 导入OpenCV库，用于缩放图像
+import numpy as np
+
+from DisplayThrottle import DISPLAY_SIZE
+
+INFER_SIZE = (640, 640)  # 推理与日志记录使用的分辨率（宽, 高）
+
+
+class FrameBufferPool:
+    def __init__(self):
+        """
+        预分配的图像缓冲区池，按名称和尺寸复用，避免每帧重新分配内存。
+
+        同一名称的缓冲区每次只能被一帧使用，适用于逐帧处理的循环；需要长期保留的图像必须复制出去。
+        """
+        self._buffers = {}
+
+    def get(self, name, size, channels=3):
+        """
+        获取指定名称和尺寸的缓冲区，不存在时分配。
+
+        Args:
+            name (str): 缓冲区名称。
+            size (tuple): 尺寸（宽, 高）。
+            channels (int): 通道数。
+
+        Returns:
+            numpy.ndarray: uint8 缓冲区。
+        """
+        key = (name, tuple(size), channels)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = np.empty((size[1], size[0], channels), dtype=np.uint8)
+        return buffer
+
+    def resize(self, image, size, name):
+        """
+        将图像缩放到指定尺寸，结果写入名为 name 的缓冲区。
+
+        Returns:
+            numpy.ndarray: 缩放后的图像（缓冲区视图）。
+        """
+        size = tuple(size)
+        if (image.shape[1], image.shape[0]) == size:
+            return image
+        return cv2.resize(image, size, dst=self.get(name, size, image.shape[2] if image.ndim == 3 else 1))
+
+    @property
+    def nbytes(self):
+        """所有缓冲区占用的字节数。"""
+        return sum(buffer.nbytes for buffer in self._buffers.values())
+
+
+class FrameContext:
+    def __init__(self, frame, pool=None):
+        """
+        单帧的处理上下文，在推理、绘制、显示和日志记录之间共享各分辨率的图像。
+
+        Args:
+            frame (numpy.ndarray): 原始帧（可以是解码器共享内存中的视图）。
+            pool (FrameBufferPool): 缓冲区池，同一处理循环中应复用同一个池。
+
+        每种分辨率最多只缩放一次，临时结果写入预分配的缓冲区，只有需要保留的图像才会复制。
+        """
+        self.frame = frame
+        self.pool = pool if pool is not None else FrameBufferPool()
+        self._resized = {}
+
+    def resized(self, size):
+        """
+        获取原始帧在指定分辨率下的图像，在本帧内缓存。
+
+        Returns:
+            numpy.ndarray: 缩放后的图像，在处理下一帧前有效，不可修改。
+        """
+        size = tuple(size)
+        if size not in self._resized:
+            self._resized[size] = self.pool.resize(self.frame, size, "frame")
+        return self._resized[size]
+
+    def copy(self, size):
+        """
+        获取指定分辨率图像的独立副本，用于日志记录等需要长期保留的场合。
+        """
+        return self.resized(size).copy()
+
+    def canvas(self, size=INFER_SIZE):
+        """
+        获取用于绘制检测框的画布（指定分辨率图像的副本）。
+        """
+        return self.copy(size)
+
+    def display(self, image=None, name="annotated", size=DISPLAY_SIZE):
+        """
+        获取显示分辨率的图像。
+
+        Args:
+            image (numpy.ndarray): 需要显示的图像，为 None 时显示原始帧。
+            name (str): 缩放结果使用的缓冲区名称。
+            size (tuple): 显示分辨率。
+
+        Returns:
+            numpy.ndarray: 显示分辨率的图像（缓冲区视图）。
+        """
+        if image is None:
+            return self.resized(size)
+        return self.pool.resize(image, size, name)
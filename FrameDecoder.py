@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2  # 导入OpenCV库，用于视频解码
+import numpy as np
+
+from MediaIngest import GrowingFileCapture
+
+
+def _open_capture(source, total_size):
+    """
+    在解码子进程中打开视频源。
+
+    Args:
+        source (str | int): 视频文件路径、流地址或摄像头索引。
+        total_size (int): 仍在写入的文件的最终大小，None 表示普通视频源。
+
+    Returns:
+        cv2.VideoCapture | GrowingFileCapture: 打开的视频源。
+    """
+    if total_size is not None:
+        return GrowingFileCapture(source, total_size)
+    return cv2.VideoCapture(source)
+
+
+def _decode_worker(source, total_size, meta_queue, names_queue, free_queue, ready_queue, stop_event):
+    """
+    解码子进程入口：持续解码视频帧并写入共享内存槽位。
+
+    Args:
+        source (str | int): 视频源。
+        total_size (int): 仍在写入的文件的最终大小。
+        meta_queue (Queue): 向父进程发送视频元信息的队列。
+        names_queue (Queue): 接收父进程创建的共享内存名称的队列。
+        free_queue (Queue): 空闲槽位编号队列。
+        ready_queue (Queue): 已写入帧的槽位编号、帧序号和采集时间戳队列，None 表示结束。
+        stop_event (Event): 父进程要求停止的事件。
+    """
+    cap = _open_capture(source, total_size)
+    ret, frame = cap.read() if cap.isOpened() else (False, None)
+    if not ret:
+        meta_queue.put(None)  # 无法打开或读取视频源
+        cap.release()
+        return
+    meta_queue.put({
+        "shape": frame.shape,
+        "fps": cap.get(cv2.CAP_PROP_FPS),
+        "frame_count": cap.get(cv2.CAP_PROP_FRAME_COUNT),
+    })
+
+    names = names_queue.get()
+    shms = [shared_memory.SharedMemory(name=name) for name in names]
+    slots = [np.ndarray(frame.shape, dtype=np.uint8, buffer=shm.buf) for shm in shms]
+    # 普通视频源可以直接解码进槽位，省去一次整帧复制
+    direct = isinstance(cap, cv2.VideoCapture)
+    try:
+        frame_index = 0
+        while not stop_event.is_set():
+            try:
+                slot = free_queue.get(timeout=0.1)  # 所有槽位都被占用时等待消费者归还
+            except queue.Empty:
+                continue
+            if frame_index > 0:
+                ret, frame = cap.read(slots[slot]) if direct else cap.read()
+                if not ret:
+                    break
+            if frame is not slots[slot]:
+                if frame.shape != slots[slot].shape:
+                    frame = cv2.resize(frame, (slots[slot].shape[1], slots[slot].shape[0]))
+                np.copyto(slots[slot], frame)
+            ready_queue.put((slot, frame_index, time.time()))
+            frame_index += 1
+    finally:
+        ready_queue.put(None)
+        cap.release()
+        frame = None
+        del slots
+        for shm in shms:
+            shm.close()
+
+
+class SharedFrameDecoder:
+    def __init__(self, source, num_slots=4, total_size=None):
+        """
+        在独立子进程中解码视频，并通过共享内存槽位池传递帧。
+
+        Args:
+            source (str | int): 视频文件路径、流地址或摄像头索引。
+            num_slots (int): 共享内存槽位数量，决定解码最多领先推理多少帧，也限制了内存占用。
+            total_size (int): 文件仍在写入时的最终大小（见 MediaIngest.GrowingFileCapture）。
+
+        接口与 cv2.VideoCapture 保持一致（isOpened、read、get、release）。
+        read 返回的帧是共享内存的视图，仅在下一次 read 之前有效，需要保留时请自行复制。
+        """
+        self.source = source
+        self.num_slots = num_slots
+        self.total_size = total_size
+        self.meta = None  # 视频元信息（帧尺寸、帧率、总帧数）
+        self.frame_index = -1  # 最近一次读取的帧序号
+        self.timestamp = None  # 最近一次读取的帧的解码完成时间
+        self.skipped = 0  # 最近一次 read_latest 跳过的旧帧数量
+
+        self._ctx = mp.get_context("spawn")  # Streamlit为多线程环境，使用spawn避免fork带来的锁问题
+        self._meta_queue = self._ctx.Queue()
+        self._names_queue = self._ctx.Queue()
+        self._free_queue = self._ctx.Queue()
+        self._ready_queue = self._ctx.Queue()
+        self._stop_event = self._ctx.Event()
+        self._process = None
+        self._shms = []
+        self._slots = []
+        self._held_slot = None  # 当前被消费者持有的槽位
+        self._opened = False
+        self._finished = False
+
+    def start(self):
+        """
+        启动解码子进程并等待第一帧的元信息。
+
+        Returns:
+            SharedFrameDecoder: 返回自身，便于链式调用。
+        """
+        self._process = self._ctx.Process(
+            target=_decode_worker,
+            args=(self.source, self.total_size, self._meta_queue, self._names_queue,
+                  self._free_queue, self._ready_queue, self._stop_event),
+            daemon=True,
+        )
+        self._process.start()
+
+        while True:
+            try:
+                self.meta = self._meta_queue.get(timeout=0.5)
+                break
+            except queue.Empty:
+                if not self._process.is_alive():
+                    break
+        if not self.meta:
+            self._finished = True
+            return self
+
+        shape = self.meta["shape"]
+        nbytes = int(np.prod(shape))
+        self._shms = [shared_memory.SharedMemory(create=True, size=nbytes) for _ in range(self.num_slots)]
+        self._slots = [np.ndarray(shape, dtype=np.uint8, buffer=shm.buf) for shm in self._shms]
+        self._names_queue.put([shm.name for shm in self._shms])
+        for slot in range(self.num_slots):
+            self._free_queue.put(slot)
+        self._opened = True
+        return self
+
+    def isOpened(self):
+        return self._opened
+
+    def get(self, prop_id):
+        """
+        获取视频属性，支持帧率、总帧数和帧宽高。
+        """
+        if not self.meta:
+            return 0.0
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.meta["fps"]
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return self.meta["frame_count"]
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.meta["shape"][1])
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.meta["shape"][0])
+        return 0.0
+
+    def read(self):
+        """
+        读取下一帧，同时归还上一帧占用的槽位。
+
+        Returns:
+            tuple: (ret, frame)，frame 为共享内存中的图像视图。
+        """
+        if self._held_slot is not None:
+            self._free_queue.put(self._held_slot)
+            self._held_slot = None
+        if self._finished:
+            return False, None
+
+        item = None
+        while True:
+            try:
+                item = self._ready_queue.get(timeout=0.5)
+                break
+            except queue.Empty:
+                if not self._process.is_alive():
+                    break
+        if item is None:
+            self._finished = True
+            return False, None
+
+        slot, self.frame_index, self.timestamp = item
+        self._held_slot = slot
+        return True, self._slots[slot]
+
+    def read_latest(self):
+        """
+        读取已解码的最新一帧，跳过积压的旧帧（跳过的数量记录在 skipped 中）。
+
+        Returns:
+            tuple: (ret, frame)，与 read 相同。
+        """
+        ret, frame = self.read()
+        self.skipped = 0
+        while ret:
+            try:
+                item = self._ready_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._finished = True  # 解码已结束，先返回当前帧
+                break
+            self._free_queue.put(self._held_slot)
+            slot, self.frame_index, self.timestamp = item
+            self._held_slot = slot
+            frame = self._slots[slot]
+            self.skipped += 1
+        return ret, frame
+
+    def release(self):
+        """
+        停止解码子进程并释放共享内存。
+        """
+        self._stop_event.set()
+        if self._process is not None:
+            self._process.join(timeout=2)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+        self._slots = []
+        for shm in self._shms:
+            try:
+                shm.close()
+            except BufferError:
+                pass  # 调用方仍持有帧视图，映射会在视图被回收后释放
+            shm.unlink()
+        self._shms = []
+        self._opened = False
+        self._finished = True
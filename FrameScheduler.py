@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class FrameScheduler:
+    def __init__(self, deadline_ms=200.0, history=300):
+        """
+        按截止时间调度实时帧：总是优先处理最新的帧，推理开始前已超过截止时间的帧直接丢弃。
+
+        Args:
+            deadline_ms (float): 从采集到开始推理允许的最长时间（毫秒）。
+            history (int): 统计端到端延迟使用的最近帧数。
+
+        可以异步使用（采集方 submit、处理方 take），也可以在同步循环中用 admit 判断帧是否仍然有效。
+        处理完成（画面已显示）后调用 complete 记录从采集到显示的端到端延迟。
+        """
+        self.deadline_ms = deadline_ms
+        self.processed = 0  # 已处理的帧数
+        self.superseded = 0  # 被更新的帧替换而丢弃的帧数
+        self.expired = 0  # 超过截止时间而丢弃的帧数
+        self._latency = deque(maxlen=history)  # 最近的端到端延迟（秒）
+        self._lock = threading.Lock()
+        self._pending = None  # 尚未处理的最新帧 (帧, 采集时间戳)
+
+    def _expired(self, timestamp, now):
+        return (now - timestamp) * 1000 > self.deadline_ms
+
+    def submit(self, frame, timestamp=None):
+        """
+        提交新采集的帧，尚未处理的旧帧被替换。
+
+        Args:
+            frame (numpy.ndarray): 图像帧。
+            timestamp (float): 采集时间戳，默认为当前时间。
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if self._pending is not None:
+                self.superseded += 1
+            self._pending = (frame, timestamp)
+
+    def take(self):
+        """
+        取出最新的待处理帧。
+
+        Returns:
+            tuple: (帧, 采集时间戳)；没有待处理的帧或该帧已超过截止时间时返回 None。
+        """
+        with self._lock:
+            item, self._pending = self._pending, None
+        if item is None:
+            return None
+        if self._expired(item[1], time.time()):
+            with self._lock:
+                self.expired += 1
+            return None
+        return item
+
+    def admit(self, timestamp, skipped=0):
+        """
+        同步循环中判断刚读取的帧是否仍应处理。
+
+        Args:
+            timestamp (float): 帧的采集时间戳。
+            skipped (int): 读取时为取得最新帧而跳过的旧帧数量。
+
+        Returns:
+            bool: 未超过截止时间时返回 True。
+        """
+        with self._lock:
+            self.superseded += skipped
+            if self._expired(timestamp, time.time()):
+                self.expired += 1
+                return False
+        return True
+
+    def complete(self, timestamp):
+        """
+        记录一帧处理完成（已显示），统计端到端延迟。
+
+        Args:
+            timestamp (float): 该帧的采集时间戳。
+        """
+        with self._lock:
+            self.processed += 1
+            self._latency.append(time.time() - timestamp)
+
+    def metrics(self):
+        """
+        调度统计。
+
+        Returns:
+            dict: 处理帧数、丢弃帧数（被替换/超时）、丢帧比例以及端到端延迟的均值、P50、P95（毫秒）。
+        """
+        with self._lock:
+            latency = np.asarray(self._latency) * 1000
+            dropped = self.superseded + self.expired
+            total = self.processed + dropped
+            return {
+                "processed": self.processed,
+                "dropped_superseded": self.superseded,
+                "dropped_expired": self.expired,
+                "drop_rate": round(dropped / total, 3) if total else 0.0,
+                "latency_mean_ms": round(float(latency.mean()), 1) if len(latency) else None,
+                "latency_p50_ms": round(float(np.percentile(latency, 50)), 1) if len(latency) else None,
+                "latency_p95_ms": round(float(np.percentile(latency, 95)), 1) if len(latency) else None,
+            }
+
+    def summary(self):
+        """
+        单行的统计文本，用于界面显示和打印。
+        """
+        m = self.metrics()
+        latency = "%.1f / %.1f ms" % (m["latency_p50_ms"], m["latency_p95_ms"]) if m["latency_p50_ms"] is not None \
+            else "-"
+        return "已处理 %d 帧，丢弃 %d 帧（替换 %d / 超时 %d），端到端延迟 P50/P95：%s" % (
+            m["processed"], m["dropped_superseded"] + m["dropped_expired"], m["dropped_superseded"],
+            m["dropped_expired"], latency)
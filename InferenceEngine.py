@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import time
+
+import cv2  # 导入OpenCV库，用于绘制帧率和延迟信息
+from PySide6 import QtCore  # 导入PySide6的QtCore模块，用于线程和信号
+
+from FrameScheduler import FrameScheduler
+
+
+class _InferenceWorker(QtCore.QObject):
+    resultReady = QtCore.Signal(object, float, float)  # 绘制结果的图像、采集时间戳、处理用时
+
+    def __init__(self, scheduler, process_fn):
+        super().__init__()
+        self.scheduler = scheduler
+        self.process_fn = process_fn
+
+    @QtCore.Slot()
+    def process(self):
+        # 在推理线程中运行：取出邮箱中的最新帧，已被处理或已过期时直接返回
+        item = self.scheduler.take()
+        if item is None:
+            return
+        frame, timestamp = item
+        t1 = time.time()
+        image = self.process_fn(frame)
+        self.resultReady.emit(image, timestamp, time.time() - t1)
+
+
+class InferenceEngine(QtCore.QObject):
+    resultReady = QtCore.Signal(object)  # 带有帧率/延迟信息的结果图像，在GUI线程中发出
+    _wake = QtCore.Signal()
+
+    def __init__(self, process_fn, deadline_ms=100, overlay=True, parent=None):
+        """
+        在独立的QThread中运行推理，GUI线程只负责采集和显示。
+
+        Args:
+            process_fn (callable): process_fn(frame) 返回绘制了检测结果的图像，在推理线程中调用。
+            deadline_ms (float): 帧从采集到开始推理的截止时间（毫秒），见 FrameScheduler。
+            overlay (bool): 是否在结果图像上绘制帧率和延迟。
+            parent (QObject): 父对象。
+
+        新帧通过 submit（可直接连接 MediaHandler.frameReady）放入只有一个槽位的邮箱，推理线程空闲时
+        总是取最新的一帧，推理期间到达的旧帧被替换，GUI线程不会被推理阻塞，解码、推理和绘制可以并行进行。
+        """
+        super().__init__(parent)
+        self.overlay = overlay
+        self.scheduler = FrameScheduler(deadline_ms)
+        self.fps = 0.0  # 结果帧率（指数滑动平均）
+        self._last_result = None
+        self._thread = QtCore.QThread()
+        self._worker = _InferenceWorker(self.scheduler, process_fn)
+        self._worker.moveToThread(self._thread)
+        self._wake.connect(self._worker.process)  # 跨线程的排队连接
+        self._worker.resultReady.connect(self._on_result)  # 结果回到GUI线程
+        self._thread.start()
+
+    @QtCore.Slot(object)
+    def submit(self, frame):
+        """
+        提交新采集的帧（在GUI线程中调用）。
+        """
+        self.scheduler.submit(frame)
+        self._wake.emit()
+
+    @QtCore.Slot(object, float, float)
+    def _on_result(self, image, timestamp, process_time):
+        now = time.time()
+        if self._last_result is not None and now > self._last_result:
+            fps = 1.0 / (now - self._last_result)
+            self.fps = 0.9 * self.fps + 0.1 * fps if self.fps else fps
+        self._last_result = now
+        self.scheduler.complete(timestamp)
+        if self.overlay:
+            text = "FPS %.1f | infer %.0f ms | latency %.0f ms | dropped %d" % (
+                self.fps, process_time * 1000, (now - timestamp) * 1000,
+                self.scheduler.superseded + self.scheduler.expired)
+            cv2.putText(image, text, (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 3, cv2.LINE_AA)
+            cv2.putText(image, text, (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 1, cv2.LINE_AA)
+        self.resultReady.emit(image)
+
+    def stop(self):
+        """
+        停止推理线程（等待当前帧处理完成）。
+        """
+        self._thread.quit()
+        self._thread.wait()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import time
+
+import numpy as np
+
+from YOLOv8v5Model import YOLOv8v5Detector
+
+
+class LatencyController:
+    def __init__(self, detector, target_ms=None, target_fps=None, imgsz_levels=(640, 512, 416, 320),
+                 strides=(1, 2, 3), precisions=("fp32", "bf16"), tolerance=0.15, window=10):
+        """
+        延迟预算控制器：根据实测推理用时逐级调整推理精度、输入尺寸和抽帧间隔，使实时流保持目标帧率。
+
+        Args:
+            detector (YOLOv8v5Detector): 已加载模型的检测器。
+            target_ms (float): 每帧的目标用时（毫秒）。
+            target_fps (float): 目标帧率，给出时覆盖 target_ms。
+            imgsz_levels (tuple): 候选输入尺寸，从高到低。
+            strides (tuple): 候选抽帧间隔（每几帧处理一帧），从小到大。
+            precisions (tuple): 候选推理精度，硬件不支持的精度会被去掉。
+            tolerance (float): 超过预算多少比例时降级，低于预算多少比例时尝试升级。
+            window (int): 每次调整后至少观察的帧数。
+
+        档位从高质量到低开销依次为：原精度原尺寸 -> 低精度 -> 逐级减小输入尺寸 -> 增大抽帧间隔。
+        所有档位的模型和输入尺寸在 warmup 中预先预热，切换档位不会触发冷启动。
+        """
+        self.detector = detector
+        self.model_key = detector.model_key  # 创建时的模型，模型变化后需要重新创建
+        self.target_ms = 1000.0 / target_fps if target_fps else (target_ms or 100.0)
+        self.tolerance = tolerance
+        self.window = window
+        self.variants = {"fp32": detector}  # 推理精度 -> 检测器
+        for precision in precisions:
+            if precision == "fp32" or precision in self.variants:
+                continue
+            variant = YOLOv8v5Detector(dict(detector.params, precision=precision))
+            variant.load_model(detector.model_key[0])
+            if variant.precision == precision:
+                self.variants[precision] = variant
+
+        fast = [p for p in precisions if p in self.variants and p != "fp32"]
+        low = fast[0] if fast else "fp32"
+        imgsz_levels = sorted(imgsz_levels, reverse=True)
+        self.levels = [("fp32", imgsz_levels[0], 1)]
+        self.levels += [(low, s, 1) for s in imgsz_levels if (low, s, 1) not in self.levels]
+        self.levels += [(low, imgsz_levels[-1], k) for k in sorted(strides) if k > 1]
+        self.level = 0
+        self.cost = {}  # 各档位最近的每帧用时（毫秒，已除以抽帧间隔）
+        self.baseline = {}  # 各档位预热时测得的每帧用时，用于估计其他档位在当前负载下的用时
+        self._since_change = 0
+        self._frame_no = 0
+        self.switches = 0
+
+    @property
+    def setting(self):
+        """当前档位 (推理精度, 输入尺寸, 抽帧间隔)。"""
+        return self.levels[self.level]
+
+    def warmup(self, runs=2):
+        """
+        预热所有档位的模型和输入尺寸，并记录各档位的初始用时。
+        """
+        for i, (precision, imgsz, stride) in enumerate(self.levels):
+            image = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+            for _ in range(runs):
+                t1 = time.time()
+                self.variants[precision].predict(image, imgsz=imgsz)
+            self.baseline[i] = (time.time() - t1) * 1000 / stride
+        return self
+
+    def take_frame(self):
+        """
+        按当前抽帧间隔判断本帧是否需要处理。
+
+        Returns:
+            bool: 需要处理时返回 True。
+        """
+        stride = self.setting[2]
+        self._frame_no += 1
+        return self._frame_no % stride == 0
+
+    def predict(self, img, **kwargs):
+        """
+        按当前档位推理并根据用时调整档位。
+
+        Args:
+            img (numpy.ndarray): 输入图像。
+            **kwargs: 其他推理参数，conf、iou 默认使用原检测器的参数。
+
+        Returns:
+            list: 与 YOLOv8v5Detector.predict 相同的结果。
+        """
+        precision, imgsz, stride = self.setting
+        params = {'conf': self.detector.params['conf'], 'iou': self.detector.params['iou']}
+        params.update(kwargs, imgsz=imgsz)
+        t1 = time.time()
+        pred = self.variants[precision].predict(img, **params)
+        self.update((time.time() - t1) * 1000)
+        return pred
+
+    def update(self, infer_ms):
+        """
+        记录一次推理用时并在需要时切换档位。
+
+        Args:
+            infer_ms (float): 本次推理用时（毫秒）。
+        """
+        cost = infer_ms / self.setting[2]
+        prev = self.cost.get(self.level)
+        self.cost[self.level] = cost if prev is None else 0.8 * prev + 0.2 * cost
+        self._since_change += 1
+        if self._since_change < self.window:
+            return
+
+        current = self.cost[self.level]
+        if current > self.target_ms * (1 + self.tolerance) and self.level < len(self.levels) - 1:
+            self._switch(self.level + 1)  # 超出预算，降低开销
+        elif current < self.target_ms * (1 - self.tolerance) and self.level > 0:
+            # 按当前负载（实测用时与预热用时之比）估计上一档位的用时，仍在预算内时才升级，避免来回切换
+            upper = self.level - 1
+            if upper not in self.baseline or self.level not in self.baseline:
+                self._switch(upper)
+            elif self.baseline[upper] * current / self.baseline[self.level] <= self.target_ms:
+                self._switch(upper)
+
+    def _switch(self, level):
+        self.level = level
+        self._since_change = 0
+        self.switches += 1
+
+    def status(self):
+        """
+        当前状态，用于界面显示。
+
+        Returns:
+            dict: 当前档位、每帧用时和目标用时。
+        """
+        precision, imgsz, stride = self.setting
+        return {
+            "precision": precision,
+            "imgsz": imgsz,
+            "stride": stride,
+            "ms_per_frame": round(self.cost.get(self.level, 0.0), 1),
+            "target_ms": round(self.target_ms, 1),
+            "switches": self.switches,
+        }
@@ -1,9 +1,87 @@
 import os
+import shutil
+import threading
 import time
+import uuid
+import weakref
+from array import array
+
 import cv2
+import numpy as np
 import pandas as pd
 from QtFusion.path import abs_path
 
+from DetectionExport import DetectionReader, export_detections
+from VideoExport import DEFAULT_CODEC, VideoExportJob
+
+LOG_COLUMNS = ['文件路径', '识别结果', '位置', '置信度', '用时']  # CSV日志的列
+# 内存中的列 -> (DetectionLogStore 属性, 磁盘分段中的列)，边界框另行处理
+STORE_COLUMNS = {
+    "frame": ("_frame", "frame"),
+    "timestamp": ("_timestamp", "timestamp"),
+    "source": ("_file", "source"),
+    "class_code": ("_class", "label"),
+    "class_id": ("_class_id", "class_id"),
+    "score": ("_conf", "score"),
+    "time_spent": ("_time_spent", "time_spent"),
+}
+ROW_BYTES = 52 + 3 * 8  # 每条记录占用的内存：各列共52字节，三个索引各8字节
+MIN_FREE_DISK_MB = 1024  # 磁盘剩余空间低于该值时不再写入分段，改为丢弃最早的数据
+SPILL_PREFIX = 'spill_'  # 各会话分段目录名的前缀
+
+_live_spill_dirs = set()  # 本进程中仍在使用的分段目录
+_spill_lock = threading.Lock()
+_spill_swept = False  # 本进程是否已清理过以前遗留的分段目录
+
+
+def disk_has_room(path, min_free_mb=MIN_FREE_DISK_MB):
+    """
+    判断路径所在磁盘的剩余空间是否足够写入分段。
+
+    Args:
+        path (str): 分段文件所在目录（可以尚未创建）。
+        min_free_mb (float): 需要保留的最小剩余空间（MB）。
+
+    Returns:
+        bool: 剩余空间足够时返回 True。
+    """
+    while path and not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    try:
+        return shutil.disk_usage(path or ".").free >= min_free_mb * 2 ** 20
+    except OSError:
+        return False
+
+
+def sweep_spill_dirs(base_dir):
+    """
+    删除以前的进程遗留的会话分段目录（服务重启或异常退出时没有机会清理）。
+
+    Args:
+        base_dir (str): 分段目录所在的目录（tempDir）。
+
+    Returns:
+        int: 删除的目录数量。本进程中正在使用的目录不会被删除。
+    """
+    removed = 0
+    try:
+        names = os.listdir(base_dir)
+    except OSError:
+        return 0
+    for name in names:
+        path = os.path.join(base_dir, name)
+        if name.startswith(SPILL_PREFIX) and path not in _live_spill_dirs and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def _release_spill_dir(path):
+    # 会话结束（LogTable 被回收）或进程退出时删除本会话的分段目录
+    with _spill_lock:
+        _live_spill_dirs.discard(path)
+    shutil.rmtree(path, ignore_errors=True)
+
 
 class ResultLogger:
     def __init__(self):
@@ -40,20 +118,409 @@ class ResultLogger:
         return self.results_df
 
 
+class DetectionLogStore:
+    def __init__(self, bucket_seconds=60, capacity=1024, max_rows=None, spill_dir=None):
+        """
+        列式存储的识别记录，带有类别、文件和时间段的二级索引。
+
+        Args:
+            bucket_seconds (int): 时间索引的分段长度（秒）。
+            capacity (int): 初始容量，不足时自动翻倍。
+            max_rows (int): 内存中最多保留的记录数，None 表示不限制。
+            spill_dir (str): 超出 max_rows 时较早记录写入的目录；为 None 或无法写入时较早的记录被丢弃。
+
+        每列保存在预分配的numpy数组中，追加记录为均摊O(1)；文件名和类别名只保存一次，记录中存储编号。
+        查询先通过索引得到候选行，再在候选行上向量化过滤，只有请求的那一页才会生成DataFrame。
+        内存中的记录达到上限时，最早的一半写成磁盘分段（export_detections 格式），分段以内存映射方式读取，
+        查询、分页和导出同时覆盖内存和磁盘中的记录，行号在整个会话中保持不变。
+        """
+        self.bucket_seconds = bucket_seconds
+        self.max_rows = max_rows
+        self.spill_dir = spill_dir
+        if max_rows:
+            capacity = max(1, min(capacity, max_rows))
+        self._base = 0  # 内存中第一条记录的行号，更早的记录在磁盘分段中或已被丢弃
+        self._size = 0  # 内存中的记录数
+        self.segments = []  # 磁盘分段：{"start", "end", "path", "t_min", "t_max", "reader"}，行号范围为 [start, end)
+        self.dropped = 0  # 无法写入磁盘而丢弃的记录数
+        self._timestamp = np.empty(capacity, dtype=np.float64)
+        self._frame = np.empty(capacity, dtype=np.int64)
+        self._file = np.empty(capacity, dtype=np.int32)
+        self._class = np.empty(capacity, dtype=np.int32)
+        self._class_id = np.empty(capacity, dtype=np.int32)
+        self._conf = np.empty(capacity, dtype=np.float32)
+        self._time_spent = np.empty(capacity, dtype=np.float32)
+        self._bbox = np.empty((capacity, 4), dtype=np.float32)
+        self.file_names, self._file_codes = [], {}
+        self.class_names, self._class_codes = [], {}
+        # 二级索引：编号/时间段 -> 行号（按追加顺序递增）
+        self._by_class, self._by_file, self._by_bucket = {}, {}, {}
+
+    def __len__(self):
+        return sum(s["end"] - s["start"] for s in self.segments) + self._size
+
+    @property
+    def rows_in_memory(self):
+        """内存中的记录数。"""
+        return self._size
+
+    def all_rows(self):
+        """
+        全部可读取的记录行号（磁盘分段和内存），升序。
+        """
+        parts = [np.arange(s["start"], s["end"], dtype=np.int64) for s in self.segments]
+        parts.append(np.arange(self._base, self._base + self._size, dtype=np.int64))
+        return np.concatenate(parts)
+
+    def memory_bytes(self):
+        """
+        记录和索引占用的内存（字节，按已分配的容量计算）。
+        """
+        columns = sum(getattr(self, attr).nbytes for attr, _ in STORE_COLUMNS.values()) + self._bbox.nbytes
+        indexes = sum(len(rows) * 8 for index in (self._by_class, self._by_file, self._by_bucket)
+                      for rows in index.values())
+        return columns + indexes
+
+    def disk_bytes(self):
+        """
+        磁盘分段占用的空间（字节）。
+        """
+        total = 0
+        for segment in self.segments:
+            try:
+                total += os.path.getsize(segment["path"])
+            except OSError:
+                pass
+        return total
+
+    @staticmethod
+    def _intern(value, names, codes):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(names)
+            names.append(value)
+        return code
+
+    def _resize(self, capacity):
+        for attr in [a for a, _ in STORE_COLUMNS.values()] + ["_bbox"]:
+            old = getattr(self, attr)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, attr, new)
+
+    def _grow(self):
+        capacity = 2 * len(self._timestamp)
+        if self.max_rows:
+            capacity = max(min(capacity, self.max_rows), self._size + 1)
+        self._resize(capacity)
+
+    def set_max_rows(self, max_rows):
+        """
+        调整内存中保留的记录数上限，超出的记录立即写入磁盘分段，并释放多余的容量。
+
+        Args:
+            max_rows (int): 内存中最多保留的记录数，None 表示不限制。
+        """
+        self.max_rows = max_rows
+        if not max_rows:
+            return
+        if self._size > max_rows:
+            self._spill(self._size - max_rows // 2)
+        if len(self._timestamp) > max(max_rows, self._size, 1):
+            self._resize(max(max_rows, self._size, 1))
+
+    def _spill(self, count):
+        # 将内存中最早的 count 条记录写成磁盘分段；未设置目录、磁盘空间不足或写入失败时丢弃这些记录
+        count = min(count, self._size)
+        if count <= 0:
+            return
+        start = self._base
+        try:
+            if self.spill_dir is None or not disk_has_room(self.spill_dir):
+                raise OSError("无法写入识别记录分段")
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = export_detections(self, os.path.join(self.spill_dir, "rows_%012d" % start),
+                                     rows=np.arange(start, start + count, dtype=np.int64))
+            self.segments.append({"start": start, "end": start + count, "path": path,
+                                  "t_min": float(self._timestamp[:count].min()),
+                                  "t_max": float(self._timestamp[:count].max()), "reader": None})
+        except OSError:
+            self.dropped += count
+
+        # 移出内存中的记录，索引中的行号按追加顺序递增，去掉前缀即可
+        for attr in [a for a, _ in STORE_COLUMNS.values()] + ["_bbox"]:
+            column = getattr(self, attr)
+            column[:self._size - count] = column[count:self._size]
+        self._size -= count
+        self._base += count
+        for index in (self._by_class, self._by_file, self._by_bucket):
+            for key in list(index):
+                rows = index[key]
+                del rows[:int(np.searchsorted(np.frombuffer(rows, dtype=np.int64), self._base))]
+                if not rows:
+                    del index[key]
+
+    @staticmethod
+    def _reader(segment):
+        if segment["reader"] is None:
+            segment["reader"] = DetectionReader(segment["path"])
+        return segment["reader"]
+
+    def append(self, file_path, class_name, bbox, confidence, time_spent, timestamp=None, frame_index=-1,
+               class_id=-1):
+        """
+        追加一条识别记录并更新索引。
+
+        Args:
+            file_path (str): 文件路径或视频源名称。
+            class_name (str): 识别结果（类别名称）。
+            bbox (list): 边界框 [x1, y1, x2, y2]。
+            confidence (float): 置信度。
+            time_spent (float): 用时。
+            timestamp (float): 记录时间，默认为当前时间。
+            frame_index (int): 记录所属的帧序号，-1 表示未知。
+            class_id (int): 模型输出的类别编号，-1 表示未知。
+        """
+        if self.max_rows and self._size >= self.max_rows:
+            self._spill(max(1, self.max_rows // 2))
+        if self._size == len(self._timestamp):
+            self._grow()
+        row = self._size
+        global_row = self._base + row
+        timestamp = time.time() if timestamp is None else timestamp
+        file_code = self._intern(str(file_path), self.file_names, self._file_codes)
+        class_code = self._intern(str(class_name), self.class_names, self._class_codes)
+        self._timestamp[row] = timestamp
+        self._frame[row] = frame_index
+        self._file[row] = file_code
+        self._class[row] = class_code
+        self._class_id[row] = class_id
+        self._conf[row] = confidence
+        self._time_spent[row] = time_spent
+        self._bbox[row] = bbox
+        self._by_class.setdefault(class_code, array('q')).append(global_row)
+        self._by_file.setdefault(file_code, array('q')).append(global_row)
+        self._by_bucket.setdefault(int(timestamp // self.bucket_seconds), array('q')).append(global_row)
+        self._size += 1
+
+    @staticmethod
+    def _rows(index, keys):
+        # 合并若干个索引项的行号，结果升序
+        parts = [np.frombuffer(index[k], dtype=np.int64) for k in keys if k in index and len(index[k])]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return parts[0].copy() if len(parts) == 1 else np.unique(np.concatenate(parts))
+
+    def query(self, classes=None, files=None, t_start=None, t_end=None, min_conf=None, max_conf=None):
+        """
+        查询满足条件的记录行号。
+
+        Args:
+            classes (list): 类别名称，None 表示不过滤。
+            files (list): 文件路径或视频源名称，None 表示不过滤。
+            t_start (float): 起始时间戳（含）。
+            t_end (float): 结束时间戳（含）。
+            min_conf (float): 最低置信度（含）。
+            max_conf (float): 最高置信度（含）。
+
+        Returns:
+            numpy.ndarray: 满足条件的行号，按时间先后升序。
+        """
+        parts = self._query_segments(classes, files, t_start, t_end, min_conf, max_conf)
+        candidates = []
+        if classes is not None:
+            candidates.append(self._rows(self._by_class, [self._class_codes.get(c) for c in classes]))
+        if files is not None:
+            candidates.append(self._rows(self._by_file, [self._file_codes.get(f) for f in files]))
+        if t_start is not None or t_end is not None:
+            first = int(t_start // self.bucket_seconds) if t_start is not None else None
+            last = int(t_end // self.bucket_seconds) if t_end is not None else None
+            buckets = [b for b in self._by_bucket
+                       if (first is None or b >= first) and (last is None or b <= last)]
+            candidates.append(self._rows(self._by_bucket, buckets))
+
+        if candidates:
+            # 从最小的候选集开始求交集
+            candidates.sort(key=len)
+            rows = candidates[0]
+            for other in candidates[1:]:
+                rows = np.intersect1d(rows, other, assume_unique=True)
+        else:
+            rows = np.arange(self._base, self._base + self._size, dtype=np.int64)
+
+        # 在候选行上做精确的时间和置信度过滤
+        local = rows - self._base
+        mask = np.ones(len(rows), dtype=bool)
+        if t_start is not None:
+            mask &= self._timestamp[local] >= t_start
+        if t_end is not None:
+            mask &= self._timestamp[local] <= t_end
+        if min_conf is not None:
+            mask &= self._conf[local] >= min_conf
+        if max_conf is not None:
+            mask &= self._conf[local] <= max_conf
+        parts.append(rows[mask])
+        return np.concatenate(parts)
+
+    def _query_segments(self, classes, files, t_start, t_end, min_conf, max_conf):
+        # 磁盘分段没有索引，按时间范围跳过整个分段，其余分段在内存映射的列上向量化过滤
+        parts = []
+        class_codes = [self._class_codes[c] for c in classes if c in self._class_codes] if classes is not None \
+            else None
+        file_codes = [self._file_codes[f] for f in files if f in self._file_codes] if files is not None else None
+        for segment in self.segments:
+            if (t_start is not None and segment["t_max"] < t_start) or \
+                    (t_end is not None and segment["t_min"] > t_end):
+                continue
+            reader = self._reader(segment)
+            mask = np.ones(len(reader), dtype=bool)
+            if class_codes is not None:
+                mask &= np.isin(reader["label"], class_codes)
+            if file_codes is not None:
+                mask &= np.isin(reader["source"], file_codes)
+            if t_start is not None:
+                mask &= reader["timestamp"] >= t_start
+            if t_end is not None:
+                mask &= reader["timestamp"] <= t_end
+            if min_conf is not None:
+                mask &= reader["score"] >= min_conf
+            if max_conf is not None:
+                mask &= reader["score"] <= max_conf
+            parts.append(segment["start"] + np.flatnonzero(mask))
+        return parts
+
+    def to_frame(self, rows, with_time=False):
+        """
+        将指定行生成为DataFrame。
+
+        Args:
+            rows (numpy.ndarray): 行号。
+            with_time (bool): 是否附加记录时间列。
+
+        Returns:
+            pd.DataFrame: 列与 LOG_COLUMNS 相同的表格。
+        """
+        cols = self.columns(np.asarray(rows, dtype=np.int64))
+        frame = pd.DataFrame({
+            '文件路径': [self.file_names[c] for c in cols["source"]],
+            '识别结果': [self.class_names[c] for c in cols["class_code"]],
+            '位置': [str([int(v) for v in box]) for box in cols["box"]],
+            '置信度': cols["score"].astype(float),
+            '用时': cols["time_spent"].astype(float),
+        }, columns=LOG_COLUMNS)
+        if with_time:
+            frame['时间'] = [time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t)) for t in cols["timestamp"]]
+        return frame
+
+    def page(self, rows, page=0, page_size=50):
+        """
+        生成查询结果中的一页（最新的记录在前），只生成该页的数据。
+
+        Returns:
+            pd.DataFrame: 该页的记录。
+        """
+        end = len(rows) - page * page_size
+        start = max(0, end - page_size)
+        return self.to_frame(rows[start:max(0, end)][::-1], with_time=True)
+
+    def columns(self, rows=None):
+        """
+        获取指定行的原始列数据，用于二进制导出。
+
+        Args:
+            rows (numpy.ndarray): 行号，None 表示全部记录（包括磁盘分段）。
+
+        Returns:
+            dict: 列名 -> numpy数组；source 与 class_code 为 file_names、class_names 中的下标。
+        """
+        if rows is None and not self.segments:
+            index = slice(0, self._size)
+        else:
+            rows = self.all_rows() if rows is None else np.asarray(rows, dtype=np.int64)
+            index = rows - self._base
+            if len(rows) and index.min() < 0:
+                return self._gather(rows)
+        cols = {name: getattr(self, attr)[index] for name, (attr, _) in STORE_COLUMNS.items()}
+        cols["box"] = self._bbox[index]
+        return cols
+
+    def _gather(self, rows):
+        # 从内存和磁盘分段中按行号取出各列
+        cols = {name: np.empty(len(rows), dtype=getattr(self, attr).dtype)
+                for name, (attr, _) in STORE_COLUMNS.items()}
+        cols["box"] = np.empty((len(rows), 4), dtype=self._bbox.dtype)
+        in_memory = rows >= self._base
+        if in_memory.any():
+            local = rows[in_memory] - self._base
+            for name, (attr, _) in STORE_COLUMNS.items():
+                cols[name][in_memory] = getattr(self, attr)[local]
+            cols["box"][in_memory] = self._bbox[local]
+        for segment in self.segments:
+            mask = (rows >= segment["start"]) & (rows < segment["end"])
+            if not mask.any():
+                continue
+            reader = self._reader(segment)
+            local = rows[mask] - segment["start"]
+            for name, (_, key) in STORE_COLUMNS.items():
+                cols[name][mask] = reader[key][local]
+            cols["box"][mask] = np.stack([reader[k][local] for k in ("x1", "y1", "x2", "y2")], axis=1)
+        return cols
+
+    def clear(self):
+        """清空所有记录、索引和磁盘分段。"""
+        for segment in self.segments:
+            if segment["reader"] is not None:
+                segment["reader"].close()
+            try:
+                os.remove(segment["path"])
+            except OSError:
+                pass
+        self.__init__(self.bucket_seconds, max_rows=self.max_rows, spill_dir=self.spill_dir)
+
+
 class LogTable:
-    def __init__(self, csv_file_path=None):
+    def __init__(self, csv_file_path=None, max_log_mb=64, max_frame_mb=512):
         """
         初始化类实例。
 
         Args:
             csv_file_path (str): 保存初始数据的CSV文件路径。
+            max_log_mb (float): 识别记录占用内存的上限（MB），None 表示不限制。
+            max_frame_mb (float): 识别画面占用内存的上限（MB），None 表示不限制。
+
+        超出上限后，较早的识别记录和识别画面写入 tempDir 下本会话的分段目录，仍可查询和导出；
+        磁盘空间不足时改为丢弃最早的数据并计数，长时间运行不会耗尽内存。
         """
         self.csv_file_path = csv_file_path
         self.saved_images = []
         self.saved_images_ini = []
         self.saved_results = []
+        # 本会话的分段目录
+        self.spill_dir = abs_path('tempDir/' + SPILL_PREFIX + uuid.uuid4().hex[:12], path_type="current")
+        global _spill_swept
+        with _spill_lock:
+            if not _spill_swept:
+                sweep_spill_dirs(os.path.dirname(self.spill_dir))  # 进程内第一个会话启动时清理遗留的分段
+                _spill_swept = True
+            _live_spill_dirs.add(self.spill_dir)
+        # 会话结束后 session_state 中的 LogTable 被回收时删除分段目录，进程退出时也会执行
+        self._spill_finalizer = weakref.finalize(self, _release_spill_dir, self.spill_dir)
+        self.store = DetectionLogStore(spill_dir=os.path.join(self.spill_dir, 'rows'))  # 带索引的列式识别记录
+        self.frame_index = 0  # 当前帧的序号，写入识别记录用于按帧回放
+        self.frame_segments = []  # 写入磁盘的识别画面分段：(文件路径, 帧数)
+        self.frames_spilled = 0  # 写入磁盘的帧数
+        self.frames_dropped = 0  # 无法写入磁盘而丢弃的帧数
+        self._frame_bytes = 0  # 内存中画面占用的字节数
+        self.max_frame_bytes = None
+        self.source_fps = None  # 视频源的帧率（视频文件），未知时按画面实际的记录速度导出
+        self._frame_times = None  # 第一帧和最近一帧的记录时间
+        self._frames_added = 0  # 记录过的帧数（包括已写入磁盘或丢弃的帧）
+        self._segment_seq = 0  # 下一个画面分段的编号
+        self._export_jobs = []  # 导出任务，运行期间不删除它们读取的画面分段
+        self._stale_segments = []  # 已清空但等待导出任务结束后删除的画面分段
+        self.set_budget(max_log_mb, max_frame_mb)
 
-        columns = ['文件路径', '识别结果', '位置', '置信度', '用时']
+        columns = LOG_COLUMNS
 
         # 尝试从CSV文件加载数据，如果失败则创建一个空的DataFrame
         try:
@@ -62,45 +529,193 @@ class LogTable:
                 # 如果文件不存在，创建一个带有初始表头的空DataFrame并保存为CSV文件
                 empty_df = pd.DataFrame(columns=columns)
                 empty_df.to_csv(csv_file_path, index=False, header=True)
-
-            self.data = pd.DataFrame(columns=columns)
             # self.data = pd.read_csv(csv_file_path, encoding='utf-8')
         except (FileNotFoundError, pd.errors.EmptyDataError):
-            columns = ['文件路径', '识别结果', '位置', '置信度', '用时']
-            self.data = pd.DataFrame(columns=columns)
+            pass
+
+    @property
+    def data(self):
+        """
+        全部识别记录的DataFrame（最新的记录在前），每次访问时生成。
+        """
+        return self.store.to_frame(self.store.all_rows()[::-1])
+
+    def set_budget(self, max_log_mb=None, max_frame_mb=None):
+        """
+        设置识别记录和识别画面的内存上限，已超出的部分立即写入磁盘。
+
+        Args:
+            max_log_mb (float): 识别记录占用内存的上限（MB），None 表示不限制。
+            max_frame_mb (float): 识别画面占用内存的上限（MB），None 表示不限制。
+        """
+        self.store.set_max_rows(max(1, int(max_log_mb * 2 ** 20 // ROW_BYTES)) if max_log_mb else None)
+        self.max_frame_bytes = int(max_frame_mb * 2 ** 20) if max_frame_mb else None
+        self._enforce_frame_budget()
 
     def add_frames(self, image, detInfo, img_ini):
         self.saved_images.append(image)
         self.saved_images_ini.append(img_ini)
         self.saved_results = detInfo
+        self.frame_index += 1
+        now = time.time()
+        self._frame_times = (self._frame_times[0] if self._frame_times else now, now)
+        self._frames_added += 1
+        self._frame_bytes += image.nbytes + img_ini.nbytes
+        self._enforce_frame_budget()
+
+    def _enforce_frame_budget(self):
+        # 超出内存上限时将较早的一半画面写入磁盘，始终保留最近一帧用于显示
+        while self.max_frame_bytes and self._frame_bytes > self.max_frame_bytes and len(self.saved_images) > 1:
+            self._spill_frames(len(self.saved_images) // 2)
+
+    def _spill_frames(self, count):
+        # 识别画面写成MJPG视频分段；原始画面只用于显示最近一帧，直接释放
+        chunk = self.saved_images[:count]
+        path = os.path.join(self.spill_dir, 'frames_%08d.avi' % self._segment_seq)
+        self._segment_seq += 1  # 分段编号在清空画面后也不重复，正在导出的旧分段不会被覆盖
+        out = None
+        try:
+            if not disk_has_room(self.spill_dir):
+                raise OSError("磁盘空间不足")
+            os.makedirs(self.spill_dir, exist_ok=True)
+            height, width = chunk[0].shape[:2]
+            out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (width, height))
+            if not out.isOpened():
+                raise OSError("无法写入画面分段：" + path)
+            for img in chunk:
+                out.write(img if img.shape[:2] == (height, width) else cv2.resize(img, (width, height)))
+            self.frame_segments.append((path, count))
+            self.frames_spilled += count
+        except (OSError, cv2.error):
+            self.frames_dropped += count
+        finally:
+            if out is not None:
+                out.release()
+        del self.saved_images[:count]
+        del self.saved_images_ini[:count]
+        self._frame_bytes = sum(a.nbytes + b.nbytes for a, b in zip(self.saved_images, self.saved_images_ini))
+
+    def iter_frames(self):
+        """
+        按顺序遍历全部识别画面（先读取磁盘分段，再遍历内存中的画面）。
+
+        画面列表在调用时复制，之后继续记录、写入磁盘或清空画面都不影响遍历，可以在其他线程中使用。
+        """
+        return self._iter_frames(list(self.frame_segments), list(self.saved_images))
+
+    @staticmethod
+    def _iter_frames(segments, images):
+        for path, _ in segments:
+            cap = cv2.VideoCapture(path)
+            try:
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    yield frame
+            finally:
+                cap.release()
+        yield from images
 
     def clear_frames(self):
         self.saved_images = []
         self.saved_images_ini = []
         self.saved_results = []
+        self._stale_segments += [path for path, _ in self.frame_segments]
+        self._remove_stale_segments()
+        self.frame_segments = []
+        self.frames_spilled = 0
+        self.frames_dropped = 0
+        self._frame_bytes = 0
+        self.source_fps = None
+        self._frame_times = None
+        self._frames_added = 0
 
-    def save_frames_file(self):
-        if self.saved_images:  # 检查列表是否不为空
-            # 执行保存操作
-            now_time = time.strftime('%Y-%m-%d-%H-%M-%S', time.localtime(time.time()))
-            if len(self.saved_images) == 1:
-                # 只有一张图像时，保存为图片
-                file_name = abs_path('tempDir/pic_' + str(now_time) + '.png', path_type="current")
-                cv2.imwrite(file_name, self.saved_images[0])
-                return file_name
-            else:
-                # 为图像序列时，保存为视频
-                height, width, layers = self.saved_images[0].shape
-                size = (width, height)
-                file_name = abs_path('tempDir/video_' + str(now_time) + '.avi', path_type="current")
-                out = cv2.VideoWriter(file_name, cv2.VideoWriter_fourcc(*'DIVX'), 30, size)
-                for img in self.saved_images:
-                    out.write(img)
-                out.release()
-                return file_name
-        return False
+    def _remove_stale_segments(self):
+        # 没有正在运行的导出任务时删除已清空的画面分段
+        self._export_jobs = [job for job in self._export_jobs if not job.done]
+        if self._export_jobs:
+            return
+        for path in self._stale_segments:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._stale_segments = []
+
+    def frame_fps(self, default=30.0):
+        """
+        导出视频使用的帧率：视频文件使用源帧率，摄像头等实时源使用画面实际的记录速度，使回放速度与实际一致。
+        """
+        if self.source_fps:
+            return float(self.source_fps)
+        if self._frame_times and self._frames_added > 1 and self._frame_times[1] > self._frame_times[0]:
+            return (self._frames_added - 1) / (self._frame_times[1] - self._frame_times[0])
+        return default
+
+    def export_frames(self, codec=DEFAULT_CODEC, scale=1.0, fps=None):
+        """
+        在后台线程中导出全部识别画面（包括写入磁盘的画面），只有一帧时保存为图片。
+
+        Args:
+            codec (str): VideoExport.CODECS 中的格式名称。
+            scale (float): 输出尺寸相对于画面尺寸的比例。
+            fps (float): 输出帧率，默认由 frame_fps 确定。
+
+        Returns:
+            VideoExportJob: 已启动的导出任务；没有画面时返回 None。
+        """
+        total = self.frames_spilled + len(self.saved_images)
+        if not total:  # 检查是否有识别画面
+            return None
+        now_time = time.strftime('%Y-%m-%d-%H-%M-%S', time.localtime(time.time()))
+        prefix = 'tempDir/pic_' if total == 1 else 'tempDir/video_'
+        job = VideoExportJob(self.iter_frames(), total, abs_path(prefix + str(now_time), path_type="current"),
+                             codec, scale, fps or self.frame_fps())
+        job.start()
+        self._export_jobs.append(job)
+        self._remove_stale_segments()
+        return job
+
+    def save_frames_file(self, codec=DEFAULT_CODEC, scale=1.0, fps=None):
+        """
+        同步导出识别画面，等待 export_frames 的任务完成。
+
+        Returns:
+            str: 导出的文件路径；没有画面或导出失败时返回 False。
+        """
+        job = self.export_frames(codec, scale, fps)
+        if job is None:
+            return False
+        job.join()
+        return job.path if job.error is None else False
 
-    def add_log_entry(self, file_path, recognition_result, position, confidence, time_spent):
+    def memory_usage(self):
+        """
+        识别记录和识别画面的内存及磁盘占用，用于界面显示。
+
+        Returns:
+            dict: 内存/磁盘中的记录数和帧数、占用字节数以及因磁盘不可写而丢弃的数量。
+        """
+        frame_disk = 0
+        for path, _ in self.frame_segments:
+            try:
+                frame_disk += os.path.getsize(path)
+            except OSError:
+                pass
+        return {
+            "log_rows": self.store.rows_in_memory,
+            "log_rows_on_disk": len(self.store) - self.store.rows_in_memory,
+            "log_bytes": self.store.memory_bytes(),
+            "frames": len(self.saved_images),
+            "frames_on_disk": self.frames_spilled,
+            "frame_bytes": self._frame_bytes,
+            "disk_bytes": self.store.disk_bytes() + frame_disk,
+            "dropped_rows": self.store.dropped,
+            "dropped_frames": self.frames_dropped,
+        }
+
+    def add_log_entry(self, file_path, recognition_result, position, confidence, time_spent, class_id=-1):
         """
         向日志中添加一条新记录。
 
@@ -110,45 +725,56 @@ class LogTable:
             position (str): 位置
             confidence (float): 置信度
             time_spent (float): 用时（通常是秒或毫秒）
+            class_id (int): 类别编号
 
         Returns:
             None
         """
-        # 创建新的数据行
-        position_str = str(position)
-        file_path = str(file_path)
-        new_entry = pd.DataFrame([[file_path, recognition_result, position_str, confidence, time_spent]],
-                                 columns=['文件路径', '识别结果', '位置', '置信度', '用时'])
+        # 追加到列式存储，不再每条记录复制整个DataFrame
+        self.store.append(file_path, recognition_result, position, confidence, time_spent,
+                          frame_index=self.frame_index, class_id=class_id)
 
-        # 将新行添加到DataFrame中
-        self.data = pd.concat([new_entry, self.data]).reset_index(drop=True)
+    def clear_data(self):
+        self.store.clear()
+        self.frame_index = 0
 
-        return self.data
+    def save_detections(self, class_names=None):
+        """
+        将本次会话的识别记录导出为二进制列式文件（Arrow IPC，无pyarrow时为NPZ）。
 
-    def clear_data(self):
-        columns = ['文件路径', '识别结果', '位置', '置信度', '用时']
-        self.data = pd.DataFrame(columns=columns)
+        Args:
+            class_names (list): 模型的类别名称，按类别编号排列。
+
+        Returns:
+            str: 导出的文件路径；没有记录时返回 False。
+        """
+        if not len(self.store):
+            return False
+        now_time = time.strftime('%Y-%m-%d-%H-%M-%S', time.localtime(time.time()))
+        file_name = abs_path('tempDir/detections_' + str(now_time), path_type="current")
+        return export_detections(self.store, file_name, class_names)
 
-    def save_to_csv(self):
-        # 将更新后的DataFrame保存到CSV文件
-        self.data.to_csv(self.csv_file_path, index=False, encoding='utf-8', mode='a', header=False)
+    def save_to_csv(self, chunk_rows=100000):
+        # 将识别记录分块追加到CSV文件（最新的记录在前），包括磁盘分段中的记录，不会一次生成全部数据
+        rows = self.store.all_rows()[::-1]
+        for start in range(0, len(rows), chunk_rows):
+            self.store.to_frame(rows[start:start + chunk_rows]).to_csv(self.csv_file_path, index=False,
+                                                                      encoding='utf-8', mode='a', header=False)
 
-    def update_table(self, log_table_placeholder):
+    def update_table(self, log_table_placeholder, query=None, page=0, page_size=50):
         """
-        更新表格，显示最新的500条记录。
+        更新表格，分页显示满足查询条件的记录（最新的记录在前）。
 
         Args:
             log_table_placeholder: Streamlit的表格占位符
+            query (dict): 传给 DetectionLogStore.query 的过滤条件，None 表示显示全部记录。
+            page (int): 页码（从0开始）。
+            page_size (int): 每页记录数。
 
         Returns:
-            None
+            int: 满足条件的记录总数。
         """
-        # 判断DataFrame的长度是否超过500
-        if len(self.data) > 500:
-            # 如果超过500，仅显示最新的500条记录
-            display_data = self.data.head(500)
-        else:
-            # 如果不超过，显示全部数据
-            display_data = self.data
-
-        log_table_placeholder.table(display_data)
\ No newline at end of file
+        rows = self.store.query(**(query or {}))
+        log_table_placeholder.dataframe(self.store.page(rows, page, page_size), hide_index=True,
+                                        use_container_width=True)
+        return len(rows)
\ No newline at end of file
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2  # 导入OpenCV库，用于解码图像和视频
+import numpy as np
+from QtFusion.path import abs_path
+
+CHUNK_SIZE = 8 * 1024 * 1024  # 每次写入磁盘的块大小（8MB）
+
+
+def _upload_buffer(uploaded_file):
+    """
+    获取上传文件的底层缓冲区视图。
+
+    Args:
+        uploaded_file (UploadedFile): 通过Streamlit上传的文件（BytesIO子类）。
+
+    Returns:
+        memoryview: 不复制数据的只读视图；不支持getbuffer时返回读取到的字节。
+    """
+    if hasattr(uploaded_file, "getbuffer"):
+        return uploaded_file.getbuffer()  # BytesIO内部缓冲区的视图，不发生复制
+    uploaded_file.seek(0)
+    return memoryview(uploaded_file.read())
+
+
+def decode_image(uploaded_file, flags=cv2.IMREAD_COLOR):
+    """
+    直接从上传缓冲区解码图片。
+
+    Args:
+        uploaded_file (UploadedFile): 上传的图片文件。
+        flags (int): cv2.imdecode 的读取标志。
+
+    Returns:
+        numpy.ndarray: 解码后的BGR图像，解码失败（包括空文件）时返回None。
+
+    通过 np.frombuffer 共享上传缓冲区的内存，避免 bytearray 与 np.asarray 造成的两次复制。
+    """
+    buffer = _upload_buffer(uploaded_file)
+    file_bytes = np.frombuffer(buffer, dtype=np.uint8)
+    try:
+        image = cv2.imdecode(file_bytes, flags)
+    except cv2.error:
+        image = None  # 空文件等无法解析的数据会抛出异常，与其他解码失败一样返回None
+    # 先释放数组再释放视图，否则BytesIO在视图存在期间无法被写入或关闭
+    del file_bytes
+    buffer.release()
+    return image
+
+
+def decode_images(uploaded_files, batch_size=8, workers=None, prefetch=1):
+    """
+    在线程池中解码多张上传图片，按批次依次产出。
+
+    Args:
+        uploaded_files (list): 上传的图片文件列表。
+        batch_size (int): 每批的图片数。
+        workers (int): 解码线程数，默认为逻辑核心数（最多8个）。
+        prefetch (int): 调用方处理当前批次时提前解码的批次数。
+
+    Yields:
+        list: 一个批次的 (上传文件, 图像) 列表，顺序与上传顺序相同，解码失败的图像为 None。
+
+    cv2.imdecode 执行时释放GIL，多个线程可以同时解码；只提前解码有限的批次，内存中的解码结果有上限。
+    """
+    workers = workers or min(8, os.cpu_count() or 1)
+    batches = [uploaded_files[i:i + batch_size] for i in range(0, len(uploaded_files), batch_size)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append([(f, executor.submit(decode_image, f)) for f in batch])
+            if len(pending) > prefetch:
+                yield [(f, future.result()) for f, future in pending.popleft()]
+        while pending:
+            yield [(f, future.result()) for f, future in pending.popleft()]
+
+
+class UploadSpooler:
+    def __init__(self, uploaded_file, suffix=None, chunk_size=CHUNK_SIZE, base_path=None):
+        """
+        将上传文件分块写入磁盘的后台写入器。
+
+        Args:
+            uploaded_file (UploadedFile): 通过Streamlit上传的文件。
+            suffix (str): 临时文件后缀，默认沿用上传文件的扩展名。
+            chunk_size (int): 每次写入的字节数。
+            base_path (str): 临时文件所在目录，默认为 tempDir。
+
+        Streamlit 的 UploadedFile 已完整保存在内存中，分块写入不会降低内存占用，
+        作用是避免 read() 再复制一份数据，并让解码与写入磁盘同时进行，尽早得到第一帧结果。
+        """
+        self.uploaded_file = uploaded_file
+        self.chunk_size = chunk_size
+        self.total_size = getattr(uploaded_file, "size", None)
+        if self.total_size is None:
+            self.total_size = len(_upload_buffer(uploaded_file))
+
+        base_path = base_path or abs_path("tempDir", path_type="current")
+        os.makedirs(base_path, exist_ok=True)
+        if suffix is None:
+            suffix = os.path.splitext(getattr(uploaded_file, "name", ""))[1]
+        fd, self.path = tempfile.mkstemp(suffix=suffix, prefix="upload_", dir=base_path)
+        os.close(fd)
+
+        self.written = 0  # 已写入磁盘的字节数
+        self.error = None  # 写入过程中出现的异常
+        self._properties = None  # 写入完成后读取的 (总帧数, 帧率)
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._spool, daemon=True)
+
+    def start(self):
+        """
+        启动后台写入线程。
+
+        Returns:
+            UploadSpooler: 返回自身，便于链式调用。
+        """
+        self._thread.start()
+        return self
+
+    def _spool(self):
+        buffer = _upload_buffer(self.uploaded_file)
+        try:
+            with open(self.path, "wb") as f:
+                for offset in range(0, self.total_size, self.chunk_size):
+                    f.write(buffer[offset:offset + self.chunk_size])  # 切片视图不复制数据
+                    f.flush()  # 让其他读取者（包括子进程）及时看到新写入的数据
+                    with self._cond:
+                        self.written = min(offset + self.chunk_size, self.total_size)
+                        self._cond.notify_all()
+        except OSError as e:
+            self.error = e
+        finally:
+            buffer.release()
+            with self._cond:
+                self._cond.notify_all()
+
+    @property
+    def done(self):
+        """写入是否已经结束（成功或失败）。"""
+        return not self._thread.is_alive() and (self.error is not None or self.written >= self.total_size)
+
+    def wait_for(self, nbytes, timeout=None):
+        """
+        等待至少 nbytes 字节写入磁盘。
+
+        Args:
+            nbytes (int): 需要等待的字节数。
+            timeout (float): 最长等待时间（秒），None 表示一直等待。
+
+        Returns:
+            bool: 是否已写入足够的数据。
+        """
+        nbytes = min(nbytes, self.total_size)
+        with self._cond:
+            self._cond.wait_for(lambda: self.written >= nbytes or self.error is not None
+                                or not self._thread.is_alive(), timeout)
+            return self.written >= nbytes
+
+    def video_properties(self):
+        """
+        写入完成后从完整的文件读取视频的总帧数和帧率。
+
+        文件未写完时读到的值不可靠（索引位于文件末尾的MP4读到 0），因此只在写入完成后读取一次。
+
+        Returns:
+            tuple: (总帧数, 帧率)；尚未写完或写入失败时返回 None。
+        """
+        if self._properties is None and self.done and self.error is None:
+            cap = cv2.VideoCapture(self.path)
+            try:
+                self._properties = (int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS))
+            finally:
+                cap.release()
+        return self._properties
+
+    def close(self):
+        """
+        等待写入线程结束并删除临时文件。
+        """
+        if self._thread.is_alive():
+            self._thread.join()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class GrowingFileCapture:
+    def __init__(self, path, total_size, poll_interval=0.05, stall_timeout=10.0):
+        """
+        读取仍在写入中的视频文件。
+
+        Args:
+            path (str): 视频文件路径。
+            total_size (int): 文件写入完成后的总字节数。
+            poll_interval (float): 等待新数据时的轮询间隔（秒）。
+            stall_timeout (float): 文件大小超过该时间（秒）不再增长时，视为写入已结束。
+
+        读到当前已写入数据的末尾时，如果文件尚未写完，则等待新数据后重新打开并定位到下一帧，
+        因此在上传仍在落盘时即可开始解码。对于索引（moov）位于文件末尾的MP4，只能在写入完成后打开。
+        """
+        self.path = path
+        self.total_size = total_size
+        self.poll_interval = poll_interval
+        self.stall_timeout = stall_timeout
+        self._last_size = -1
+        self._last_growth = time.time()
+        self.frame_index = 0  # 下一次读取的帧序号
+        self.cap = None
+        self._pending = None  # 预读的下一帧
+        self._opened_complete = False  # 打开时文件是否已写入完成
+        self._reopen()
+        while not self.cap.isOpened() and not self._opened_complete:
+            time.sleep(self.poll_interval)
+            self._reopen()
+
+    def complete(self):
+        """
+        文件是否已经写入完成。
+        """
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size != self._last_size:
+            self._last_size = size
+            self._last_growth = time.time()
+        # 写入方异常退出时文件不再增长，超时后按已写入的内容处理，避免无限等待
+        return size >= self.total_size or time.time() - self._last_growth > self.stall_timeout
+
+    def _reopen(self):
+        if self.cap is not None:
+            self.cap.release()
+        self._pending = None
+        self._opened_complete = self.complete()  # 必须在打开之前判断，避免遗漏打开后才写入的数据
+        self.cap = cv2.VideoCapture(self.path)
+        if self.frame_index > 0 and self.cap.isOpened():
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.frame_index)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def get(self, prop_id):
+        return self.cap.get(prop_id)
+
+    def read(self):
+        """
+        读取下一帧。
+
+        Returns:
+            tuple: (ret, frame)，与 cv2.VideoCapture.read 一致。
+
+        文件未写完时预读下一帧：只有后一帧也能读出，当前帧才被认为是完整的，避免返回被截断的画面。
+        """
+        while True:
+            if self._pending is not None:
+                ret, frame, self._pending = True, self._pending, None
+            else:
+                ret, frame = self.cap.read()
+            if ret and not self._opened_complete:
+                ret_next, frame_next = self.cap.read()
+                if ret_next:
+                    self._pending = frame_next
+                else:
+                    ret = False  # 当前帧可能尚未完整写入，等待更多数据后重新读取
+            if ret or self._opened_complete:
+                break
+            last_size = self._last_size
+            time.sleep(self.poll_interval)
+            if not self.complete() and self._last_size == last_size:
+                continue  # 没有新数据时不必重新打开
+            self._reopen()
+        if ret:
+            self.frame_index += 1
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import time
+import tracemalloc
+
+import cv2  # 导入OpenCV库，用于读取和缩放测试图像
+import numpy as np
+
+from DatasetCache import CachedDetectionValidator, DatasetCache, img2label_path
+from DisplayThrottle import DISPLAY_SIZE
+from FrameContext import FrameBufferPool, FrameContext, INFER_SIZE
+from RegressionReplay import match_detections
+from YOLOv8v5Model import PRECISIONS, YOLOv8v5Detector, ini_params
+
+BACKENDS = ("pytorch", "onnx")  # 支持比较的推理后端
+
+
+def pareto_front(results, cost="latency_ms", score="mAP50-95"):
+    """
+    标记精度-延迟的帕累托最优配置。
+
+    Args:
+        results (list): 测试结果列表，每项为字典。
+        cost (str): 越小越好的指标（如延迟）。
+        score (str): 越大越好的指标（如mAP）。
+
+    Returns:
+        list: 帕累托最优的结果，按 cost 升序排列；同时为每项结果写入 pareto 字段。
+    """
+    candidates = [r for r in results if r.get(cost) is not None and r.get(score) is not None]
+    front, best = [], -np.inf
+    for r in sorted(candidates, key=lambda r: (r[cost], -r[score])):
+        r["pareto"] = r[score] > best
+        if r["pareto"]:
+            front.append(r)
+            best = r[score]
+    return front
+
+
+def precision_deltas(results, baseline="fp32"):
+    """
+    计算各精度相对于基准精度的加速比和mAP变化，写入每项结果。
+
+    Args:
+        results (list): 测试结果列表。
+        baseline (str): 基准精度。
+
+    Returns:
+        list: 传入的结果列表，非基准精度的结果增加 speedup_vs_<baseline> 和 mAP50-95_delta_vs_<baseline> 字段。
+    """
+    base = {(r["weights"], r["backend"], r["imgsz"], r["batch"]): r
+            for r in results if r.get("precision", baseline) == baseline}
+    for r in results:
+        ref = base.get((r["weights"], r["backend"], r["imgsz"], r["batch"]))
+        if ref is None or r is ref:
+            continue
+        r["speedup_vs_" + baseline] = round(ref["latency_ms"] / r["latency_ms"], 3) if r["latency_ms"] else None
+        if r.get("mAP50-95") is not None and ref.get("mAP50-95") is not None:
+            r["mAP50-95_delta_vs_" + baseline] = round(r["mAP50-95"] - ref["mAP50-95"], 4)
+    return results
+
+
+def _read_labels(image_path, shape):
+    # YOLO格式的标注（类别, 归一化的中心坐标和宽高）转为像素坐标的 xyxy 检测框
+    label_path = img2label_path(image_path)
+    rows = np.zeros((0, 5), dtype=np.float64)
+    if os.path.exists(label_path):
+        with open(label_path, encoding="utf-8") as f:
+            values = [line.split()[:5] for line in f if len(line.split()) >= 5]
+        if values:
+            rows = np.array(values, dtype=np.float64)
+    h, w = shape[:2]
+    xy, wh = rows[:, 1:3] * (w, h), rows[:, 3:5] * (w, h)
+    return {"box": np.hstack([xy - wh / 2, xy + wh / 2]), "class_id": rows[:, 0].astype(np.int64),
+            "score": np.ones(len(rows))}
+
+
+def _result_arrays(res):
+    # ultralytics Results 转为匹配用的数组
+    boxes = res.boxes
+    return {"box": boxes.xyxy.cpu().numpy().astype(np.float64), "class_id": boxes.cls.cpu().numpy().astype(np.int64),
+            "score": boxes.conf.cpu().numpy().astype(np.float64)}
+
+
+def evaluate_cascade(cascade, data_path, split="val", max_images=None, iou_threshold=0.5):
+    """
+    在数据集上比较级联推理与轻量模型、复检模型单独推理的精度和用时，重点关注模糊目标。
+
+    Args:
+        cascade (CascadeDetector): 已加载轻量模型和复检模型的级联检测器，使用其当前的 conf/iou 参数。
+        data_path (str): 数据集yaml文件路径。
+        split (str): 使用的数据集划分。
+        max_images (int): 最多使用的图像数，None 表示全部。
+        iou_threshold (float): 检测框与标注视为同一目标的最小IoU（同时要求类别相同）。
+
+    Returns:
+        dict: light、heavy、cascade 三种方式各自的全部目标召回率、模糊目标召回率、精确率和平均每帧用时（毫秒），
+            以及 images、objects、ambiguous（模糊目标数）和 escalation_rate（级联的复检比例）。
+
+    模糊目标是轻量模型在不确定区间下限的阈值下漏检，或匹配到的检测框置信度低于区间上限的标注目标，
+    即级联推理需要依靠复检才能识别的目标。
+    """
+    files = DatasetCache(data_path).split_files(split)[:max_images]
+    conf = cascade.params["conf"]
+    heavy_kwargs = {"imgsz": cascade.heavy_imgsz} if cascade.heavy_imgsz else {}
+    counts = {name: {"matched": 0, "ambiguous_matched": 0, "detections": 0, "time": 0.0}
+              for name in ("light", "heavy", "cascade")}
+    objects = ambiguous = images = 0
+    cascade.reset_stats()
+    for f in files:
+        image = cv2.imdecode(np.fromfile(f, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            continue
+        images += 1
+        truth = _read_labels(f, image.shape)
+        t1 = time.perf_counter()
+        light = _result_arrays(YOLOv8v5Detector.predict(cascade, image, conf=min(conf, cascade.band[0]))[0])
+        t2 = time.perf_counter()
+        heavy = _result_arrays(YOLOv8v5Detector.predict(cascade.heavy, image, **heavy_kwargs)[0])
+        t3 = time.perf_counter()
+        combined = _result_arrays(cascade.predict(image)[0])
+        t4 = time.perf_counter()
+
+        # 轻量模型在区间下限阈值下的最佳匹配置信度决定标注目标是否模糊
+        best = np.zeros(len(truth["score"]))
+        for i, j, _ in match_detections(truth, light, iou_threshold):
+            best[i] = light["score"][j]
+        is_ambiguous = best < cascade.band[1]
+        objects += len(best)
+        ambiguous += int(is_ambiguous.sum())
+
+        keep = light["score"] > conf  # 轻量模型单独使用时按原阈值过滤
+        light = {k: v[keep] for k, v in light.items()}
+        for name, det, elapsed in (("light", light, t2 - t1), ("heavy", heavy, t3 - t2),
+                                   ("cascade", combined, t4 - t3)):
+            matched = [i for i, _, _ in match_detections(truth, det, iou_threshold)]
+            counts[name]["matched"] += len(matched)
+            counts[name]["ambiguous_matched"] += int(is_ambiguous[matched].sum())
+            counts[name]["detections"] += len(det["score"])
+            counts[name]["time"] += elapsed
+
+    report = {"images": images, "objects": objects, "ambiguous": ambiguous,
+              "escalation_rate": round(cascade.stats()["escalation_rate"], 4)}
+    for name, c in counts.items():
+        report[name] = {
+            "recall": round(c["matched"] / objects, 4) if objects else None,
+            "ambiguous_recall": round(c["ambiguous_matched"] / ambiguous, 4) if ambiguous else None,
+            "precision": round(c["matched"] / c["detections"], 4) if c["detections"] else None,
+            "ms_per_frame": round(c["time"] / images * 1000, 2) if images else None,
+        }
+    return report
+
+
+def weight_label(weight):
+    """
+    生成权重的简短名称：训练得到的 best.pt/last.pt 使用训练任务名，其余使用文件名。
+    """
+    name = os.path.splitext(os.path.basename(weight))[0]
+    if name in ("best", "last"):
+        return os.path.basename(os.path.dirname(os.path.dirname(weight))) + "/" + name
+    return name
+
+
+def load_sample_frames(data_path=None, video_path=None, num_frames=32):
+    """
+    加载用于测量延迟的样本图像：优先使用验证集图像，否则从视频中截取帧。
+
+    Args:
+        data_path (str): 数据集yaml文件路径。
+        video_path (str): 备用的视频文件路径。
+        num_frames (int): 样本数量。
+
+    Returns:
+        list: BGR图像列表。
+    """
+    frames = []
+    if data_path and os.path.exists(data_path):
+        for f in DatasetCache(data_path).split_files("val")[:num_frames]:
+            image = cv2.imdecode(np.fromfile(f, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is not None:
+                frames.append(image)
+    if not frames and video_path:
+        cap = cv2.VideoCapture(video_path)
+        while len(frames) < num_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    return frames
+
+
+def _legacy_frame_path(frame):
+    # 改造前的逐帧处理：推理缩放、两次显示缩放和一次日志缩放，每次都分配新图像
+    image = cv2.resize(frame, INFER_SIZE)
+    display_image = cv2.resize(image, DISPLAY_SIZE)
+    display_frame = cv2.resize(frame, DISPLAY_SIZE)
+    log_frame = cv2.resize(frame, INFER_SIZE)
+    return image, log_frame
+
+
+def _context_frame_path(frame, pool):
+    # 使用 FrameContext：每种分辨率只缩放一次，临时图像写入复用的缓冲区，只复制需要保留的图像
+    ctx = FrameContext(frame, pool)
+    ctx.resized(INFER_SIZE)  # 推理输入
+    image = ctx.canvas(INFER_SIZE)
+    ctx.display(image)
+    ctx.display()
+    log_frame = ctx.copy(INFER_SIZE)
+    return image, log_frame
+
+
+def measure_frame_path(frames, iters=50, frame_size=(1920, 1080)):
+    """
+    比较改造前后逐帧缩放与复制的内存分配和耗时（不含模型推理）。
+
+    Args:
+        frames (list): 样本图像，会先缩放到 frame_size 模拟摄像头画面。
+        iters (int): 测量的帧数。
+        frame_size (tuple): 模拟的原始帧尺寸（宽, 高）。
+
+    Returns:
+        dict: 每种处理方式的每帧分配字节数（峰值）、保留字节数和平均耗时（毫秒）。
+    """
+    frames = [cv2.resize(f, frame_size) for f in frames[:8]]
+    pool = FrameBufferPool()
+    paths = {
+        "legacy": _legacy_frame_path,
+        "frame_context": lambda frame: _context_frame_path(frame, pool),
+    }
+    report = {}
+    for name, path in paths.items():
+        path(frames[0])  # 预热，缓冲区池在此时完成分配
+        tracemalloc.start()
+        alloc, kept, elapsed = 0, 0, 0.0
+        for i in range(iters):
+            frame = frames[i % len(frames)]
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            t1 = time.perf_counter()
+            retained = path(frame)
+            elapsed += time.perf_counter() - t1
+            current, peak = tracemalloc.get_traced_memory()
+            alloc += peak - before
+            kept += current - before
+            del retained
+        tracemalloc.stop()
+        report[name] = {
+            "alloc_bytes_per_frame": alloc // iters,
+            "retained_bytes_per_frame": kept // iters,
+            "ms_per_frame": round(elapsed / iters * 1000, 3),
+        }
+    report["frame_context"]["pool_bytes"] = pool.nbytes
+    return report
+
+
+class ModelBenchmark:
+    def __init__(self, weights, data_path, imgsz_list=(320, 480, 640), batch_sizes=(1, 4),
+                 backends=("pytorch",), device="cpu", warmup=3, iters=20, frames=None, precisions=("fp32",)):
+        """
+        比较多组模型权重在不同输入尺寸、批大小和后端下的精度与CPU延迟。
+
+        Args:
+            weights (list): 模型权重（.pt）路径列表。
+            data_path (str): 数据集yaml文件路径，用于在验证集上计算mAP。
+            imgsz_list (tuple): 测试的输入尺寸。
+            batch_sizes (tuple): 测试的批大小。
+            backends (tuple): 测试的推理后端，取值见 BACKENDS。
+            device (str): 推理设备。
+            warmup (int): 计时前的预热批次数。
+            iters (int): 计时的批次数。
+            frames (list): 测量延迟使用的样本图像，默认从验证集中读取。
+            precisions (tuple): 测试的推理精度，取值见 PRECISIONS；硬件不支持的精度会被跳过。
+        """
+        self.weights = list(weights)
+        self.data_path = data_path
+        self.imgsz_list = list(imgsz_list)
+        self.batch_sizes = list(batch_sizes)
+        self.backends = [b for b in backends if b in BACKENDS]
+        self.precisions = [p for p in precisions if p in PRECISIONS]
+        self.device = device
+        self.warmup = warmup
+        self.iters = iters
+        self.frames = frames if frames is not None else load_sample_frames(data_path)
+        if not self.frames:
+            self.frames = [np.full((640, 640, 3), 114, dtype=np.uint8)]
+        self.results = []
+        self.frame_path = None  # 逐帧缩放与复制的分配统计
+
+    def load_detector(self, weight, backend, precision="fp32"):
+        """
+        通过 YOLOv8v5Detector 加载指定后端和推理精度的模型。
+
+        Returns:
+            YOLOv8v5Detector: 加载好的检测器。
+        """
+        model_path = weight
+        if backend == "onnx":
+            from ultralytics import YOLO
+            # 导出为动态输入尺寸的ONNX模型，同一个文件可用于所有imgsz和批大小
+            model_path = YOLO(weight).export(format="onnx", imgsz=max(self.imgsz_list), dynamic=True)
+        detector = YOLOv8v5Detector(dict(ini_params, device=self.device, precision=precision))
+        detector.load_model(model_path)
+        return detector
+
+    def measure_latency(self, detector, imgsz, batch):
+        """
+        测量单张图像的平均延迟和吞吐量。
+
+        Returns:
+            tuple: (每张图像的平均延迟（毫秒）, 每秒处理图像数)。
+        """
+        batches = [[self.frames[(i * batch + j) % len(self.frames)] for j in range(batch)]
+                   for i in range(self.warmup + self.iters)]
+        for images in batches[:self.warmup]:
+            detector.predict(images, imgsz=imgsz)
+        t1 = time.perf_counter()
+        for images in batches[self.warmup:]:
+            detector.predict(images, imgsz=imgsz)
+        elapsed = time.perf_counter() - t1
+        num_images = self.iters * batch
+        return elapsed / num_images * 1000, num_images / elapsed
+
+    def measure_map(self, detector, imgsz):
+        """
+        在验证集上计算mAP。
+
+        Returns:
+            tuple: (mAP50, mAP50-95)，没有数据集时为 (None, None)。
+        """
+        if not self.data_path or not os.path.exists(self.data_path):
+            return None, None
+        # 从 DatasetCache 读取预先解码的验证集，不再逐张解码JPEG
+        metrics = detector.model.val(data=self.data_path, imgsz=imgsz, batch=1, device=self.device,
+                                     plots=False, verbose=False, validator=CachedDetectionValidator)
+        return float(metrics.box.map50), float(metrics.box.map)
+
+    def run(self):
+        """
+        运行全部组合的测试。
+
+        Returns:
+            list: 每种组合（权重、后端、推理精度、imgsz、批大小）的测试结果。
+        """
+        self.results = []
+        if self.data_path and os.path.exists(self.data_path):
+            # 每个imgsz的验证集缓存只验证（必要时生成）一次，各次评估直接读取
+            for imgsz in self.imgsz_list:
+                DatasetCache(self.data_path, imgsz).prepare("val")
+        for weight in self.weights:
+            for backend in self.backends:
+                for precision in self.precisions:
+                    detector = self.load_detector(weight, backend, precision)
+                    if detector.precision != precision:
+                        print("跳过 %s %s：不支持%s推理" % (weight_label(weight), backend, precision))
+                        continue
+                    for imgsz in self.imgsz_list:
+                        map50, map50_95 = self.measure_map(detector, imgsz)  # mAP与批大小无关，只计算一次
+                        for batch in self.batch_sizes:
+                            latency, throughput = self.measure_latency(detector, imgsz, batch)
+                            result = {
+                                "weights": weight,
+                                "backend": backend,
+                                "precision": precision,
+                                "imgsz": imgsz,
+                                "batch": batch,
+                                "latency_ms": round(latency, 3),
+                                "images_per_sec": round(throughput, 2),
+                                "mAP50": map50,
+                                "mAP50-95": map50_95,
+                            }
+                            print(result)
+                            self.results.append(result)
+        precision_deltas(self.results)
+        self.frame_path = measure_frame_path(self.frames)
+        print(self.frame_path)
+        return self.results
+
+    def save_report(self, out_dir, score="mAP50-95"):
+        """
+        保存JSON报告和精度-延迟散点图。
+
+        Args:
+            out_dir (str): 报告保存目录。
+            score (str): 用于帕累托前沿的精度指标。
+
+        Returns:
+            tuple: (JSON报告路径, 图表路径)。
+        """
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        os.makedirs(out_dir, exist_ok=True)
+        front = pareto_front(self.results, score=score)
+        json_path = os.path.join(out_dir, "model_comparison.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"results": self.results, "pareto_front": front, "frame_path": self.frame_path},
+                      f, ensure_ascii=False, indent=2)
+
+        fig, ax = plt.subplots(figsize=(9, 6))
+        for r in self.results:
+            if r.get(score) is None:
+                continue
+            label = "%s|%s|%s|%d|b%d" % (weight_label(r["weights"]), r["backend"], r.get("precision", "fp32"),
+                                         r["imgsz"], r["batch"])
+            ax.scatter(r["latency_ms"], r[score], c="tab:red" if r.get("pareto") else "tab:gray")
+            ax.annotate(label, (r["latency_ms"], r[score]), fontsize=7)
+        if front:
+            ax.plot([r["latency_ms"] for r in front], [r[score] for r in front], "r--", label="Pareto front")
+            ax.legend()
+        ax.set_xlabel("Latency per image (ms)")
+        ax.set_ylabel(score)
+        ax.grid(True, alpha=0.3)
+        chart_path = os.path.join(out_dir, "model_comparison.png")
+        fig.savefig(chart_path, dpi=150, bbox_inches="tight")
+        plt.close(fig)
+        return json_path, chart_path
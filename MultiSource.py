@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+
+import cv2  # 导入OpenCV库，用于读取摄像头和视频流
+
+from FrameContext import FrameBufferPool, FrameContext, INFER_SIZE
+
+
+def parse_source(source):
+    """
+    将摄像头编号字符串转换为整数，其余（RTSP地址、视频文件路径）保持原样。
+    """
+    source = str(source).strip()
+    return int(source) if source.isdigit() else source
+
+
+class SourceReader(threading.Thread):
+    def __init__(self, name, source, condition, live=None, reconnect_delay=2.0):
+        """
+        单路视频源的采集线程，只保留最新一帧。
+
+        Args:
+            name (str): 视频源名称。
+            source (int|str): 摄像头编号、RTSP地址或视频文件路径。
+            condition (threading.Condition): 所有视频源共享的条件变量，有新帧时通知处理线程。
+            live (bool): 是否为实时源，默认摄像头编号和带协议的地址（如 rtsp://）为实时源，其余视为视频文件。
+            reconnect_delay (float): 实时源断开后重新连接的间隔（秒）。
+
+        实时源的新帧直接覆盖尚未处理的旧帧（计入丢弃帧数），处理延迟不会累积；
+        视频文件则等待上一帧被取走后再读取下一帧，保证不丢帧。
+        """
+        super().__init__(daemon=True)
+        self.name = name
+        self.source = source
+        # 不存在的文件路径不能当作实时源，否则会无休止地重连而没有任何提示
+        self.live = live if live is not None else isinstance(source, int) or "://" in str(source)
+        self.reconnect_delay = reconnect_delay
+        self.finished = False  # 视频文件读取完毕
+        self.error = None
+        self.captured = 0  # 已采集的帧数
+        self.dropped = 0  # 未处理即被覆盖的帧数
+        self.capture_fps = 0.0
+        self._condition = condition
+        self._stop_event = threading.Event()
+        self._frame = None
+        self._timestamp = None
+
+    def run(self):
+        cap = None
+        last = None
+        try:
+            if not self.live and not os.path.isfile(self.source):
+                self.error = "无法打开视频源"
+                return
+            while not self._stop_event.is_set():
+                if cap is None:
+                    cap = cv2.VideoCapture(self.source)
+                    if not cap.isOpened():
+                        cap.release()
+                        cap = None
+                        if not self.live:
+                            self.error = "无法打开视频源"
+                            break
+                        self.error = "连接失败，正在重试"  # 在状态列中显示，读到第一帧后清除
+                        self._stop_event.wait(self.reconnect_delay)
+                        continue
+
+                ret, frame = cap.read()
+                if not ret:
+                    cap.release()
+                    cap = None
+                    if not self.live:
+                        break  # 视频文件读取完毕
+                    self.error = "连接断开，正在重连"
+                    self._stop_event.wait(self.reconnect_delay)  # 实时源断开，稍后重连
+                    continue
+                self.error = None
+
+                now = time.time()
+                if last is not None and now > last:
+                    fps = 1.0 / (now - last)
+                    self.capture_fps = 0.9 * self.capture_fps + 0.1 * fps if self.capture_fps else fps
+                last = now
+                with self._condition:
+                    if not self.live:
+                        # 视频文件按处理速度读取，等待上一帧被取走
+                        while self._frame is not None and not self._stop_event.is_set():
+                            self._condition.wait(0.1)
+                    elif self._frame is not None:
+                        self.dropped += 1
+                    self._frame, self._timestamp = frame, now
+                    self.captured += 1
+                    self._condition.notify_all()
+        finally:
+            if cap is not None:
+                cap.release()
+            with self._condition:
+                self.finished = True
+                self._condition.notify_all()
+
+    def take(self):
+        """
+        取走尚未处理的最新一帧，调用方需持有共享条件变量。
+
+        Returns:
+            tuple: (帧, 采集时间戳)；没有新帧时返回 None。
+        """
+        if self._frame is None:
+            return None
+        item = (self._frame, self._timestamp)
+        self._frame = None
+        self._condition.notify_all()  # 唤醒等待取帧的视频文件读取线程
+        return item
+
+    @property
+    def pending(self):
+        """是否有尚未处理的帧。"""
+        return self._frame is not None
+
+    def stop(self):
+        """通知采集线程退出。"""
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+
+
+class MultiSourceProcessor:
+    def __init__(self, detector, sources, max_batch=None):
+        """
+        多路视频源共享一个检测模型的批量处理器。
+
+        Args:
+            detector (YOLOv8v5Detector): 检测模型，各路画面合并为一个批次推理。
+            sources (dict): 视频源名称 -> 摄像头编号、RTSP地址或视频文件路径。
+            max_batch (int): 单个批次的最大帧数，默认等于视频源数量。
+
+        每路视频源在独立线程中采集，处理线程每次从各路取最新的一帧组成批次。
+        每路每批最多一帧，批次未满时按轮转顺序选取起始视频源，保证各路公平。
+        """
+        self.detector = detector
+        self._condition = threading.Condition()
+        self.readers = [SourceReader(name, parse_source(source), self._condition) for name, source in sources.items()]
+        self.max_batch = max_batch or len(self.readers)
+        self._pools = {reader.name: FrameBufferPool() for reader in self.readers}  # 各路同时处理，缓冲区各自独立
+        self._offset = 0
+        self._metrics = {reader.name: {"processed": 0, "fps": 0.0, "latency": 0.0, "last": None}
+                         for reader in self.readers}
+
+    def start(self):
+        """启动所有采集线程。"""
+        for reader in self.readers:
+            reader.start()
+        return self
+
+    @property
+    def finished(self):
+        """所有视频源均已结束且没有待处理的帧。"""
+        return all(reader.finished and not reader.pending for reader in self.readers)
+
+    def next_batch(self, timeout=1.0):
+        """
+        等待并取出一个批次的帧。
+
+        Args:
+            timeout (float): 最长等待时间（秒）。
+
+        Returns:
+            list: (视频源名称, 帧, 采集时间戳) 列表，超时或全部结束时为空列表。
+        """
+        deadline = time.time() + timeout
+        with self._condition:
+            while not any(reader.pending for reader in self.readers):
+                remaining = deadline - time.time()
+                if remaining <= 0 or all(reader.finished for reader in self.readers):
+                    return []
+                self._condition.wait(remaining)
+
+            count = len(self.readers)
+            batch = []
+            for i in range(count):
+                reader = self.readers[(self._offset + i) % count]
+                item = reader.take()
+                if item is not None:
+                    batch.append((reader.name,) + item)
+                    if len(batch) >= self.max_batch:
+                        break
+            self._offset = (self._offset + 1) % count  # 下一批次从下一路开始选取
+        return batch
+
+    def process(self, batch, **params):
+        """
+        对一个批次的帧进行推理。
+
+        Args:
+            batch (list): next_batch 返回的帧列表。
+            **params: 本次推理的模型参数（如 conf、iou）。
+
+        Returns:
+            list: (视频源名称, FrameContext, 检测结果列表, 每帧平均推理用时) 列表，
+                检测结果格式与 detector.postprocess 相同。
+        """
+        if not batch:
+            return []
+        contexts = [FrameContext(frame, self._pools[name]) for name, frame, _ in batch]
+        images = [self.detector.preprocess(ctx.resized(INFER_SIZE)) for ctx in contexts]
+
+        t1 = time.time()
+        pred = self.detector.predict(images, **params)
+        t2 = time.time()
+        use_time = (t2 - t1) / len(batch)  # 批次推理用时平摊到每帧
+
+        outputs = []
+        for (name, _, timestamp), ctx, res in zip(batch, contexts, pred):
+            det_info = self.detector.postprocess([res])
+            outputs.append((name, ctx, det_info, use_time))
+            self._record(name, timestamp)
+        return outputs
+
+    def _record(self, name, timestamp):
+        now = time.time()
+        m = self._metrics[name]
+        m["processed"] += 1
+        m["latency"] = 0.9 * m["latency"] + 0.1 * (now - timestamp) if m["processed"] > 1 else now - timestamp
+        if m["last"] is not None and now > m["last"]:
+            fps = 1.0 / (now - m["last"])
+            m["fps"] = 0.9 * m["fps"] + 0.1 * fps if m["fps"] else fps
+        m["last"] = now
+
+    def metrics(self):
+        """
+        各路视频源的采集与处理指标。
+
+        Returns:
+            list: 每路一个字典，包含采集帧率、处理帧率、采集到处理完成的延迟和丢弃帧数。
+        """
+        rows = []
+        for reader in self.readers:
+            m = self._metrics[reader.name]
+            state = "已结束" if reader.finished else "运行中"
+            rows.append({
+                "视频源": reader.name,
+                "状态": reader.error or state,
+                "采集帧率": round(reader.capture_fps, 1),
+                "处理帧率": round(m["fps"], 1),
+                "延迟(ms)": round(m["latency"] * 1000, 1),
+                "已处理帧数": m["processed"],
+                "丢弃帧数": reader.dropped,
+            })
+        return rows
+
+    def stop(self):
+        """停止所有采集线程并释放视频源。"""
+        for reader in self.readers:
+            reader.stop()
+        for reader in self.readers:
+            reader.join(timeout=5)
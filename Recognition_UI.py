@@ -1,20 +1,43 @@
+import os
 import random
-import tempfile
 import time
 
 import cv2
-import numpy as np
+import pandas as pd
 import streamlit as st
 from QtFusion.path import abs_path
 from QtFusion.utils import drawRectBox
 
+from CameraDiscovery import camera_discovery
+from DetectionStats import ClassStatistics, STATS_WINDOWS
+from DetectorPool import DetectorPool
+from DisplayThrottle import DisplayThrottle
+from FrameContext import FrameBufferPool, FrameContext, INFER_SIZE
+from FrameDecoder import SharedFrameDecoder
+from FrameScheduler import FrameScheduler
+from LatencyController import LatencyController
 from LoggerRes import ResultLogger, LogTable
-from YOLOv8v5Model import YOLOv8v5Detector
+from MediaIngest import decode_image, decode_images, UploadSpooler
+from MultiSource import MultiSourceProcessor, parse_source
+from ShadowEvaluator import ShadowEvaluator
+from Telemetry import telemetry
+from VideoExport import available_codecs
+from YOLOv8v5Model import CascadeDetector, YOLOv8v5Detector, model_key
 from datasets.TrafficSign.label_name import Label_list
 from style_css import def_css_hitml
 from utils_web import save_uploaded_file, concat_results, load_default_image, get_camera_names
 
 
+@st.cache_resource(max_entries=2)
+def get_detector_pool(model_path, mtime=None, precision='fp32'):
+    """
+    获取进程内共享的模型副本池，所有会话共用，按模型文件（路径和修改时间）和推理精度区分。
+
+    只保留最近使用的两个模型的副本池，上传新模型或重新训练后旧的副本池被释放，不会随模型更换而累积。
+    """
+    return DetectorPool(model_path, params={'precision': precision})
+
+
 class Detection_UI:
     """
     检测系统类。
@@ -53,8 +76,11 @@ class Detection_UI:
 
         # 初始化相机和文件相关的变量
         self.selected_camera = None
+        self.multi_sources = {}  # 多路模式的视频源：名称 -> 摄像头编号/RTSP地址/视频文件路径
         self.file_type = None
         self.uploaded_file = None
+        self.uploaded_files = []  # 上传的全部图片，多张时作为批量任务处理
+        self.batch_size = 8  # 批量处理图片时每批推理的图片数
         self.uploaded_video = None
         self.custom_model_file = None  # 自定义的模型文件
 
@@ -72,9 +98,31 @@ class Detection_UI:
         self.image_placeholder_res = None  # 图像显示区域
         self.table_placeholder = None  # 表格显示区域
         self.log_table_placeholder = None  # 完整结果表格显示区域
+        self.log_info_placeholder = None  # 结果记录分页信息区域
+        self.log_query = None  # 结果记录的过滤条件
+        self.log_page = 0  # 结果记录的当前页码（从0开始）
+        self.log_page_size = 50  # 结果记录每页的条数
         self.selectbox_placeholder = None  # 下拉框显示区域
         self.selectbox_target = None  # 下拉框选中项
         self.progress_bar = None  # 用于显示的进度条
+        self.stats = None  # 识别统计
+        self.stats_window = None  # 侧边栏统计窗口选择
+        self.stats_placeholder = None  # 侧边栏统计面板区域
+        self.pool = None  # 所有会话共享的模型副本池
+        self.model_path = None  # 当前模型的权重路径
+        self.pool_key = None  # 当前副本池对应的模型标识
+        self.display_throttle = DisplayThrottle()  # 限制画面和控件的刷新频率
+        self.frame_pool = FrameBufferPool()  # 逐帧复用的图像缓冲区
+        self.adaptive_latency = False  # 摄像头检测时是否自适应调整推理档位
+        self.target_fps = 15  # 自适应调整的目标帧率
+        self.latency_placeholder = None  # 侧边栏延迟控制状态区域
+        self.frame_deadline_ms = 200  # 摄像头帧从采集到开始推理的截止时间
+        self.scheduler_placeholder = None  # 侧边栏帧调度统计区域
+        self.memory_placeholder = None  # 侧边栏内存占用区域
+        self.telemetry = telemetry()  # 进程内共享的资源和吞吐量采样器
+        self.telemetry_placeholder = None  # 侧边栏资源监控区域
+        self.shadow = None  # 影子模式的候选模型评估器
+        self.export_running = False  # 后台视频导出是否仍在进行
 
         # 初始化日志数据保存路径
         self.saved_log_data = abs_path("tempDir/log_table_data.csv", path_type="current")
@@ -83,24 +131,20 @@ class Detection_UI:
         if 'logTable' not in st.session_state:
             st.session_state['logTable'] = LogTable(self.saved_log_data)
 
-        # 获取或更新可用摄像头列表
-        if 'available_cameras' not in st.session_state:
-            st.session_state['available_cameras'] = get_camera_names()
-        self.available_cameras = st.session_state['available_cameras']
+        # 获取可用摄像头列表（后台探测结果的缓存，不会阻塞页面加载）
+        self.available_cameras = get_camera_names()
 
         # 初始化或获取识别结果的表格
         self.logTable = st.session_state['logTable']
 
         # 加载或创建模型实例
         if 'model' not in st.session_state:
-            st.session_state['model'] = YOLOv8v5Detector()  # 创建YOLOv8/v5Detector模型实例
+            st.session_state['model'] = CascadeDetector()  # 创建YOLOv8/v5Detector模型实例（支持级联复检）
 
         self.model = st.session_state['model']
-        # 加载训练的模型权重
-        self.model.load_model(model_path=abs_path("weights/traffic-yolov8n.pt", path_type="current"))
-        # 为模型中的类别重新分配颜色
-        self.colors = [[random.randint(0, 255) for _ in range(3)] for _ in
-                       range(len(self.model.names))]
+        # 首次运行时使用训练的模型权重，之后由侧边栏的模型文件选项决定
+        self.model_path = st.session_state.get('model_path',
+                                               abs_path("weights/traffic-yolov8n.pt", path_type="current"))
         self.setup_sidebar()  # 初始化侧边栏布局
 
     def setup_page(self):
@@ -128,27 +172,60 @@ class Detection_UI:
             # 如果选择自定义模型文件，则提供文件上传器
             model_file = st.sidebar.file_uploader("选择.pt文件", type="pt")
 
-            # 如果上传了模型文件，则保存并加载该模型
+            # 如果上传了模型文件，则保存并使用该模型，否则沿用之前的模型
             if model_file is not None:
                 self.custom_model_file = save_uploaded_file(model_file)
-                self.model.load_model(model_path=self.custom_model_file)
-                self.colors = [[random.randint(0, 255) for _ in range(3)] for _ in
-                               range(len(self.model.names))]
+                self.use_model(self.custom_model_file)
+            else:
+                self.use_model(self.model_path)
         elif model_file_option == "默认":
-            self.model.load_model(model_path=abs_path("weights/traffic-yolov8n.pt", path_type="current"))
-            # 为模型中的类别重新分配颜色
-            self.colors = [[random.randint(0, 255) for _ in range(3)] for _ in
-                           range(len(self.model.names))]
+            self.use_model(abs_path("weights/traffic-yolov8n.pt", path_type="current"))
 
         # 置信度阈值的滑动条
         self.conf_threshold = float(st.sidebar.slider("置信度阈值", min_value=0.0, max_value=1.0, value=0.25))
         # IOU阈值的滑动条
         self.iou_threshold = float(st.sidebar.slider("IOU阈值", min_value=0.0, max_value=1.0, value=0.5))
 
+        # 级联推理：上传复检模型后，只有结果不确定的帧才使用复检模型
+        cascade_file = st.sidebar.file_uploader("级联复检模型（可选，.pt文件）", type="pt")
+        if cascade_file is None:
+            self.model.heavy = None
+            st.session_state.pop('cascade_file_id', None)
+        else:
+            self.session_model()  # 级联复检使用会话自己的模型，当前模型变化时随之重新加载
+            file_id = getattr(cascade_file, "file_id", None) or (cascade_file.name, cascade_file.size)
+            if st.session_state.get('cascade_file_id') != file_id:
+                try:
+                    self.model.load_heavy_model(save_uploaded_file(cascade_file))
+                    st.session_state['cascade_file_id'] = file_id
+                except ValueError as e:
+                    st.sidebar.error(str(e))
+            if self.model.heavy is not None:
+                stats = self.model.stats()
+                st.sidebar.caption("复检比例：%.1f%%，平均每帧用时：%.1f ms" %
+                                   (stats["escalation_rate"] * 100, stats["ms_per_frame"]))
+
+        # 影子模式：上传候选模型后，在后台抽样比较候选模型与当前模型的结果和用时，不影响实时画面
+        shadow_file = st.sidebar.file_uploader("影子模式候选模型（可选，.pt文件）", type="pt")
+        self.shadow = self.get_shadow_evaluator(shadow_file)
+        if self.shadow is not None:
+            self.shadow.sample_rate = st.sidebar.slider("影子模式抽样比例（%）", min_value=1, max_value=100,
+                                                        value=10) / 100.0
+
         # 设置侧边栏的摄像头配置部分
         st.sidebar.header("摄像头配置")
+        if st.sidebar.button("刷新摄像头列表"):
+            camera_discovery().refresh(wait=True)
+            self.available_cameras = get_camera_names()
         # 选择摄像头的下拉菜单
         self.selected_camera = st.sidebar.selectbox("选择摄像头", self.available_cameras)
+        # 多路模式：同时处理多个摄像头或视频流，共享一个模型批量推理
+        multi_cameras = st.sidebar.multiselect("多路摄像头", [c for c in self.available_cameras if c != "未启用摄像头"])
+        stream_text = st.sidebar.text_area("多路视频流（每行一个RTSP地址或视频文件路径）", "")
+        self.multi_sources = {"Camera: " + c: c for c in multi_cameras}
+        for line in stream_text.splitlines():
+            if line.strip():
+                self.multi_sources["Stream: " + line.strip()] = line.strip()
 
         # 设置侧边栏的识别项目设置部分
         st.sidebar.header("识别项目设置")
@@ -156,7 +233,12 @@ class Detection_UI:
         self.file_type = st.sidebar.selectbox("选择文件类型", ["图片文件", "视频文件"])
         # 根据所选的文件类型，提供对应的文件上传器
         if self.file_type == "图片文件":
-            self.uploaded_file = st.sidebar.file_uploader("上传图片", type=["jpg", "png", "jpeg"])
+            self.uploaded_files = st.sidebar.file_uploader("上传图片（可多选）", type=["jpg", "png", "jpeg"],
+                                                           accept_multiple_files=True) or []
+            # 单张图片可以反复调整阈值而不重新推理，多张图片按批次解码和推理
+            self.uploaded_file = self.uploaded_files[0] if len(self.uploaded_files) == 1 else None
+            self.batch_size = st.sidebar.slider("批量推理大小", min_value=1, max_value=32, value=8,
+                                                disabled=len(self.uploaded_files) < 2)
         elif self.file_type == "视频文件":
             self.uploaded_video = st.sidebar.file_uploader("上传视频文件", type=["mp4"])
 
@@ -169,9 +251,269 @@ class Detection_UI:
         else:
             st.sidebar.write("请点击'开始运行'按钮，启动摄像头检测！")
 
+        # 设置侧边栏的延迟控制部分：摄像头检测时根据实测用时调整推理精度、输入尺寸和抽帧间隔
+        st.sidebar.header("延迟控制")
+        self.adaptive_latency = st.sidebar.checkbox("自适应延迟控制（摄像头）", value=False)
+        self.target_fps = st.sidebar.slider("目标帧率", min_value=1, max_value=60, value=15,
+                                            disabled=not self.adaptive_latency)
+        self.latency_placeholder = st.sidebar.empty()
+        self.frame_deadline_ms = st.sidebar.slider("帧截止时间（毫秒）", min_value=20, max_value=1000, value=200,
+                                                   step=10)
+        self.scheduler_placeholder = st.sidebar.empty()
+
+        # 设置侧边栏的显示设置部分，画面刷新帧率与推理帧率相互独立
+        st.sidebar.header("显示设置")
+        self.display_throttle.max_fps = st.sidebar.slider("界面刷新帧率", min_value=1, max_value=30, value=10)
+
+        # 设置侧边栏的识别统计部分，模型类别变化时重建统计数据
+        if 'classStats' not in st.session_state or \
+                st.session_state['classStats'].class_names != list(self.pool.names):
+            st.session_state['classStats'] = ClassStatistics(self.pool.names)
+        self.stats = st.session_state['classStats']
+        st.sidebar.header("识别统计")
+        self.stats_window = st.sidebar.selectbox("统计窗口", list(STATS_WINDOWS.keys()))
+        self.stats_placeholder = st.sidebar.empty()
+        self.update_stats_panel(force=True)
+
+        # 设置侧边栏的内存管理部分：超出上限的识别记录和画面写入 tempDir 下的磁盘分段
+        st.sidebar.header("内存管理")
+        max_log_mb = st.sidebar.slider("识别记录内存上限（MB）", min_value=8, max_value=1024, value=64, step=8)
+        max_frame_mb = st.sidebar.slider("识别画面内存上限（MB）", min_value=64, max_value=8192, value=512, step=64)
+        self.logTable.set_budget(max_log_mb, max_frame_mb)
+        self.memory_placeholder = st.sidebar.empty()
+        self.update_memory_panel(force=True)
+
+        # 设置侧边栏的资源监控部分：进程/系统资源和处理帧率的实时曲线，可选的本地指标接口
+        st.sidebar.header("资源监控")
+        self.telemetry_placeholder = st.sidebar.empty()
+        self.update_telemetry_panel(force=True)
+        # 指标接口由所有会话共享，只能通过按钮启动，运行后不再随端口输入框变化
+        metrics_port = int(st.sidebar.number_input("指标接口端口", min_value=1024, max_value=65535, value=9108,
+                                                   disabled=self.telemetry.serving))
+        if not self.telemetry.serving and st.sidebar.button("启动指标接口（Prometheus / JSON）"):
+            try:
+                self.telemetry.serve(metrics_port)
+            except OSError as e:
+                st.sidebar.error("指标接口启动失败：%s" % e)
+        if self.telemetry.serving:
+            st.sidebar.caption("指标接口：%s（JSON：/metrics.json）" % self.telemetry.address)
+
+    def get_shadow_evaluator(self, candidate_file):
+        """
+        获取影子模式的评估器，候选模型文件变化时重新加载，当前模型变化时清零统计。
+
+        Args:
+            candidate_file: 上传的候选模型文件，None 表示关闭影子模式。
+
+        Returns:
+            ShadowEvaluator: 评估器；未上传候选模型时返回 None。
+        """
+        shadow = st.session_state.get('shadow')
+        file_id = None if candidate_file is None else \
+            getattr(candidate_file, "file_id", None) or (candidate_file.name, candidate_file.size)
+        if shadow is not None and st.session_state.get('shadow_file_id') != file_id:
+            shadow.stop()
+            shadow = None
+            st.session_state.pop('shadow', None)
+        if candidate_file is None:
+            st.session_state.pop('shadow_file_id', None)
+            return None
+        if shadow is None:
+            with st.spinner("正在加载候选模型..."):
+                candidate = YOLOv8v5Detector()
+                candidate.load_model(save_uploaded_file(candidate_file))
+            shadow = ShadowEvaluator(candidate)
+            st.session_state['shadow'] = shadow
+            st.session_state['shadow_file_id'] = file_id
+        if st.session_state.get('shadow_model_key') != self.pool_key:
+            shadow.reset_stats()
+            st.session_state['shadow_model_key'] = self.pool_key
+        return shadow
+
+    def use_model(self, model_path):
+        """
+        选择当前模型：推理从所有会话共享的副本池中借出模型，会话自己的模型只在需要时加载（见 session_model）。
+
+        Args:
+            model_path (str): 模型权重路径。
+        """
+        self.model_path = st.session_state['model_path'] = model_path
+        self.pool_key = model_key(model_path, self.model.params.get('precision', 'fp32'))
+        self.pool = get_detector_pool(*self.pool_key)
+        # 为模型中的类别重新分配颜色
+        self.colors = [[random.randint(0, 255) for _ in range(3)] for _ in range(len(self.pool.names))]
+
+    def session_model(self):
+        """
+        获取会话自己的模型，首次使用或模型变化时加载。
+
+        级联复检、延迟控制和候选框缓存需要在模型上保存会话独有的状态，只有这些功能才加载会话自己的模型，
+        其余推理都使用共享的副本池，模型占用的内存不随会话数量增长。
+        """
+        self.model.load_model(self.model_path)
+        return self.model
+
+    def get_latency_controller(self):
+        """
+        获取当前模型的延迟控制器，模型变化时重新创建并预热所有档位。
+
+        Returns:
+            LatencyController: 延迟控制器；未启用时返回 None。
+        """
+        if not self.adaptive_latency:
+            return None
+        self.session_model()
+        ctrl = st.session_state.get('latencyCtrl')
+        if ctrl is None or ctrl.detector is not self.model or ctrl.model_key != self.model.model_key:
+            with st.spinner("正在预热各推理档位..."):
+                ctrl = LatencyController(self.model).warmup()
+            st.session_state['latencyCtrl'] = ctrl
+        ctrl.target_ms = 1000.0 / self.target_fps
+        return ctrl
+
+    def update_stats_panel(self, force=False, interval=1.0):
+        """
+        刷新侧边栏的识别统计面板。
+
+        Args:
+            force (bool): 是否忽略刷新间隔立即刷新。
+            interval (float): 两次刷新之间的最小间隔（秒）。
+        """
+        now = time.time()
+        if not self.display_throttle.due("stats", interval, now) and not force:
+            return
+        with self.stats_placeholder.container():
+            st.caption("已处理帧数：%d" % self.stats.frame_count(self.stats_window, now))
+            pool = self.pool.metrics()
+            st.caption("模型副本：%d / %d 使用中，利用率 %.0f%%，平均等待 %.1f ms（P95 %.1f ms）" %
+                       (pool["in_use"], pool["replicas"], pool["utilization"] * 100, pool["wait_mean_ms"],
+                        pool["wait_p95_ms"]))
+            if self.shadow is not None:
+                shadow = self.shadow.stats()
+                if shadow["frames"]:
+                    st.caption("影子模式：已比较 %d 帧（跳过 %d），召回率 %.1f%%，精确率 %.1f%%，一致帧 %.1f%%，"
+                               "用时 %.1f / %.1f ms（候选 / 当前）" %
+                               (shadow["frames"], shadow["skipped"], shadow["recall"] * 100,
+                                shadow["precision"] * 100, shadow["frame_agreement"] * 100,
+                                shadow["candidate_ms"], shadow["primary_ms"]))
+                else:
+                    st.caption("影子模式：等待抽样帧...")
+                if shadow["errors"]:
+                    st.warning("候选模型推理失败 %d 次：%s" % (shadow["errors"], shadow["last_error"]))
+            st.dataframe(self.stats.summary(self.stats_window, now), hide_index=True, use_container_width=True)
+            st.bar_chart(self.stats.confidence_histogram(self.stats_window, now))
+
+    def update_memory_panel(self, force=False, interval=1.0):
+        """
+        刷新侧边栏的内存占用信息。
+
+        Args:
+            force (bool): 是否忽略刷新间隔立即刷新。
+            interval (float): 两次刷新之间的最小间隔（秒）。
+        """
+        if not self.display_throttle.due("memory", interval) and not force:
+            return
+        usage = self.logTable.memory_usage()
+        mb = 2 ** 20
+        with self.memory_placeholder.container():
+            st.caption("识别记录：内存 %d 条（%.1f MB），磁盘 %d 条" %
+                       (usage["log_rows"], usage["log_bytes"] / mb, usage["log_rows_on_disk"]))
+            st.caption("识别画面：内存 %d 帧（%.1f MB），磁盘 %d 帧" %
+                       (usage["frames"], usage["frame_bytes"] / mb, usage["frames_on_disk"]))
+            st.caption("磁盘分段：%.1f MB" % (usage["disk_bytes"] / mb))
+            if usage["dropped_rows"] or usage["dropped_frames"]:
+                st.warning("磁盘空间不足，已丢弃最早的 %d 条记录和 %d 帧画面" %
+                           (usage["dropped_rows"], usage["dropped_frames"]))
+
+    def update_telemetry_panel(self, force=False, interval=1.0, last=120):
+        """
+        刷新侧边栏的资源监控曲线。
+
+        Args:
+            force (bool): 是否忽略刷新间隔立即刷新。
+            interval (float): 两次刷新之间的最小间隔（秒）。
+            last (int): 曲线显示的最近采样数。
+        """
+        if not self.display_throttle.due("telemetry", interval) and not force:
+            return
+        latest = self.telemetry.latest()
+        with self.telemetry_placeholder.container():
+            if latest is None:
+                st.caption("正在采集资源指标...")
+                return
+            st.caption("CPU：进程 %.0f%% / 系统 %.0f%%，内存 %.0f MB，线程 %d" %
+                       (latest["process_cpu"], latest["system_cpu"], latest["rss_mb"], latest["threads"]))
+            series = self.telemetry.series(last)
+            st.line_chart(series[["process_cpu", "system_cpu"]].rename(
+                columns={"process_cpu": "进程CPU(%)", "system_cpu": "系统CPU(%)"}), height=120)
+            st.line_chart(series[["rss_mb"]].rename(columns={"rss_mb": "内存(MB)"}), height=100)
+            st.line_chart(series[["fps", "latency_ms"]].rename(columns={"fps": "帧率", "latency_ms": "用时(ms)"}),
+                          height=120)
+            st.bar_chart(pd.DataFrame({"CPU(%)": latest["per_core"]}), height=100)
+
+    def show_export_status(self):
+        """
+        显示后台视频导出的进度，完成后提供下载。
+
+        导出进行期间页面定时重新运行以刷新进度（见 setupMainWindow）。下载按钮会把整个文件读入内存，
+        因此只在点击“准备下载”的那次运行中创建，其余运行只显示文件路径。
+        """
+        job = st.session_state.get('exportJob')
+        self.export_running = job is not None and not job.done
+        if job is None:
+            return
+        if not job.done:
+            st.progress(job.progress, text=job.status())
+        elif job.error is not None:
+            st.error(job.status())
+        elif os.path.exists(job.path):
+            st.write(f"🚀结果的视频/图片文件已经保存：{job.path}（{job.status()}）")
+            if st.button("准备下载"):
+                with open(job.path, "rb") as file:
+                    st.download_button("下载结果视频/图片", data=file, file_name=os.path.basename(job.path))
+
+    def setup_log_filters(self):
+        """
+        设置结果记录的查询条件（类别、文件、时间范围、置信度）和分页。
+        """
+        store = self.logTable.store
+        time_windows = {"全部": None, "最近1分钟": 60, "最近10分钟": 600, "最近1小时": 3600, "最近24小时": 86400}
+        with st.expander("识别记录查询"):
+            col1, col2 = st.columns(2)
+            classes = col1.multiselect("识别结果", list(store.class_names))
+            files = col2.multiselect("文件路径", list(store.file_names))
+            col3, col4 = st.columns(2)
+            window = col3.selectbox("时间范围", list(time_windows.keys()))
+            min_conf, max_conf = col4.slider("置信度范围", min_value=0.0, max_value=1.0, value=(0.0, 1.0))
+            col5, col6 = st.columns(2)
+            self.log_page_size = col5.selectbox("每页条数", [20, 50, 100, 200], index=1)
+            self.log_page = col6.number_input("页码", min_value=1, value=1, step=1) - 1
+
+        query = {}
+        if classes:
+            query['classes'] = classes
+        if files:
+            query['files'] = files
+        if time_windows[window] is not None:
+            query['t_start'] = time.time() - time_windows[window]
+        if min_conf > 0.0:
+            query['min_conf'] = min_conf
+        if max_conf < 1.0:
+            query['max_conf'] = max_conf
+        self.log_query = query
+
+    def update_log_table(self):
+        """
+        按查询条件和页码刷新结果记录表格。
+        """
+        total = self.logTable.update_table(self.log_table_placeholder, self.log_query, self.log_page,
+                                           self.log_page_size)
+        pages = max(1, -(-total // self.log_page_size))
+        self.log_info_placeholder.caption("共 %d 条记录，第 %d / %d 页" % (total, self.log_page + 1, pages))
+
     def load_model_file(self):
         if self.custom_model_file:
-            self.model.load_model(self.custom_model_file)
+            self.use_model(self.custom_model_file)
         else:
             pass  # 载入
 
@@ -181,89 +523,121 @@ class Detection_UI:
 
         根据用户选择的输入源（摄像头、图片文件或视频文件），处理并显示检测结果。
         """
+        # 选择了多路视频源时进入多路模式
+        if self.multi_sources:
+            self.process_multi_sources()
         # 如果选择了摄像头输入
-        if self.selected_camera != "未启用摄像头":
+        elif self.selected_camera != "未启用摄像头":
             self.logTable.clear_frames()  # 清除之前的帧记录
             # 创建一个结束按钮
             self.close_flag = self.close_placeholder.button(label="停止")
 
-            # 使用 OpenCV 捕获摄像头画面
-            cap = cv2.VideoCapture(int(self.selected_camera))
+            ctrl = self.get_latency_controller()
+            # 总是处理最新的帧，开始推理前已超过截止时间的帧直接丢弃
+            scheduler = FrameScheduler(self.frame_deadline_ms)
 
             # 设置总帧数为1000
             total_frames = 1000
             current_frame = 0
             self.progress_bar.progress(0)  # 初始化进度条
-            while cap.isOpened() and not self.close_flag:
-                ret, frame = cap.read()
-                if ret:
-                    # 显示画面并处理结果
-                    image, detInfo, _ = self.frame_process(frame, "Camera: " + self.selected_camera)
-
-                    # 设置新的尺寸
-                    new_width = 1080
-                    new_height = int(new_width * (9 / 16))
-                    resized_image = cv2.resize(image, (new_width, new_height))  # 调整图像尺寸
-                    resized_frame = cv2.resize(frame, (new_width, new_height))
-
-                    # 根据显示模式显示处理后的图像或原始图像
-                    if self.display_mode == "单画面显示":
-                        self.image_placeholder.image(resized_image, channels="BGR", caption="摄像头画面")
+
+            # 在独立的解码子进程中捕获摄像头画面，帧通过共享内存传递
+            camera_discovery().acquire(self.selected_camera)  # 采集期间后台探测不再打开该摄像头
+            try:
+                cap = SharedFrameDecoder(parse_source(self.selected_camera)).start()
+            except Exception:
+                camera_discovery().release(self.selected_camera)  # 子进程或共享内存创建失败时归还占用计数
+                raise
+            unshown = None  # 最近一帧因限流没有显示时保存 (上下文, 识别画面)，结束时补充显示
+            try:
+                while cap.isOpened() and not self.close_flag:
+                    ret, frame = cap.read_latest()
+                    if ret:
+                        if not scheduler.admit(cap.timestamp, cap.skipped):
+                            continue
+                        # 负载过高时按抽帧间隔跳过部分帧
+                        if ctrl is not None and not ctrl.take_frame():
+                            continue
+                        # 显示画面并处理结果
+                        ctx = FrameContext(frame, self.frame_pool)
+                        image, detInfo, _ = self.frame_process(frame, "Camera: " + self.selected_camera, ctx,
+                                                               controller=ctrl)
+                        if ctrl is not None and self.display_throttle.due("latency", 1.0):
+                            status = ctrl.status()
+                            self.latency_placeholder.caption(
+                                "当前档位：%s / %d / 每%d帧，每帧用时 %.1f ms（目标 %.1f ms）" %
+                                (status["precision"], status["imgsz"], status["stride"], status["ms_per_frame"],
+                                 status["target_ms"]))
+
+                        # 根据显示模式显示处理后的图像或原始图像（按界面刷新帧率推送）
+                        unshown = None if self.show_frames(ctx, image, "摄像头画面") else (ctx, image)
+                        scheduler.complete(cap.timestamp)
+                        if self.display_throttle.due("scheduler", 1.0):
+                            self.scheduler_placeholder.caption(scheduler.summary())
+                        # 将帧信息添加到日志表格中
+                        self.logTable.add_frames(image, detInfo, ctx.copy(INFER_SIZE))
+                        self.update_stats_panel()
+                        self.update_memory_panel()
+                        self.update_telemetry_panel()
+
+                        # 更新进度条
+                        if self.display_throttle.due("progress"):
+                            progress_percentage = int((current_frame / total_frames) * 100)
+                            self.progress_bar.progress(progress_percentage)
+                        current_frame = (current_frame + 1) % total_frames  # 重置进度条
                     else:
-                        self.image_placeholder.image(resized_frame, channels="BGR", caption="原始画面")
-                        self.image_placeholder_res.image(resized_image, channels="BGR", caption="识别画面")
-                    # 将帧信息添加到日志表格中
-                    self.logTable.add_frames(image, detInfo, cv2.resize(frame, (640, 640)))
-
-                    # 更新进度条
-                    progress_percentage = int((current_frame / total_frames) * 100)
-                    self.progress_bar.progress(progress_percentage)
-                    current_frame = (current_frame + 1) % total_frames  # 重置进度条
-                else:
-                    st.error("无法获取图像。")
-                    break
-                # time.sleep(0.01)  # 控制帧率
+                        st.error("无法获取图像。")
+                        break
+                    # time.sleep(0.01)  # 控制帧率
 
-            # 保存结果到CSV并更新日志表格
-            if self.close_flag:
+                if unshown is not None:
+                    self.show_frames(*unshown, "摄像头画面", force=True)
+                self.finish_progress()
+                # 保存结果到CSV并更新日志表格
                 self.logTable.save_to_csv()
-                self.logTable.update_table(self.log_table_placeholder)
+                self.update_log_table()
+            finally:
+                # 点击停止按钮会中断脚本运行，确保解码子进程和共享内存总能被释放
                 cap.release()
-
-            self.logTable.save_to_csv()
-            self.logTable.update_table(self.log_table_placeholder)
-            cap.release()
+                camera_discovery().release(self.selected_camera)
         else:
+            # 如果上传了多张图片，作为批量任务处理
+            if len(self.uploaded_files) > 1:
+                self.process_image_batch()
             # 如果上传了图片文件
-            if self.uploaded_file is not None:
+            elif self.uploaded_file is not None:
                 self.logTable.clear_frames()
                 self.progress_bar.progress(0)
                 # 显示上传的图片
-                source_img = self.uploaded_file.read()
-                file_bytes = np.asarray(bytearray(source_img), dtype=np.uint8)
-                image_ini = cv2.imdecode(file_bytes, 1)
-
-                image, detInfo, select_info = self.frame_process(image_ini, self.uploaded_file.name)
+                image_ini = decode_image(self.uploaded_file)
+                if image_ini is None:
+                    st.error("无法解码图片：%s" % self.uploaded_file.name)
+                    return
+
+                ctx = FrameContext(image_ini, self.frame_pool)
+                # 同一张图片只推理一次，拖动阈值滑动条时在缓存的候选框上重新过滤
+                cache_key = getattr(self.uploaded_file, "file_id", None) or \
+                    (self.uploaded_file.name, self.uploaded_file.size)
+                image, detInfo, select_info = self.frame_process(image_ini, self.uploaded_file.name, ctx,
+                                                                 cache_key=cache_key)
 
                 # self.selectbox_placeholder = st.empty()
                 self.selectbox_target = self.selectbox_placeholder.selectbox("目标过滤", select_info, key="22113")
 
                 self.logTable.save_to_csv()
-                self.logTable.update_table(self.log_table_placeholder)  # 更新所有结果记录的表格
-
-                # 设置新的尺寸
-                new_width = 1080
-                new_height = int(new_width * (9 / 16))
-                # 调整图像尺寸
-                resized_image = cv2.resize(image, (new_width, new_height))
-                resized_frame = cv2.resize(image_ini, (new_width, new_height))
+                self.update_log_table()  # 更新所有结果记录的表格
+
+                # 调整为显示尺寸
                 if self.display_mode == "单画面显示":
-                    self.image_placeholder.image(resized_image, channels="BGR", caption="图片显示")
+                    self.image_placeholder.image(ctx.display(image), channels="BGR", caption="图片显示")
                 else:
-                    self.image_placeholder.image(resized_frame, channels="BGR", caption="原始画面")
-                    self.image_placeholder_res.image(resized_image, channels="BGR", caption="识别画面")
+                    self.image_placeholder.image(ctx.display(), channels="BGR", caption="原始画面")
+                    self.image_placeholder_res.image(ctx.display(image), channels="BGR", caption="识别画面")
 
-                self.logTable.add_frames(image, detInfo, cv2.resize(image_ini, (640, 640)))
+                self.logTable.add_frames(image, detInfo, ctx.copy(INFER_SIZE))
+                self.update_stats_panel(force=True)
+                self.update_memory_panel(force=True)
+                self.update_telemetry_panel(force=True)
                 self.progress_bar.progress(100)
 
             # 如果上传了视频文件
@@ -272,61 +646,244 @@ class Detection_UI:
                 self.logTable.clear_frames()
                 self.close_flag = self.close_placeholder.button(label="停止")
 
-                video_file = self.uploaded_video
-                tfile = tempfile.NamedTemporaryFile()
-                tfile.write(video_file.read())
-                cap = cv2.VideoCapture(tfile.name)
+                # 后台分块写入磁盘，解码子进程在写入的同时即开始解码
+                spooler = UploadSpooler(self.uploaded_video).start()
+                cap = SharedFrameDecoder(spooler.path, total_size=spooler.total_size).start()
 
-                # 获取视频总帧数和帧率
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                fps = cap.get(cv2.CAP_PROP_FPS)
-
-                # 计算视频总长度（秒）
-                total_length = total_frames / fps if fps > 0 else 0
+                # 视频总帧数和帧率在写入完成后从完整文件读取，读取前不更新进度条
+                total_frames = 0
+                self.logTable.source_fps = None
 
                 # 创建进度条
                 self.progress_bar.progress(0)
 
                 current_frame = 0
-                while cap.isOpened() and not self.close_flag:
-                    ret, frame = cap.read()
-                    if ret:
-                        image, detInfo, _ = self.frame_process(frame, self.uploaded_video.name)
-
-                        # 设置新的尺寸
-                        new_width = 1080
-                        new_height = int(new_width * (9 / 16))
-                        # 调整图像尺寸
-                        resized_image = cv2.resize(image, (new_width, new_height))
-                        resized_frame = cv2.resize(frame, (new_width, new_height))
-                        if self.display_mode == "单画面显示":
-                            self.image_placeholder.image(resized_image, channels="BGR", caption="视频画面")
+                unshown = None  # 最近一帧因限流没有显示时保存 (上下文, 识别画面)，结束时补充显示
+                try:
+                    while cap.isOpened() and not self.close_flag:
+                        ret, frame = cap.read()
+                        if ret:
+                            if not total_frames:
+                                total_frames = self.read_video_properties(spooler)
+                            ctx = FrameContext(frame, self.frame_pool)
+                            image, detInfo, _ = self.frame_process(frame, self.uploaded_video.name, ctx)
+                            unshown = None if self.show_frames(ctx, image, "视频画面") else (ctx, image)
+
+                            self.logTable.add_frames(image, detInfo, ctx.copy(INFER_SIZE))
+                            self.update_stats_panel()
+                            self.update_memory_panel()
+                            self.update_telemetry_panel()
+
+                            # 更新进度条
+                            if total_frames > 0 and self.display_throttle.due("progress"):
+                                progress_percentage = min(int(((current_frame + 1) / total_frames) * 100), 100)
+                                self.progress_bar.progress(progress_percentage)
+
+                            current_frame += 1
                         else:
-                            self.image_placeholder.image(resized_frame, channels="BGR", caption="原始画面")
-                            self.image_placeholder_res.image(resized_image, channels="BGR", caption="识别画面")
-
-                        self.logTable.add_frames(image, detInfo, cv2.resize(frame, (640, 640)))
-
-                        # 更新进度条
-                        if total_length > 0:
-                            progress_percentage = int(((current_frame + 1) / total_frames) * 100)
-                            self.progress_bar.progress(progress_percentage)
-
-                        current_frame += 1
-                    else:
-                        break
-                if self.close_flag:
+                            break
+
+                    if unshown is not None:
+                        self.show_frames(*unshown, "视频画面", force=True)
+                    if not total_frames:
+                        spooler.wait_for(spooler.total_size)
+                        self.read_video_properties(spooler)  # 视频很短时循环结束前可能尚未读取帧率
+                    self.finish_progress()
                     self.logTable.save_to_csv()
-                    self.logTable.update_table(self.log_table_placeholder)
+                    self.update_log_table()
+                finally:
                     cap.release()
-
-                self.logTable.save_to_csv()
-                self.logTable.update_table(self.log_table_placeholder)
-                cap.release()
+                    spooler.close()
 
             else:
                 st.warning("请选择摄像头或上传文件。")
 
+    def process_multi_sources(self, grid_columns=2):
+        """
+        同时处理多路摄像头或视频流，以网格形式显示各路画面。
+
+        Args:
+            grid_columns (int): 网格的列数。
+
+        各路画面在独立线程中采集，合并为一个批次由同一个模型推理，表格区域显示各路的帧率、延迟和丢弃帧数。
+        """
+        self.logTable.clear_frames()
+        self.close_flag = self.close_placeholder.button(label="停止")
+        self.progress_bar.progress(0)
+
+        # 在画面区域创建网格，每路一个画面占位符
+        names = list(self.multi_sources.keys())
+        tiles = {}
+        with self.image_placeholder.container():
+            for row in range(0, len(names), grid_columns):
+                cols = st.columns(grid_columns)
+                for col, name in zip(cols, names[row:row + grid_columns]):
+                    tiles[name] = col.empty()
+        if self.display_mode == "双画面显示":
+            self.image_placeholder_res.empty()
+        tile_size = (self.display_throttle.display_size[0] // grid_columns,
+                     self.display_throttle.display_size[1] // grid_columns)
+        grid_throttle = DisplayThrottle(max_fps=self.display_throttle.max_fps, display_size=tile_size)
+
+        detector = self.model if self.model.heavy is not None else self.pool  # 级联复检需要会话自己的模型
+        camera_discovery().acquire(*self.multi_sources.values())
+        try:
+            processor = MultiSourceProcessor(detector, self.multi_sources).start()
+        except Exception:
+            camera_discovery().release(*self.multi_sources.values())  # 采集线程启动失败时归还占用计数
+            raise
+        params = {'conf': self.conf_threshold, 'iou': self.iou_threshold}
+        latest = {}  # 各路最近一帧的识别画面
+        try:
+            while not self.close_flag and not processor.finished:
+                batch = processor.next_batch()
+                for name, ctx, det_info, use_time in processor.process(batch, **params):
+                    image, detInfo, _ = self.draw_detections(ctx.canvas(INFER_SIZE), det_info, name, use_time)
+                    self.telemetry.record_frame(use_time)
+                    self.logTable.add_frames(image, detInfo, ctx.copy(INFER_SIZE))
+                    self.stats.update([info[4] for info in detInfo], [info[2] for info in detInfo])
+                    latest[name] = image
+
+                # 按界面刷新帧率统一推送所有画面
+                if latest and grid_throttle.should_push():
+                    grid_throttle.push([(tiles[name], image, name) for name, image in latest.items()])
+                    latest = {}
+                if self.display_throttle.due("table"):
+                    self.table_placeholder.dataframe(processor.metrics(), hide_index=True, use_container_width=True)
+                self.update_stats_panel()
+                self.update_memory_panel()
+                self.update_telemetry_panel()
+
+            if latest:
+                grid_throttle.push([(tiles[name], image, name) for name, image in latest.items()])  # 最后一批画面
+            self.table_placeholder.dataframe(processor.metrics(), hide_index=True, use_container_width=True)
+            self.logTable.save_to_csv()
+            self.update_log_table()
+            self.finish_progress()
+        finally:
+            processor.stop()
+            camera_discovery().release(*self.multi_sources.values())
+
+    def process_image_batch(self, grid_columns=4):
+        """
+        批量处理上传的多张图片。
+
+        Args:
+            grid_columns (int): 画廊每行的图片数。
+
+        图片在线程池中解码，解码下一批的同时按批次推理；每完成一批，结果写入结果记录、填入画廊并推进进度条。
+        """
+        files = self.uploaded_files
+        self.logTable.clear_frames()
+        self.close_flag = self.close_placeholder.button(label="停止")
+        self.progress_bar.progress(0)
+
+        # 在画面区域创建画廊，每张图片一个格子，按完成顺序填入
+        tiles = []
+        with self.image_placeholder.container():
+            for row in range(0, len(files), grid_columns):
+                cols = st.columns(grid_columns)
+                tiles += [col.empty() for col in cols[:len(files) - row]]
+        if self.display_mode == "双画面显示":
+            self.image_placeholder_res.empty()
+        tile_size = (self.display_throttle.display_size[0] // grid_columns,
+                     self.display_throttle.display_size[1] // grid_columns)
+
+        detector = self.model if self.model.heavy is not None else self.pool  # 级联复检需要会话自己的模型
+        params = {'conf': self.conf_threshold, 'iou': self.iou_threshold}
+        pools = [FrameBufferPool() for _ in range(self.batch_size)]  # 同一批的图片同时处理，缓冲区各自独立
+        failed = []  # 无法解码的图片
+        done = 0
+        for batch in decode_images(files, self.batch_size):
+            if self.close_flag:
+                break
+            decoded = [(done + i, f, img) for i, (f, img) in enumerate(batch) if img is not None]
+            for i, (f, img) in enumerate(batch):
+                if img is None:
+                    failed.append(f.name)
+                    tiles[done + i].warning("无法解码：%s" % f.name)
+            if decoded:
+                contexts = [FrameContext(img, pool) for (_, _, img), pool in zip(decoded, pools)]
+                images = [detector.preprocess(ctx.resized(INFER_SIZE)) for ctx in contexts]
+                t1 = time.time()
+                pred = detector.predict(images, **params)
+                use_time = (time.time() - t1) / len(images)  # 批次推理用时平摊到每张图片
+
+                for (index, f, _), ctx, res in zip(decoded, contexts, pred):
+                    det_info = detector.postprocess([res])
+                    image, detInfo, _ = self.draw_detections(ctx.canvas(INFER_SIZE), det_info, f.name, use_time)
+                    self.telemetry.record_frame(use_time)
+                    self.logTable.add_frames(image, detInfo, ctx.copy(INFER_SIZE))
+                    self.stats.update([info[4] for info in detInfo], [info[2] for info in detInfo])
+                    tiles[index].image(ctx.display(image, size=tile_size), channels="BGR",
+                                       caption="%s（%d 个目标）" % (f.name, len(detInfo)))
+
+            # 每完成一批推进进度条，结果记录按刷新间隔更新
+            done += len(batch)
+            self.progress_bar.progress(int(done / len(files) * 100), text="已处理 %d / %d 张图片" % (done, len(files)))
+            if self.display_throttle.due("table"):
+                self.update_log_table()
+            self.update_stats_panel()
+            self.update_memory_panel()
+            self.update_telemetry_panel()
+
+        self.logTable.save_to_csv()
+        self.update_log_table()
+        self.finish_progress()
+        if failed:
+            st.warning("以下图片无法解码：%s" % "、".join(failed))
+
+    def show_frames(self, ctx, image, caption, force=False):
+        """
+        按界面刷新帧率显示原始画面和识别画面。
+
+        Args:
+            ctx (FrameContext): 本帧的处理上下文，提供原始画面。
+            image (numpy.ndarray): 绘制了检测结果的画面。
+            caption (str): 单画面显示时的标题。
+            force (bool): 是否忽略刷新帧率立即显示（用于处理结束时显示最后一帧）。
+
+        Returns:
+            bool: 本帧是否已显示。
+
+        未到刷新时间或浏览器来不及接收时直接跳过本帧，不做缩放和编码。
+        """
+        if not force and not self.display_throttle.should_push():
+            return False
+        size = self.display_throttle.display_size
+        if self.display_mode == "单画面显示":
+            self.display_throttle.push([(self.image_placeholder, ctx.display(image, size=size), caption)])
+        else:
+            self.display_throttle.push([(self.image_placeholder, ctx.display(size=size), "原始画面"),
+                                        (self.image_placeholder_res, ctx.display(image, size=size), "识别画面")])
+        return True
+
+    def finish_progress(self):
+        """
+        处理结束时刷新被限流跳过的控件：进度条置满，统计、内存和资源面板立即刷新。
+        """
+        self.progress_bar.progress(100)
+        self.update_stats_panel(force=True)
+        self.update_memory_panel(force=True)
+        self.update_telemetry_panel(force=True)
+
+    def read_video_properties(self, spooler):
+        """
+        上传的视频写入完成后读取总帧数和帧率，并设置导出视频使用的源帧率。
+
+        Args:
+            spooler (UploadSpooler): 上传视频的写入器。
+
+        Returns:
+            int: 视频总帧数；尚未写完或无法读取时返回 0。
+        """
+        props = spooler.video_properties()
+        if props is None:
+            return 0
+        total_frames, fps = props
+        self.logTable.source_fps = fps if fps > 0 else None  # 导出视频时使用源帧率
+        return max(total_frames, 0)
+
     def toggle_comboBox(self, frame_id):
         """
         处理并显示指定帧的检测结果。
@@ -377,65 +934,97 @@ class Detection_UI:
                 self.image_placeholder.image(resized_frame, channels="BGR", caption="原始画面")
                 self.image_placeholder_res.image(resized_image, channels="BGR", caption="识别画面")
 
-    def frame_process(self, image, file_name):
+    def frame_process(self, image, file_name, ctx=None, cache_key=None, controller=None):
         """
         处理并预测单个图像帧的内容。
 
         Args:
             image (numpy.ndarray): 输入的图像。
             file_name (str): 处理的文件名。
+            ctx (FrameContext): 本帧的处理上下文，为 None 时新建。
+            cache_key: 图像的标识，给出时复用该图像缓存的候选框（见 YOLOv8v5Detector.predict_cached）。
+            controller (LatencyController): 延迟控制器，给出时按其当前档位推理。
 
         Returns:
             tuple: 处理后的图像，检测信息，选择信息列表。
 
         对输入图像进行预处理，使用模型进行预测，并处理预测结果。
         """
-        image = cv2.resize(image, (640, 640))  # 调整图像大小以适应模型
-        pre_img = self.model.preprocess(image)  # 对图像进行预处理
+        ctx = ctx if ctx is not None else FrameContext(image, self.frame_pool)
+        pre_img = self.model.preprocess(ctx.resized(INFER_SIZE))  # 调整图像大小以适应模型，结果在本帧内复用
+        image = ctx.canvas(INFER_SIZE)  # 绘制检测框的画布
 
-        # 更新模型参数
+        # 更新模型参数（会话自己的模型持有独立的参数副本，副本池的推理参数随调用传入）
         params = {'conf': self.conf_threshold, 'iou': self.iou_threshold}
         self.model.set_param(params)
 
         t1 = time.time()
-        pred = self.model.predict(pre_img)  # 使用模型进行预测
+        if cache_key is not None:
+            pred = self.session_model().predict_cached(pre_img, cache_key)  # 阈值变化时只重新过滤候选框
+        elif controller is not None:
+            pred = controller.predict(pre_img)  # 按延迟控制器的当前档位推理
+        elif self.model.heavy is not None:
+            pred = self.model.predict(pre_img, **params)  # 级联复检，复检帧也使用当前的阈值
+        else:
+            pred = self.pool.predict(pre_img, **params)  # 从共享副本池借出模型进行预测
         t2 = time.time()
         use_time = t2 - t1  # 计算单张图片推理时间
+        self.telemetry.record_frame(use_time)
 
         det = pred[0]  # 获取预测结果
 
+        # 如果有有效的检测结果，后处理并绘制
+        det_info = self.pool.postprocess(pred) if det is not None and len(det) else []
+        if self.shadow is not None:
+            self.shadow.offer(pre_img, det_info, use_time * 1000, **params)  # 抽中且后台空闲时交给候选模型
+        image, detInfo, select_info = self.draw_detections(image, det_info, file_name, use_time, show_table=True)
+
+        # 将本帧的检测结果计入识别统计
+        self.stats.update([info[4] for info in detInfo], [info[2] for info in detInfo])
+        return image, detInfo, select_info
+
+    def draw_detections(self, image, det_info, file_name, use_time, show_table=False):
+        """
+        在图像上绘制检测结果并写入日志。
+
+        Args:
+            image (numpy.ndarray): 绘制检测框的画布。
+            det_info (list): 模型后处理得到的检测结果列表。
+            file_name (str): 处理的文件名或视频源名称。
+            use_time (float): 推理用时。
+            show_table (bool): 是否在结果表格中显示检测结果。
+
+        Returns:
+            tuple: 绘制后的图像，检测信息，选择信息列表。
+        """
         # 初始化检测信息和选择信息列表
         detInfo = []
         select_info = ["全部目标"]
-
-        # 如果有有效的检测结果
-        if det is not None and len(det):
-            det_info = self.model.postprocess(pred)  # 后处理预测结果
-            if len(det_info):
-                disp_res = ResultLogger()
-                res = None
-                cnt = 0
-
-                # 遍历检测到的对象
-                for info in det_info:
-                    name, bbox, conf, cls_id = info['class_name'], info['bbox'], info['score'], info['class_id']
-                    label = '%s %.0f%%' % (name, conf * 100)
-
-                    res = disp_res.concat_results(name, bbox, str(round(conf, 2)), str(round(use_time, 2)))
-
-                    # 绘制检测框和标签
-                    image = drawRectBox(image, bbox, alpha=0.2, addText=label, color=self.colors[cls_id])
-                    # 添加日志条目
-                    self.logTable.add_log_entry(file_name, name, bbox, conf, use_time)
-                    # 记录检测信息
-                    detInfo.append([name, bbox, conf, use_time, cls_id])
-                    # 添加到选择信息列表
-                    select_info.append(name + "-" + str(cnt))
-                    cnt += 1
-
-                # 在表格中显示检测结果
+        if len(det_info):
+            disp_res = ResultLogger()
+            res = None
+            cnt = 0
+
+            # 遍历检测到的对象
+            for info in det_info:
+                name, bbox, conf, cls_id = info['class_name'], info['bbox'], info['score'], info['class_id']
+                label = '%s %.0f%%' % (name, conf * 100)
+
+                res = disp_res.concat_results(name, bbox, str(round(conf, 2)), str(round(use_time, 2)))
+
+                # 绘制检测框和标签
+                image = drawRectBox(image, bbox, alpha=0.2, addText=label, color=self.colors[cls_id])
+                # 添加日志条目
+                self.logTable.add_log_entry(file_name, name, bbox, conf, use_time, cls_id)
+                # 记录检测信息
+                detInfo.append([name, bbox, conf, use_time, cls_id])
+                # 添加到选择信息列表
+                select_info.append(name + "-" + str(cnt))
+                cnt += 1
+
+            # 在表格中显示检测结果，连续处理时按固定间隔刷新
+            if show_table and self.display_throttle.due("table"):
                 self.table_placeholder.table(res)
-
         return image, detInfo, select_info
 
     def frame_table_process(self, frame, caption):
@@ -492,19 +1081,32 @@ class Detection_UI:
         self.table_placeholder = st.empty()
         self.table_placeholder.table(res)
 
-        # 创建一个导出结果的按钮
+        # 创建一个导出结果的按钮，视频在后台线程中编码，不阻塞页面
         st.write("---------------------")
+        with st.expander("视频导出设置"):
+            col_codec, col_scale = st.columns(2)
+            export_codec = col_codec.selectbox("编码格式", available_codecs())
+            export_scale = col_scale.select_slider("输出尺寸", options=[0.25, 0.5, 0.75, 1.0], value=1.0,
+                                                   format_func=lambda v: "%d%%" % (v * 100))
         if st.button("导出结果"):
             self.logTable.save_to_csv()
-            res = self.logTable.save_frames_file()
+            det_file = self.logTable.save_detections(self.pool.names)
+            job = st.session_state.get('exportJob')
+            if job is not None and not job.done:
+                job.cancel()  # 新的导出替换尚未完成的导出
+            st.session_state['exportJob'] = self.logTable.export_frames(export_codec, export_scale)
             st.write("🚀识别结果文件已经保存：" + self.saved_log_data)
-            if res:
-                st.write(f"🚀结果的视频/图片文件已经保存：{res}")
+            if det_file:
+                st.write(f"🚀识别记录的二进制文件已经保存：{det_file}")
             self.logTable.clear_data()
+        self.show_export_status()
 
-        # 显示所有结果记录的空白表格
+        # 结果记录的查询条件，只生成当前页的数据
+        self.setup_log_filters()
+        # 显示所有结果记录的表格
         self.log_table_placeholder = st.empty()
-        self.logTable.update_table(self.log_table_placeholder)
+        self.log_info_placeholder = st.empty()
+        self.update_log_table()
 
         # 在第五列设置一个空的停止按钮占位符
         with col5:
@@ -544,6 +1146,11 @@ class Detection_UI:
                     if self.display_mode == "双画面显示":
                         self.image_placeholder_res.image(load_default_image(), caption="识别画面")
 
+        # 后台导出尚未完成时定时重新运行页面刷新进度；刚处理完识别任务的这次运行除外，避免清空识别画面
+        if self.export_running and not run_button:
+            time.sleep(1.0)
+            st.rerun()
+
 
 # 实例化并运行应用
 if __name__ == "__main__":
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import platform
+import time
+
+import cv2  # 导入OpenCV库，用于读取视频
+import numpy as np
+
+from DetectionExport import DetectionReader, export_detections
+from FrameContext import FrameBufferPool, FrameContext, INFER_SIZE
+from LoggerRes import DetectionLogStore
+
+STAGES = ("decode", "preprocess", "inference", "postprocess", "total")  # 逐帧计时的阶段
+# 默认的容差：检测结果的匹配率、匹配框的IoU和置信度变化，以及各阶段中位用时允许变慢的比例
+TOLERANCES = {
+    "min_recall": 0.98,  # 基准检测框中被当前结果匹配的比例
+    "min_precision": 0.98,  # 当前检测框中能匹配到基准的比例
+    "min_mean_iou": 0.95,  # 匹配框的平均IoU
+    "max_score_delta": 0.05,  # 匹配框置信度变化的最大值
+    "max_slowdown": 1.10,  # 各阶段中位用时与基准之比的上限
+    "min_slowdown_ms": 0.5,  # 变慢的绝对值低于该值（毫秒）时视为计时噪声
+}
+
+
+def box_iou(a, b):
+    """
+    计算两组边界框两两之间的IoU。
+
+    Args:
+        a (numpy.ndarray): (N, 4) 边界框 [x1, y1, x2, y2]。
+        b (numpy.ndarray): (M, 4) 边界框。
+
+    Returns:
+        numpy.ndarray: (N, M) IoU矩阵。
+    """
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match_detections(golden, current, iou_threshold=0.5):
+    """
+    同一帧内按类别贪心匹配检测框：当前结果按置信度从高到低，依次匹配IoU最大且未被匹配的同类基准框。
+
+    Args:
+        golden (dict): 基准检测，包含 box (N, 4)、class_id (N,)、score (N,)。
+        current (dict): 当前检测，格式同上。
+        iou_threshold (float): 视为同一目标的最小IoU。
+
+    Returns:
+        list: 匹配对 (基准下标, 当前下标, IoU)。
+    """
+    if not len(golden["score"]) or not len(current["score"]):
+        return []
+    iou = box_iou(golden["box"], current["box"])
+    iou[golden["class_id"][:, None] != current["class_id"][None, :]] = 0.0
+    matches = []
+    used = np.zeros(len(golden["score"]), dtype=bool)
+    for j in np.argsort(-current["score"], kind="stable"):
+        candidates = np.where(used, 0.0, iou[:, j])
+        i = int(np.argmax(candidates))
+        if candidates[i] >= iou_threshold:
+            used[i] = True
+            matches.append((i, int(j), float(candidates[i])))
+    return matches
+
+
+def _profile(timings, frames, detector):
+    # 各阶段的用时统计（毫秒）和运行环境
+    stages = {}
+    for stage in STAGES:
+        values = np.asarray(timings[stage]) * 1000
+        stages[stage] = {
+            "mean_ms": round(float(values.mean()), 3) if len(values) else None,
+            "p50_ms": round(float(np.percentile(values, 50)), 3) if len(values) else None,
+            "p95_ms": round(float(np.percentile(values, 95)), 3) if len(values) else None,
+        }
+    return {
+        "frames": frames,
+        "stages": stages,
+        "params": {k: detector.params.get(k) for k in ("conf", "iou", "classes", "device")},
+        "precision": detector.precision,
+        "model": os.path.basename(detector.model_key[0]) if detector.model_key else None,
+        "host": {"platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count()},
+        "created": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime()),
+    }
+
+
+def replay(detector, video_path, max_frames=None, stride=1):
+    """
+    按网页端的处理流程逐帧重放视频，记录检测结果和各阶段用时。
+
+    Args:
+        detector (YOLOv8v5Detector): 已加载模型的检测器。
+        video_path (str): 视频文件路径。
+        max_frames (int): 最多处理的帧数，None 表示整段视频。
+        stride (int): 每隔几帧处理一帧。
+
+    Returns:
+        tuple: (DetectionLogStore 检测结果（边界框保留浮点坐标）, 用时统计 dict)。
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError("无法打开视频：%s" % video_path)
+    store = DetectionLogStore()
+    pool = FrameBufferPool()
+    timings = {stage: [] for stage in STAGES}
+    source = os.path.basename(video_path)
+    frame_index, processed = -1, 0
+    try:
+        while max_frames is None or processed < max_frames:
+            t0 = time.perf_counter()
+            ret, frame = cap.read()
+            t1 = time.perf_counter()
+            if not ret:
+                break
+            frame_index += 1
+            if frame_index % stride:
+                continue
+            pre_img = detector.preprocess(FrameContext(frame, pool).resized(INFER_SIZE))
+            t2 = time.perf_counter()
+            pred = detector.predict(pre_img)
+            t3 = time.perf_counter()
+            det_info = detector.postprocess(pred)
+            t4 = time.perf_counter()
+            for stage, elapsed in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t4 - t0)):
+                timings[stage].append(elapsed)
+
+            # postprocess 的边界框为整数，基准使用模型输出的浮点坐标
+            boxes = pred[0].boxes
+            xyxy = boxes.xyxy.cpu().numpy()
+            for info, box, score in zip(det_info, xyxy, boxes.conf.cpu().numpy()):
+                store.append(source, info["class_name"], box, float(score), t3 - t2, timestamp=t0,
+                             frame_index=frame_index, class_id=info["class_id"])
+            processed += 1
+    finally:
+        cap.release()
+    return store, _profile(timings, processed, detector)
+
+
+def save_golden(store, profile, out_dir, class_names=None):
+    """
+    保存基准检测结果（export_detections 格式）和用时统计（profile.json）。
+
+    Returns:
+        str: 基准目录。
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for name in os.listdir(out_dir):
+        if name.startswith("detections."):
+            os.remove(os.path.join(out_dir, name))  # 格式可能与上次不同（arrow/npz），先删除旧文件
+    export_detections(store, os.path.join(out_dir, "detections"), class_names)
+    with open(os.path.join(out_dir, "profile.json"), "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    return out_dir
+
+
+def load_golden(golden_dir):
+    """
+    读取基准目录。
+
+    Returns:
+        tuple: (DetectionReader, 用时统计 dict)；基准不存在时抛出 FileNotFoundError。
+    """
+    for ext in (".arrow", ".npz"):
+        path = os.path.join(golden_dir, "detections" + ext)
+        if os.path.exists(path):
+            with open(os.path.join(golden_dir, "profile.json"), "r", encoding="utf-8") as f:
+                return DetectionReader(path), json.load(f)
+    raise FileNotFoundError("基准不存在：%s" % golden_dir)
+
+
+def _by_frame(frames, boxes, class_ids, scores):
+    # 按帧序号分组（记录按帧序号递增）
+    groups = {}
+    starts = np.flatnonzero(np.r_[True, frames[1:] != frames[:-1]]) if len(frames) else []
+    ends = list(starts[1:]) + [len(frames)]
+    for start, end in zip(starts, ends):
+        groups[int(frames[start])] = {"box": boxes[start:end], "class_id": class_ids[start:end],
+                                      "score": scores[start:end]}
+    return groups
+
+
+def compare(golden, golden_profile, store, profile, iou_threshold=0.5, tolerances=None):
+    """
+    将当前结果与基准逐帧比较：检测框按类别和IoU匹配，各阶段用时按中位数比较。
+
+    Args:
+        golden (DetectionReader): 基准检测结果。
+        golden_profile (dict): 基准用时统计。
+        store (DetectionLogStore): 当前检测结果（replay 的返回值）。
+        profile (dict): 当前用时统计。
+        iou_threshold (float): 匹配的最小IoU。
+        tolerances (dict): 覆盖 TOLERANCES 中的容差。
+
+    Returns:
+        dict: 准确性指标、各阶段的用时对比（speedup > 1 表示变快）、差异最大的帧、未通过的检查项和是否通过。
+
+    用时只在与基准相同的机器上作为检查项；检测参数、推理精度或模型与基准不同时给出警告。
+    """
+    tol = dict(TOLERANCES, **(tolerances or {}))
+    cols = store.columns()
+    ref = _by_frame(np.asarray(golden["frame"]), golden.boxes, np.asarray(golden["class_id"]),
+                    np.asarray(golden["score"]))
+    cur = _by_frame(cols["frame"], cols["box"], cols["class_id"], cols["score"])
+    empty = {"box": np.empty((0, 4)), "class_id": np.empty(0, dtype=np.int32), "score": np.empty(0)}
+
+    matched, ious, score_deltas, frame_diffs = 0, [], [], []
+    for frame in sorted(set(ref) | set(cur)):
+        g, c = ref.get(frame, empty), cur.get(frame, empty)
+        matches = match_detections(g, c, iou_threshold)
+        matched += len(matches)
+        ious += [iou for _, _, iou in matches]
+        score_deltas += [abs(float(g["score"][i]) - float(c["score"][j])) for i, j, _ in matches]
+        missing, extra = len(g["score"]) - len(matches), len(c["score"]) - len(matches)
+        if missing or extra:
+            frame_diffs.append({"frame": frame, "missing": missing, "extra": extra})
+
+    n_ref, n_cur = len(golden), len(store)
+    accuracy = {
+        "golden_detections": n_ref,
+        "detections": n_cur,
+        "matched": matched,
+        "recall": round(matched / n_ref, 4) if n_ref else 1.0,
+        "precision": round(matched / n_cur, 4) if n_cur else 1.0,
+        "mean_iou": round(float(np.mean(ious)), 4) if ious else 1.0,
+        "max_score_delta": round(float(np.max(score_deltas)), 4) if score_deltas else 0.0,
+        "frames_compared": max(golden_profile["frames"], profile["frames"]),
+        "frames_with_diff": len(frame_diffs),
+    }
+    timing = {}
+    for stage in STAGES:
+        base, now = golden_profile["stages"][stage]["p50_ms"], profile["stages"][stage]["p50_ms"]
+        if base and now:
+            timing[stage] = {"golden_p50_ms": base, "p50_ms": now, "speedup": round(base / now, 3)}
+
+    failures = []
+    if golden_profile["frames"] != profile["frames"]:
+        failures.append("帧数不同：基准 %d，当前 %d" % (golden_profile["frames"], profile["frames"]))
+    if accuracy["recall"] < tol["min_recall"]:
+        failures.append("召回率 %.4f 低于 %.4f" % (accuracy["recall"], tol["min_recall"]))
+    if accuracy["precision"] < tol["min_precision"]:
+        failures.append("精确率 %.4f 低于 %.4f" % (accuracy["precision"], tol["min_precision"]))
+    if accuracy["mean_iou"] < tol["min_mean_iou"]:
+        failures.append("平均IoU %.4f 低于 %.4f" % (accuracy["mean_iou"], tol["min_mean_iou"]))
+    if accuracy["max_score_delta"] > tol["max_score_delta"]:
+        failures.append("置信度最大变化 %.4f 超过 %.4f" % (accuracy["max_score_delta"], tol["max_score_delta"]))
+    same_host = golden_profile.get("host") == profile.get("host")
+    for stage, t in timing.items():
+        if same_host and t["p50_ms"] > t["golden_p50_ms"] * tol["max_slowdown"] and \
+                t["p50_ms"] - t["golden_p50_ms"] > tol["min_slowdown_ms"]:
+            failures.append("%s 阶段变慢：%.2f ms -> %.2f ms" % (stage, t["golden_p50_ms"], t["p50_ms"]))
+
+    warnings = []
+    if not same_host:
+        warnings.append("基准在不同的机器上生成，用时只做对比，不作为检查项")
+    for key in ("params", "precision", "model"):
+        if golden_profile.get(key) != profile.get(key):
+            warnings.append("%s 与基准不同：%s -> %s" % (key, golden_profile.get(key), profile.get(key)))
+
+    frame_diffs.sort(key=lambda d: d["missing"] + d["extra"], reverse=True)
+    return {
+        "passed": not failures,
+        "failures": failures,
+        "warnings": warnings,
+        "accuracy": accuracy,
+        "timing": timing,
+        "worst_frames": frame_diffs[:20],
+        "tolerances": tol,
+    }
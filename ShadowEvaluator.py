@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+
+import numpy as np
+
+from RegressionReplay import match_detections
+
+
+def _lower_thread_priority(niceness=10):
+    # 降低当前线程的调度优先级（Linux 上 setpriority 对线程ID生效），其他平台不支持时忽略
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), niceness)
+    except (AttributeError, OSError):
+        pass
+
+
+def _as_arrays(det_info, codes):
+    # postprocess 的结果转为匹配用的数组，类别按名称编码，两个模型的类别编号不同也能比较
+    return {
+        "box": np.asarray([info["bbox"] for info in det_info], dtype=np.float64).reshape(-1, 4),
+        "class_id": np.asarray([codes.setdefault(info["class_name"], len(codes)) for info in det_info],
+                               dtype=np.int64),
+        "score": np.asarray([info["score"] for info in det_info], dtype=np.float64),
+    }
+
+
+def _shadow_worker(evaluator_ref, jobs, stopped, poll_interval=1.0):
+    # 后台线程只持有评估器的弱引用：会话结束后评估器及其候选模型可被回收，线程随之退出
+    _lower_thread_priority()
+    while not stopped.is_set():
+        try:
+            item = jobs.get(timeout=poll_interval)
+        except queue.Empty:
+            if evaluator_ref() is None:
+                return
+            continue
+        evaluator = evaluator_ref()
+        if item is None or evaluator is None or stopped.is_set():
+            return
+        evaluator._process(item)
+        del evaluator, item  # 等待下一帧时不保留强引用
+
+
+class ShadowEvaluator:
+    def __init__(self, candidate, sample_rate=0.1, iou_threshold=0.5, history=500):
+        """
+        影子模式：候选模型在后台低优先级线程中处理抽样的实时帧，与主模型的结果和用时比较，不影响实时画面。
+
+        Args:
+            candidate (YOLOv8v5Detector): 已加载模型的候选检测器。
+            sample_rate (float): 抽样比例（0~1），按比例均匀抽取帧。
+            iou_threshold (float): 两个模型的检测框视为同一目标的最小IoU（同时要求类别名称相同）。
+            history (int): 统计用时分位数使用的最近帧数。
+
+        offer 只在抽中且后台空闲时复制一帧并立即返回，后台仍在处理上一帧时直接跳过，主循环从不等待。
+        候选模型在较低的线程优先级下运行，统计中的候选模型用时偏保守。
+        后台线程不持有评估器本身，会话结束而未调用 stop 时，评估器被回收后线程也会退出。
+        """
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.iou_threshold = iou_threshold
+        self._accum = 0.0
+        self._queue = queue.Queue(maxsize=1)
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._codes = {}  # 类别名称 -> 比较用的编号
+        self._primary_ms = deque(maxlen=history)
+        self._candidate_ms = deque(maxlen=history)
+        self.reset_stats()
+        self._thread = threading.Thread(target=_shadow_worker, args=(weakref.ref(self), self._queue, self._stopped),
+                                        daemon=True)
+        self._thread.start()
+        weakref.finalize(self, self._stopped.set)  # 评估器被回收时通知后台线程退出
+
+    def reset_stats(self):
+        """清零统计。"""
+        with self._lock:
+            self.evaluated = 0  # 已比较的帧数
+            self.skipped = 0  # 抽中但后台繁忙而跳过的帧数
+            self.primary_boxes = 0
+            self.candidate_boxes = 0
+            self.matched = 0
+            self.agreed_frames = 0  # 两个模型的检测结果完全一致的帧数
+            self.errors = 0  # 候选模型推理失败的帧数
+            self.last_error = None  # 最近一次失败的原因
+            self._iou_sum = 0.0
+            self._primary_ms.clear()
+            self._candidate_ms.clear()
+
+    def offer(self, image, primary_info, primary_ms, **params):
+        """
+        提交主模型处理过的一帧（在主循环中调用，不会阻塞）。
+
+        Args:
+            image (numpy.ndarray): 主模型的输入图像，抽中时会被复制。
+            primary_info (list): 主模型 postprocess 的结果。
+            primary_ms (float): 主模型的推理用时（毫秒）。
+            **params: 推理参数（如 conf、iou），候选模型使用相同的参数。
+
+        Returns:
+            bool: 该帧是否交给了候选模型。
+        """
+        if self._stopped.is_set():
+            return False
+        self._accum += self.sample_rate
+        if self._accum < 1.0:
+            return False
+        self._accum -= 1.0
+        if self._queue.full():
+            with self._lock:
+                self.skipped += 1
+            return False
+        try:
+            self._queue.put_nowait((image.copy(), primary_info, primary_ms, params))
+        except queue.Full:
+            with self._lock:
+                self.skipped += 1
+            return False
+        return True
+
+    def stop(self):
+        """停止后台线程（不等待正在处理的帧完成）。"""
+        self._stopped.set()
+        while True:
+            try:
+                self._queue.get_nowait()  # 丢弃尚未处理的帧，为停止标记腾出位置
+            except queue.Empty:
+                break
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass  # 并发的 offer 刚放入了一帧，后台线程处理完该帧后检查停止标志退出
+
+    def _process(self, item):
+        try:
+            self._evaluate(*item)
+        except Exception as e:  # 候选模型出错（如显存不足、权重损坏）时记录原因，继续处理后续帧
+            with self._lock:
+                self.errors += 1
+                self.last_error = "%s: %s" % (type(e).__name__, e)
+
+    def _evaluate(self, image, primary_info, primary_ms, params):
+        t1 = time.perf_counter()
+        pred = self.candidate.predict(image, **params)
+        candidate_ms = (time.perf_counter() - t1) * 1000
+        det = pred[0]
+        candidate_info = self.candidate.postprocess(pred) if det is not None and len(det) else []
+        primary = _as_arrays(primary_info, self._codes)
+        candidate = _as_arrays(candidate_info, self._codes)
+        matches = match_detections(primary, candidate, self.iou_threshold)
+        with self._lock:
+            self.evaluated += 1
+            self.primary_boxes += len(primary_info)
+            self.candidate_boxes += len(candidate_info)
+            self.matched += len(matches)
+            self._iou_sum += sum(iou for _, _, iou in matches)
+            if len(matches) == len(primary_info) == len(candidate_info):
+                self.agreed_frames += 1
+            self._primary_ms.append(primary_ms)
+            self._candidate_ms.append(candidate_ms)
+
+    def stats(self):
+        """
+        比较统计。
+
+        Returns:
+            dict: 比较帧数、跳过帧数、失败帧数和最近的失败原因、以主模型为参照的召回率和精确率、匹配框平均IoU、结果完全一致的帧比例，
+                以及两个模型的平均/P95用时（毫秒）和候选模型的加速比（>1 表示更快）。
+        """
+        with self._lock:
+            primary_ms = np.asarray(self._primary_ms)
+            candidate_ms = np.asarray(self._candidate_ms)
+            return {
+                "frames": self.evaluated,
+                "skipped": self.skipped,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "recall": round(self.matched / self.primary_boxes, 4) if self.primary_boxes else 1.0,
+                "precision": round(self.matched / self.candidate_boxes, 4) if self.candidate_boxes else 1.0,
+                "mean_iou": round(self._iou_sum / self.matched, 4) if self.matched else None,
+                "frame_agreement": round(self.agreed_frames / self.evaluated, 4) if self.evaluated else None,
+                "primary_ms": round(float(primary_ms.mean()), 1) if len(primary_ms) else None,
+                "primary_p95_ms": round(float(np.percentile(primary_ms, 95)), 1) if len(primary_ms) else None,
+                "candidate_ms": round(float(candidate_ms.mean()), 1) if len(candidate_ms) else None,
+                "candidate_p95_ms": round(float(np.percentile(candidate_ms, 95)), 1) if len(candidate_ms) else None,
+                "speedup": round(float(primary_ms.mean() / candidate_ms.mean()), 3) if len(candidate_ms) else None,
+            }
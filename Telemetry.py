@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import psutil
+
+# 环形缓冲区中的指标：列名 -> (Prometheus指标名, 说明)
+METRICS = {
+    "process_cpu": ("dlcv_process_cpu_percent", "进程CPU占用（%，多核累加）"),
+    "rss_mb": ("dlcv_process_rss_megabytes", "进程常驻内存（MB）"),
+    "threads": ("dlcv_process_threads", "进程线程数"),
+    "system_cpu": ("dlcv_system_cpu_percent", "系统CPU占用（%）"),
+    "system_memory": ("dlcv_system_memory_percent", "系统内存占用（%）"),
+    "fps": ("dlcv_pipeline_fps", "处理帧率"),
+    "latency_ms": ("dlcv_pipeline_latency_milliseconds", "每帧平均用时（毫秒）"),
+}
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        sampler = self.server.sampler
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            body, content_type = sampler.to_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body, content_type = json.dumps(sampler.to_dict(), ensure_ascii=False), "application/json; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # 不在控制台打印每次抓取
+
+
+class TelemetrySampler:
+    def __init__(self, interval=1.0, capacity=600):
+        """
+        在后台线程中定时采集进程和系统的资源指标以及处理流程的帧率和延迟，保存在环形缓冲区中。
+
+        Args:
+            interval (float): 采样间隔（秒）。
+            capacity (int): 环形缓冲区保存的采样数，默认保存最近10分钟。
+
+        处理流程每完成一帧调用 record_frame，采样线程按间隔汇总为帧率和平均用时，调用方不需要自己计时。
+        指标可以通过 series 生成表格绘制曲线，也可以通过 serve 启动的本地HTTP接口以Prometheus文本或JSON格式抓取。
+        """
+        self.interval = interval
+        self.capacity = capacity
+        self.cores = psutil.cpu_count() or 1
+        self._time = np.full(capacity, np.nan)
+        self._values = {name: np.full(capacity, np.nan) for name in METRICS}
+        self._per_core = np.full((capacity, self.cores), np.nan)
+        self._count = 0  # 累计采样数，写入位置为 _count % capacity
+        self._lock = threading.Lock()
+        self._process = psutil.Process()
+        self.frames = 0  # 累计处理帧数
+        self._frames_at_sample = 0
+        self._latency_sum = 0.0  # 自上次采样以来的用时之和（秒）
+        self._server = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """启动采样线程（已启动时不重复启动）。"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """停止采样线程和HTTP接口。"""
+        self._stop.set()
+        self.stop_server()
+
+    def record_frame(self, latency):
+        """
+        记录处理完成的一帧。
+
+        Args:
+            latency (float): 该帧的处理用时（秒）。
+        """
+        with self._lock:
+            self.frames += 1
+            self._latency_sum += latency
+
+    def _run(self):
+        # 首次调用 cpu_percent 只建立基准，返回值无意义
+        self._process.cpu_percent(None)
+        psutil.cpu_percent(None, percpu=True)
+        last = time.time()
+        while not self._stop.wait(self.interval):
+            now = time.time()
+            self.sample(now - last)
+            last = now
+
+    def sample(self, elapsed=None):
+        """
+        采集一次指标并写入环形缓冲区（通常由采样线程调用）。
+
+        Args:
+            elapsed (float): 距上次采样的时间（秒），用于计算帧率，默认为采样间隔。
+        """
+        elapsed = elapsed or self.interval
+        try:
+            with self._process.oneshot():
+                process_cpu = self._process.cpu_percent(None)
+                rss_mb = self._process.memory_info().rss / 2 ** 20
+                threads = self._process.num_threads()
+            per_core = psutil.cpu_percent(None, percpu=True)
+            system_memory = psutil.virtual_memory().percent
+        except psutil.Error:
+            return
+        with self._lock:
+            frames = self.frames - self._frames_at_sample
+            latency = self._latency_sum / frames * 1000 if frames else np.nan
+            self._frames_at_sample, self._latency_sum = self.frames, 0.0
+            i = self._count % self.capacity
+            self._time[i] = time.time()
+            values = {
+                "process_cpu": process_cpu,
+                "rss_mb": rss_mb,
+                "threads": threads,
+                "system_cpu": float(np.mean(per_core)),
+                "system_memory": system_memory,
+                "fps": frames / elapsed,
+                "latency_ms": latency,
+            }
+            for name, value in values.items():
+                self._values[name][i] = value
+            self._per_core[i, :len(per_core)] = per_core[:self.cores]
+            self._count += 1
+
+    def _order(self, last):
+        # 最近 last 个采样在缓冲区中的位置，按时间先后排列
+        n = min(self._count, self.capacity, last or self.capacity)
+        return (np.arange(self._count - n, self._count)) % self.capacity
+
+    def series(self, last=None):
+        """
+        最近的采样序列，用于绘制曲线。
+
+        Args:
+            last (int): 采样数，None 表示缓冲区中的全部采样。
+
+        Returns:
+            pd.DataFrame: 以采样时间为索引，列为 METRICS 中的指标。
+        """
+        with self._lock:
+            order = self._order(last)
+            frame = pd.DataFrame({name: values[order] for name, values in self._values.items()},
+                                 index=pd.to_datetime(self._time[order], unit="s"))
+        return frame
+
+    def latest(self):
+        """
+        最近一次采样。
+
+        Returns:
+            dict: 指标名 -> 数值，另有 per_core（各核心CPU占用）和 frames（累计处理帧数）；尚未采样时为 None。
+        """
+        with self._lock:
+            if not self._count:
+                return None
+            i = (self._count - 1) % self.capacity
+            result = {name: float(values[i]) for name, values in self._values.items()}
+            result["per_core"] = self._per_core[i].tolist()
+            result["frames"] = self.frames
+            result["time"] = float(self._time[i])
+        return result
+
+    def to_dict(self, last=60):
+        """
+        JSON接口返回的数据：最近一次采样和最近若干次采样的序列。
+        """
+        frame = self.series(last)
+        history = {name: [None if np.isnan(v) else round(float(v), 3) for v in frame[name]] for name in frame}
+        history["time"] = [t.timestamp() for t in frame.index]
+        latest = self.latest()
+        if latest is not None:
+            # JSON 不支持 NaN（采样间隔内没有处理帧时延迟为 NaN）
+            latest = {k: None if isinstance(v, float) and np.isnan(v) else v for k, v in latest.items()}
+            latest["per_core"] = [None if np.isnan(v) else v for v in latest["per_core"]]
+        return {"latest": latest, "history": history}
+
+    def to_prometheus(self):
+        """
+        最近一次采样的Prometheus文本格式。
+        """
+        latest = self.latest()
+        if latest is None:
+            return ""
+        lines = []
+        for name, (metric, help_text) in METRICS.items():
+            if np.isnan(latest[name]):
+                continue
+            lines += ["# HELP %s %s" % (metric, help_text), "# TYPE %s gauge" % metric,
+                      "%s %s" % (metric, repr(round(latest[name], 3)))]
+        lines += ["# HELP dlcv_cpu_core_percent 各核心CPU占用（%）", "# TYPE dlcv_cpu_core_percent gauge"]
+        lines += ['dlcv_cpu_core_percent{core="%d"} %s' % (i, repr(v)) for i, v in enumerate(latest["per_core"])
+                  if not np.isnan(v)]
+        lines += ["# HELP dlcv_pipeline_frames_total 累计处理帧数", "# TYPE dlcv_pipeline_frames_total counter",
+                  "dlcv_pipeline_frames_total %d" % latest["frames"]]
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9108, host="127.0.0.1"):
+        """
+        启动本地HTTP接口：/metrics 为Prometheus文本格式，/metrics.json 为JSON格式。
+
+        Args:
+            port (int): 监听端口，已在该端口运行时不重复启动，端口变化时在新端口启动后再停止原来的接口。
+            host (str): 监听地址，默认只允许本机访问。
+
+        Returns:
+            str: 接口地址。端口被占用时抛出 OSError，原来的接口继续运行。
+        """
+        if self._server is not None and self._server.server_address[1] == port:
+            return self.address
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        server.daemon_threads = True
+        server.sampler = self
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.stop_server()
+        self._server = server
+        return self.address
+
+    @property
+    def serving(self):
+        """HTTP接口是否正在运行。"""
+        return self._server is not None
+
+    @property
+    def address(self):
+        """正在运行的接口地址，未运行时为 None。"""
+        if self._server is None:
+            return None
+        return "http://%s:%d/metrics" % self._server.server_address[:2]
+
+    def stop_server(self):
+        """停止HTTP接口。"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def telemetry():
+    """
+    获取进程内共享的 TelemetrySampler 实例（首次调用时启动采样线程），所有页面会话共用。
+    """
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = TelemetrySampler().start()
+        return _telemetry
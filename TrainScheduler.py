@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import json
+import multiprocessing as mp
+import os
+import queue
+import time
+
+import yaml
+
+
+def available_cores():
+    """
+    获取当前进程可以使用的CPU核心编号列表。
+
+    Returns:
+        list: CPU核心编号。
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def partition_cores(cores, parts):
+    """
+    将CPU核心尽量均匀地划分为若干组连续的分区。
+
+    Args:
+        cores (list): CPU核心编号列表。
+        parts (int): 分区数量。
+
+    Returns:
+        list: 每个分区包含的核心编号列表。
+    """
+    parts = max(1, min(parts, len(cores)))
+    size, extra = divmod(len(cores), parts)
+    partitions, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        partitions.append(cores[start:end])
+        start = end
+    return partitions
+
+
+def load_configs(config_path):
+    """
+    从YAML或JSON文件读取训练配置列表。
+
+    Args:
+        config_path (str): 配置文件路径，内容为配置字典组成的列表。
+
+    Returns:
+        list: 训练配置列表。
+    """
+    with open(config_path, 'r', encoding='utf-8') as file:
+        if config_path.endswith(".json"):
+            return json.load(file)
+        return yaml.safe_load(file)
+
+
+@contextlib.contextmanager
+def _thread_environ(threads):
+    """
+    临时设置OpenMP/MKL线程数环境变量，在此期间启动的子进程会继承这些变量。
+
+    spawn 方式的子进程会重新导入主模块（如 run_train_model.py 在顶层导入了torch），
+    子进程中再设置环境变量时OpenMP线程池已按全部核心创建，因此必须在启动子进程之前设置。
+    """
+    names = ("OMP_NUM_THREADS", "MKL_NUM_THREADS")
+    saved = {name: os.environ.get(name) for name in names}
+    os.environ.update({name: str(threads) for name in names})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _finished_checkpoint(ckpt_path):
+    """
+    读取检查点，判断训练是否已经完成。
+
+    Args:
+        ckpt_path (str): last.pt 路径。
+
+    Returns:
+        dict: 已完成训练的检查点（训练结束时会删除优化器状态并将 epoch 置为 -1），
+            检查点可以续训时返回 None。
+    """
+    from ultralytics.nn.tasks import torch_safe_load
+
+    ckpt, _ = torch_safe_load(ckpt_path)
+    if ckpt.get("optimizer") is None or ckpt.get("epoch", -1) < 0:
+        return ckpt
+    return None
+
+
+def _train_worker(config, cores, data_path, device, project, result_queue):
+    """
+    训练子进程入口：绑定CPU分区后训练一个模型，必要时从断点继续。
+
+    Args:
+        config (dict): 训练配置，必须包含 name 和 model，dataset_cache 表示是否读取数据集缓存，
+            其余键直接作为 model.train 的参数。
+        cores (list): 分配给本次训练的CPU核心。
+        data_path (str): 数据集yaml文件路径。
+        device (str): 训练设备。
+        project (str): 训练结果保存目录。
+        result_queue (Queue): 用于返回训练摘要的队列。
+    """
+    # OpenMP/MKL线程数由调度器在启动子进程前通过环境变量设置（见 _thread_environ），这里绑定核心并限制torch线程数
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)  # 数据加载子进程会继承该亲和性
+
+    import torch
+    from ultralytics import YOLO  # 导入YOLO模型
+
+    torch.set_num_threads(len(cores))
+    config = dict(config)
+    name = config.pop("name")
+    model_path = config.pop("model")
+    train_kwargs = {}
+    if config.pop("dataset_cache", False):
+        from DatasetCache import CachedDetectionTrainer
+        train_kwargs["trainer"] = CachedDetectionTrainer  # 从预处理好的内存映射缓存读取数据
+    config.setdefault("workers", max(1, len(cores) // 2))  # 数据加载进程数随分区大小调整
+
+    run_dir = os.path.join(project, name)
+    last_ckpt = os.path.join(run_dir, "weights", "last.pt")
+    resumed = os.path.exists(last_ckpt)
+    done_ckpt = _finished_checkpoint(last_ckpt) if resumed else None
+    if done_ckpt is not None:
+        # 检查点来自已完成的训练（如旧版训练脚本，或写入完成标记前被终止），无需续训，直接补写摘要
+        metrics = done_ckpt.get("train_metrics") or {}
+        _write_summary(run_dir, result_queue, {
+            "name": name,
+            "model": model_path,
+            "status": "finished",
+            "resumed": False,
+            "cores": list(cores),
+            "workers": config["workers"],
+            "epochs_run": 0,
+            "wall_time": 0.0,
+            "time_per_epoch": None,
+            "images_per_sec": None,
+            "mAP50": metrics.get("metrics/mAP50(B)"),
+            "mAP50-95": metrics.get("metrics/mAP50-95(B)"),
+        })
+        return
+
+    epoch_times = []  # 本次运行中每个epoch的用时
+    state = {"epoch_start": None, "num_images": 0, "metrics": {}}
+
+    def on_train_epoch_start(trainer):
+        state["epoch_start"] = time.time()
+
+    def on_fit_epoch_end(trainer):
+        if state["epoch_start"] is not None:
+            epoch_times.append(time.time() - state["epoch_start"])
+        state["num_images"] = len(trainer.train_loader.dataset)
+
+    def on_train_end(trainer):
+        state["metrics"] = {k: float(v) for k, v in (trainer.metrics or {}).items()}
+
+    if resumed:
+        # 存在上次中断的检查点，从断点继续训练（超参数沿用检查点中保存的配置）
+        model = YOLO(last_ckpt)
+    else:
+        model = YOLO(model_path, task='detect')
+    model.add_callback("on_train_epoch_start", on_train_epoch_start)
+    model.add_callback("on_fit_epoch_end", on_fit_epoch_end)
+    model.add_callback("on_train_end", on_train_end)
+
+    started = time.time()
+    if resumed:
+        model.train(resume=True, **train_kwargs)
+    else:
+        model.train(data=data_path, device=device, project=project, name=name, exist_ok=True,
+                    **train_kwargs, **config)
+
+    time_per_epoch = sum(epoch_times) / len(epoch_times) if epoch_times else None
+    summary = {
+        "name": name,
+        "model": model_path,
+        "status": "finished",
+        "resumed": resumed,
+        "cores": list(cores),
+        "workers": config["workers"],
+        "epochs_run": len(epoch_times),
+        "wall_time": time.time() - started,
+        "time_per_epoch": time_per_epoch,
+        "images_per_sec": state["num_images"] / time_per_epoch if time_per_epoch else None,
+        "mAP50": state["metrics"].get("metrics/mAP50(B)"),
+        "mAP50-95": state["metrics"].get("metrics/mAP50-95(B)"),
+    }
+    _write_summary(run_dir, result_queue, summary)
+
+
+def _write_summary(run_dir, result_queue, summary):
+    # 写入完成标记，之后再次调度时直接跳过该训练
+    with open(os.path.join(run_dir, "scheduler_done.json"), 'w', encoding='utf-8') as file:
+        json.dump(summary, file, ensure_ascii=False, indent=2)
+    result_queue.put(summary)
+
+
+class TrainScheduler:
+    def __init__(self, configs, data_path, device, project, max_parallel=None, cores=None):
+        """
+        并发训练多个模型的调度器。
+
+        Args:
+            configs (list): 训练配置列表，每项包含 name、model 以及传给 model.train 的超参数；
+                dataset_cache 为真时从 DatasetCache 生成的缓存读取数据。
+            data_path (str): 数据集yaml文件路径。
+            device (str): 训练设备，如 "cpu" 或 "0"。
+            project (str): 训练结果保存目录，每个训练保存在 project/name 下。
+            max_parallel (int): 同时运行的训练数量，默认等于配置数量。
+            cores (list): 可供分配的CPU核心，默认为当前进程可用的全部核心。
+        """
+        self.configs = list(configs)
+        self.data_path = data_path
+        self.device = device
+        self.project = project
+        self.max_parallel = max_parallel or len(self.configs)
+        self.partitions = partition_cores(cores or available_cores(), self.max_parallel)
+        self.summary_path = os.path.join(project, "train_summary.json")
+        self.results = {}
+
+    def _finished_summary(self, name):
+        done_file = os.path.join(self.project, name, "scheduler_done.json")
+        if os.path.exists(done_file):
+            with open(done_file, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        return None
+
+    def _collect(self, result_queue, timeout):
+        try:
+            summary = result_queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+        self.results[summary["name"]] = summary
+
+    def run(self):
+        """
+        调度并运行所有训练，返回汇总结果。
+
+        Returns:
+            list: 每个训练的摘要，顺序与配置一致。
+        """
+        os.makedirs(self.project, exist_ok=True)
+        ctx = mp.get_context("spawn")
+        result_queue = ctx.Queue()
+        free = list(self.partitions)
+        pending = []
+        for config in self.configs:
+            summary = self._finished_summary(config["name"])
+            if summary is not None:
+                self.results[config["name"]] = dict(summary, status="skipped")  # 已完成的训练不再重复
+            else:
+                pending.append(config)
+
+        running = {}  # 训练名称 -> (进程, 核心分区)
+        try:
+            while pending or running:
+                while pending and free:
+                    config, cores = pending.pop(0), free.pop(0)
+                    # 训练进程需要创建数据加载子进程，因此不能设为守护进程
+                    proc = ctx.Process(target=_train_worker, args=(config, cores, self.data_path, self.device,
+                                                                  self.project, result_queue))
+                    with _thread_environ(len(cores)):
+                        proc.start()
+                    running[config["name"]] = (proc, cores)
+                    print("开始训练 %s，CPU核心：%s" % (config["name"], cores))
+
+                self._collect(result_queue, timeout=1.0)
+                for name, (proc, cores) in list(running.items()):
+                    if proc.is_alive():
+                        continue
+                    proc.join()
+                    self._collect(result_queue, timeout=0.5)  # 取走进程退出前发送的摘要
+                    if name not in self.results:
+                        self.results[name] = {"name": name, "status": "failed", "exitcode": proc.exitcode}
+                    free.append(cores)
+                    del running[name]
+        except KeyboardInterrupt:
+            # 中断时终止所有训练，已保存的 last.pt 会在下次调度时自动续训
+            for name, (proc, _) in running.items():
+                proc.terminate()
+                proc.join()
+                self.results[name] = {"name": name, "status": "interrupted"}
+            raise
+        finally:
+            self.write_summary()
+
+        return [self.results[c["name"]] for c in self.configs if c["name"] in self.results]
+
+    def write_summary(self):
+        """
+        将所有训练的摘要写入 project/train_summary.json。
+        """
+        summary = [self.results[c["name"]] for c in self.configs if c["name"] in self.results]
+        with open(self.summary_path, 'w', encoding='utf-8') as file:
+            json.dump(summary, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import functools
+import os
+import tempfile
+import threading
+import time
+
+import cv2  # 导入OpenCV库，用于编码视频
+import numpy as np
+
+# 可选的导出格式：名称 -> (FourCC, 扩展名)
+CODECS = {
+    "MJPG (.avi)": ("MJPG", ".avi"),
+    "mp4v (.mp4)": ("mp4v", ".mp4"),
+    "H.264 (.mp4)": ("avc1", ".mp4"),
+}
+DEFAULT_CODEC = "MJPG (.avi)"
+
+
+@functools.lru_cache(maxsize=None)
+def codec_available(name):
+    """
+    探测当前的OpenCV能否以该格式写入视频（H.264 需要OpenCV带有相应的编码器，pip版本通常没有）。
+
+    Args:
+        name (str): CODECS 中的格式名称。
+
+    Returns:
+        bool: 能写入时返回 True，结果在进程内缓存。
+    """
+    fourcc, ext = CODECS[name]
+    fd, path = tempfile.mkstemp(suffix=ext)
+    os.close(fd)
+    try:
+        out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), 10, (64, 64))
+        opened = out.isOpened()
+        if opened:
+            out.write(np.zeros((64, 64, 3), dtype=np.uint8))
+        out.release()
+        return opened and os.path.getsize(path) > 0
+    except cv2.error:
+        return False
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def available_codecs():
+    """
+    当前环境可用的导出格式名称列表。
+    """
+    return [name for name in CODECS if codec_available(name)]
+
+
+def output_size(width, height, scale=1.0):
+    """
+    按比例缩放后的输出尺寸，宽高取偶数（H.264 等格式要求）。
+
+    Returns:
+        tuple: (宽, 高)。
+    """
+    return max(2, int(round(width * scale)) // 2 * 2), max(2, int(round(height * scale)) // 2 * 2)
+
+
+class VideoExportJob(threading.Thread):
+    def __init__(self, frames, total, path, codec=DEFAULT_CODEC, scale=1.0, fps=30.0):
+        """
+        在后台线程中将识别画面编码为视频文件。
+
+        Args:
+            frames (iterable): 按顺序产生BGR图像的可迭代对象（如 LogTable.iter_frames 的返回值）。
+            total (int): 画面总数，用于计算进度；只有一帧时保存为PNG图片。
+            path (str): 输出路径，没有扩展名时按格式添加。
+            codec (str): CODECS 中的格式名称。
+            scale (float): 输出尺寸相对于画面尺寸的比例。
+            fps (float): 输出视频的帧率，通常为视频源的实际帧率。
+
+        编码期间页面脚本不会被阻塞，通过 progress、done、error 查询状态；cancel 可以提前结束，
+        失败或取消时删除未写完的文件。
+        """
+        super().__init__(daemon=True)
+        self.fourcc, ext = CODECS[codec]
+        if total == 1:
+            ext = ".png"
+        self.path = path if os.path.splitext(path)[1] else path + ext
+        self.frames = frames
+        self.total = total
+        self.codec = codec
+        self.scale = scale
+        self.fps = fps
+        self.size = None  # 输出尺寸，由第一帧确定
+        self.written = 0  # 已写入的帧数
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    @property
+    def progress(self):
+        """导出进度（0~1）。"""
+        return min(1.0, self.written / self.total) if self.total else 1.0
+
+    @property
+    def done(self):
+        """导出是否已结束（成功、失败或取消）。"""
+        return self.finished_at is not None
+
+    def cancel(self):
+        """请求取消导出。"""
+        self._cancel.set()
+
+    def run(self):
+        self.started_at = time.time()
+        out = None
+        try:
+            for img in self.frames:
+                if self._cancel.is_set():
+                    raise InterruptedError("导出已取消")
+                if self.size is None:
+                    self.size = output_size(img.shape[1], img.shape[0], self.scale)
+                if (img.shape[1], img.shape[0]) != self.size:
+                    img = cv2.resize(img, self.size, interpolation=cv2.INTER_AREA)
+                if self.path.endswith(".png"):
+                    cv2.imwrite(self.path, img)
+                else:
+                    if out is None:
+                        out = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, self.size)
+                        if not out.isOpened():
+                            raise OSError("无法以 %s 格式写入：%s" % (self.codec, self.path))
+                    out.write(img)
+                self.written += 1
+        except (OSError, cv2.error, InterruptedError) as e:
+            self.error = str(e)
+        finally:
+            if out is not None:
+                out.release()
+            if self.error is not None and os.path.exists(self.path):
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+            self.finished_at = time.time()
+
+    def status(self):
+        """
+        单行的状态文本，用于界面显示。
+        """
+        if not self.done:
+            return "正在导出：%d / %d 帧（%s，%.1f fps）" % (self.written, self.total, self.codec, self.fps)
+        if self.error is not None:
+            return "导出失败：" + self.error
+        return "导出完成：%d 帧，用时 %.1f 秒" % (self.written, self.finished_at - self.started_at)
@@ -1,5 +1,10 @@
 # -*- coding: utf-8 -*-
+import functools
+import os
+import time
+
 import cv2  # 导入OpenCV库，用于处理图像和视频
+import numpy as np
 import torch
 from QtFusion.models import Detector, HeatmapGenerator  # 从QtFusion库中导入Detector抽象基类
 from datasets.TrafficSign.label_name import Chinese_name  # 从datasets库中导入Chinese_name字典，用于获取类别的中文名称
@@ -13,53 +18,228 @@ ini_params = {
     'conf': 0.25,  # 物体置信度阈值
     'iou': 0.5,  # 用于非极大值抑制的IOU阈值
     'classes': None,  # 类别过滤器，这里设置为None表示不过滤任何类别
-    'verbose': False
+    'verbose': False,
+    'precision': 'fp32',  # 推理精度，'bf16' 表示在支持的CPU上使用bfloat16自动混合精度
 }
 
+PRECISIONS = ('fp32', 'bf16')  # 支持的推理精度
+
+# 候选框缓存使用的推理参数：低置信度阈值、不做抑制，之后调整阈值时只需在候选框上重新过滤和NMS
+CANDIDATE_CONF = 0.05
+CANDIDATE_IOU = 1.0
+CANDIDATE_MAX_DET = 1000
+MAX_WH = 7680  # 与ultralytics一致，按类别平移边界框以实现分类别NMS
+
+
+def nms(boxes, scores, classes, iou_threshold, max_det=300):
+    """
+    分类别的非极大值抑制（numpy向量化实现）。
+
+    Args:
+        boxes (numpy.ndarray): (N, 4) 边界框 [x1, y1, x2, y2]。
+        scores (numpy.ndarray): (N,) 置信度。
+        classes (numpy.ndarray): (N,) 类别编号，不同类别的框互不抑制。
+        iou_threshold (float): IOU阈值，与已保留的框IOU超过该值的框被抑制。
+        max_det (int): 最多保留的框数。
+
+    Returns:
+        numpy.ndarray: 保留的框的下标，按置信度降序排列。
+    """
+    order = np.argsort(-scores, kind="stable")
+    shifted = boxes[order] + classes[order, None].astype(boxes.dtype) * MAX_WH
+    areas = (shifted[:, 2] - shifted[:, 0]) * (shifted[:, 3] - shifted[:, 1])
+    suppressed = np.zeros(len(order), dtype=bool)
+    keep = []
+    for i in range(len(order)):
+        if suppressed[i]:
+            continue
+        keep.append(order[i])
+        if len(keep) >= max_det:
+            break
+        # 计算当前框与其后所有框的IOU
+        rest = slice(i + 1, None)
+        w = np.clip(np.minimum(shifted[i, 2], shifted[rest, 2]) - np.maximum(shifted[i, 0], shifted[rest, 0]), 0, None)
+        h = np.clip(np.minimum(shifted[i, 3], shifted[rest, 3]) - np.maximum(shifted[i, 1], shifted[rest, 1]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        suppressed[rest] |= iou > iou_threshold
+    return np.asarray(keep, dtype=np.int64)
+
+
+@functools.lru_cache(maxsize=None)
+def bf16_supported():
+    """
+    检查CPU是否支持bfloat16指令（AVX512-BF16 或 AMX-BF16）。
+
+    Returns:
+        bool: 支持时返回 True。
+    """
+    flags = set()
+    try:
+        with open('/proc/cpuinfo', 'r') as file:
+            for line in file:
+                if line.startswith('flags'):
+                    flags = set(line.split(':', 1)[1].split())
+                    break
+    except OSError:
+        try:
+            import cpuinfo  # 非Linux平台使用py-cpuinfo读取CPU特性
+            flags = set(cpuinfo.get_cpu_info().get('flags', []))
+        except Exception:
+            pass
+    return bool(flags & {'avx512_bf16', 'amx_bf16'})
+
+
+def resolve_precision(precision, device, model=None):
+    """
+    根据设备和硬件支持情况确定实际使用的推理精度。
+
+    Args:
+        precision (str): 请求的推理精度，取值见 PRECISIONS。
+        device (torch.device): 推理设备。
+        model: 模型，导出格式（如ONNX）的模型只能使用fp32。
+
+    Returns:
+        str: 实际使用的推理精度，不支持时回退为 'fp32'。
+    """
+    if precision != 'bf16':
+        return 'fp32'
+    if getattr(device, 'type', str(device)) != 'cpu' or not isinstance(model, torch.nn.Module):
+        print("bf16推理仅支持CPU上的PyTorch模型，使用fp32")
+        return 'fp32'
+    if not bf16_supported():
+        print("CPU不支持bfloat16指令，使用fp32")
+        return 'fp32'
+    return 'bf16'
+
+
+def _to_float(output):
+    # 将自动混合精度下的输出转换回fp32，后续的NMS等后处理保持fp32
+    if isinstance(output, torch.Tensor):
+        return output.float() if output.is_floating_point() else output
+    if isinstance(output, (list, tuple)):
+        return type(output)(_to_float(o) for o in output)
+    if isinstance(output, dict):
+        return {k: _to_float(v) for k, v in output.items()}
+    return output
+
+
+def enable_autocast(module, dtype=torch.bfloat16):
+    """
+    让模块的前向计算在CPU自动混合精度下运行，输出转换回fp32。
+
+    Args:
+        module (torch.nn.Module): 模型。
+        dtype (torch.dtype): 自动混合精度使用的数据类型。
+    """
+    forward = module.forward
+
+    def autocast_forward(*args, **kwargs):
+        with torch.autocast(device_type='cpu', dtype=dtype):
+            return _to_float(forward(*args, **kwargs))
+
+    module.forward = autocast_forward
+
+
+def model_key(model_path, precision='fp32'):
+    """
+    模型的标识：权重路径、修改时间和推理精度，同一路径的权重被重新训练覆盖后标识随之变化。
+    """
+    return model_path, os.path.getmtime(model_path) if os.path.exists(model_path) else None, precision
+
 
 def count_classes(det_info, class_names):
     """
     Count the number of each class in the detection info.
 
-    :param det_info: List of detection info, each item is a list like [class_name, bbox, conf, class_id]
+    :param det_info: List of detection info, each item is a dict with a 'class_name' key
     :param class_names: List of all possible class names
     :return: A list with counts of each class
     """
-    count_dict = {name: 0 for name in class_names}  # 创建一个字典，用于存储每个类别的数量
-    for info in det_info:  # 遍历检测信息
-        class_name = info['class_name']  # 获取类别名称
-        if class_name in count_dict:  # 如果类别名称在字典中
-            count_dict[class_name] += 1  # 将该类别的数量加1
-
-    # Convert the dictionary to a list in the same order as class_names
-    count_list = [count_dict[name] for name in class_names]  # 将字典转换为列表，列表的顺序与class_names相同
-    return count_list  # 返回列表
+    name_to_id = {name: i for i, name in enumerate(class_names)}  # 类别名称到下标的映射
+    ids = np.fromiter((name_to_id.get(info['class_name'], -1) for info in det_info),
+                      dtype=np.int64, count=len(det_info))
+    # 使用bincount一次性统计各类别数量，结果顺序与class_names相同
+    return np.bincount(ids[ids >= 0], minlength=len(class_names)).tolist()
 
 
 class YOLOv8v5Detector(Detector):  # 定义YOLOv8Detector类，继承自Detector类
     def __init__(self, params=None):  # 定义构造函数
         super().__init__(params)  # 调用父类的构造函数
         self.model = None
-        self.img = None  # 初始化图像为None
+        self.model_key = None  # 已加载模型的路径、修改时间和推理精度
+        self.precision = 'fp32'  # 实际使用的推理精度
+        self._candidates = None  # 当前图像的候选框缓存
         self.names = list(Chinese_name.values())  # 获取所有类别的中文名称
-        self.params = params if params else ini_params  # 如果提供了参数则使用提供的参数，否则使用默认参数
+        # 每个实例持有自己的参数副本，set_param 不会修改模块级的 ini_params 或其他实例的参数
+        self.params = dict(params if params else ini_params)
 
     def load_model(self, model_path):  # 定义加载模型的方法
+        key = model_key(model_path, self.params.get('precision', 'fp32'))
+        if self.model is not None and key == self.model_key:
+            return  # 同一个模型文件已经加载，页面重新运行时不重复加载和预热
         self.device = select_device(self.params['device'])  # 选择设备
         self.model = YOLO(model_path, )
+        self.model_key = key
+        self._candidates = None
+        # 确定实际的推理精度，bf16时前向计算在自动混合精度下运行，预热也使用相同精度
+        self.precision = resolve_precision(self.params.get('precision', 'fp32'), self.device, self.model.model)
+        if self.precision == 'bf16':
+            enable_autocast(self.model.model)
         names_dict = self.model.names  # 获取类别名称字典
         self.names = [Chinese_name[v] if v in Chinese_name else v for v in names_dict.values()]  # 将类别名称转换为中文
-        self.model(torch.zeros(1, 3, *[self.imgsz] * 2).to(self.device).
-                   type_as(next(self.model.model.parameters())))  # 预热
-        
-    def preprocess(self, img):  # 定义预处理方法
-        self.img = img  # 保存原始图像
+        if isinstance(self.model.model, torch.nn.Module):
+            self.model(torch.zeros(1, 3, *[self.imgsz] * 2).to(self.device).
+                       type_as(next(self.model.model.parameters())))  # 预热
+        else:
+            # 导出格式（如ONNX）的模型没有PyTorch参数，使用空白图像预热
+            self.model(np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8), verbose=False)
+
+    def preprocess(self, img):  # 定义预处理方法，不保存图像，多线程调用时没有共享状态
         return img  # 返回处理后的图像
 
-    def predict(self, img):  # 定义预测方法
-        results = self.model(img, **ini_params)
+    def predict(self, img, **kwargs):  # 定义预测方法，img可以是单张图像或图像列表（批量推理）
+        params = dict(self.params, **kwargs)  # 调用时传入的参数（如imgsz）优先
+        params.pop('precision', None)  # 推理精度在加载模型时生效，不是ultralytics的参数
+        # ultralytics 会把传入的参数合并进 predictor 并保留到之后的调用，每次都显式传入 max_det，
+        # 否则 predict_cached 使用过 CANDIDATE_MAX_DET 后，之后的普通推理也会保留最多1000个框
+        params.setdefault('max_det', 300)
+        results = self.model(img, **params)
         return results
 
+    def predict_cached(self, img, key, conf=None, iou=None):
+        """
+        对同一张图像反复调整阈值时，复用缓存的候选框而不重新推理。
+
+        Args:
+            img (numpy.ndarray): 输入图像。
+            key: 图像的标识（如上传文件的ID），相同的标识视为同一张图像。
+            conf (float): 置信度阈值，默认使用 self.params 中的值。
+            iou (float): IOU阈值，默认使用 self.params 中的值。
+
+        Returns:
+            list: 与 predict 相同格式的结果列表。
+
+        首次调用时以 CANDIDATE_CONF 为阈值、不做抑制地推理并缓存候选框；之后只在候选框上按新的阈值
+        重新过滤并运行NMS。图像、模型或类别过滤改变，或置信度阈值低于 CANDIDATE_CONF 时重新推理。
+        """
+        conf = self.params['conf'] if conf is None else conf
+        iou = self.params['iou'] if iou is None else iou
+        if conf < CANDIDATE_CONF:
+            return self.predict(img, conf=conf, iou=iou)  # 候选框中没有更低置信度的框，只能重新推理
+
+        cache_key = (key, self.model_key, str(self.params.get('classes')))
+        if self._candidates is None or self._candidates[0] != cache_key:
+            res = self.predict(img, conf=CANDIDATE_CONF, iou=CANDIDATE_IOU, max_det=CANDIDATE_MAX_DET)[0]
+            boxes = res.boxes
+            self._candidates = (cache_key, res, boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(),
+                                boxes.cls.cpu().numpy().astype(np.int64))
+
+        _, res, xyxy, scores, classes = self._candidates
+        index = np.flatnonzero(scores > conf)  # 与ultralytics一致，置信度严格大于阈值
+        keep = index[nms(xyxy[index], scores[index], classes[index], iou, self.params.get('max_det', 300))]
+        return [res[torch.as_tensor(keep)]]
+
     def postprocess(self, pred):  # 定义后处理方法
         results = []  # 初始化结果列表
         for res in pred[0].boxes:
@@ -81,3 +261,111 @@ class YOLOv8v5Detector(Detector):  # 定义YOLOv8Detector类，继承自Detector
 
     def set_param(self, params):
         self.params.update(params)
+
+
+class CascadeDetector(YOLOv8v5Detector):  # 级联检测器，接口与YOLOv8v5Detector相同
+    def __init__(self, params=None, band=(0.15, 0.5), heavy_imgsz=None, hard_fn=None):
+        """
+        级联推理：每帧先用轻量模型检测，只有结果不确定或帧被标记为困难时才用较大的模型复检。
+
+        Args:
+            params (dict): 推理参数，与 YOLOv8v5Detector 相同。
+            band (tuple): 不确定的置信度区间 [low, high)，轻量模型有检测框落在该区间时复检。
+            heavy_imgsz (int): 复检时使用的输入尺寸，None 表示使用默认尺寸。
+            hard_fn (callable): hard_fn(image, result) 返回 True 时该帧视为困难帧并复检。
+
+        没有加载复检模型时与 YOLOv8v5Detector 完全相同。复检帧的结果整体替换为复检模型的结果，
+        返回值仍是ultralytics的Results列表，postprocess 格式不变。
+        """
+        super().__init__(params)
+        self.heavy = None  # 复检模型
+        self.band = band
+        self.heavy_imgsz = heavy_imgsz
+        self.hard_fn = hard_fn
+        self.frames = 0  # 已处理的帧数
+        self.escalated = 0  # 复检的帧数
+        self.total_time = 0.0  # 累计推理用时
+
+    def load_heavy_model(self, model_path=None, imgsz=None):
+        """
+        加载复检模型。
+
+        Args:
+            model_path (str): 复检模型的权重路径，None 表示使用轻量模型本身（通常配合更大的 imgsz）。
+            imgsz (int): 复检时使用的输入尺寸。
+        """
+        if model_path is None:
+            self.heavy = self
+        else:
+            if self.heavy is None or self.heavy is self:
+                self.heavy = YOLOv8v5Detector(dict(self.params))
+            self.heavy.load_model(model_path)
+            if list(self.heavy.model.names.values()) != list(self.model.names.values()):
+                self.heavy = None
+                raise ValueError("复检模型与轻量模型的类别不一致")
+        self.heavy_imgsz = imgsz
+        self.reset_stats()
+
+    def set_param(self, params):
+        # 复检模型持有加载时的参数副本，阈值变化时一并更新
+        super().set_param(params)
+        if self.heavy is not None and self.heavy is not self:
+            self.heavy.set_param(params)
+
+    def predict(self, img, hard=False, **kwargs):
+        """
+        级联推理。
+
+        Args:
+            img (numpy.ndarray|list): 单张图像或图像列表。
+            hard (bool): 是否将本次的所有帧标记为困难帧（直接复检）。
+            **kwargs: 本次推理的参数（如 conf、iou、imgsz）。
+
+        Returns:
+            list: 每张图像一个Results，与 YOLOv8v5Detector.predict 相同。
+        """
+        if self.heavy is None:
+            return super().predict(img, **kwargs)
+
+        t1 = time.time()
+        images = img if isinstance(img, list) else [img]
+        conf = kwargs.get('conf', self.params['conf'])
+        # 轻量模型使用较低的阈值，使置信度区间内但低于阈值的框也能触发复检
+        fast = super().predict(images, **dict(kwargs, conf=min(conf, self.band[0])))
+
+        results, escalate = [], []
+        for i, res in enumerate(fast):
+            scores = res.boxes.conf.cpu().numpy()
+            uncertain = bool(np.any((scores >= self.band[0]) & (scores < self.band[1])))
+            if hard or uncertain or (self.hard_fn is not None and self.hard_fn(images[i], res)):
+                escalate.append(i)
+            results.append(res[torch.as_tensor(np.flatnonzero(scores > conf))])  # 恢复原来的置信度阈值
+
+        if escalate:
+            heavy_kwargs = dict(kwargs, imgsz=self.heavy_imgsz) if self.heavy_imgsz else kwargs
+            heavy_pred = YOLOv8v5Detector.predict(self.heavy, [images[i] for i in escalate], **heavy_kwargs)
+            for i, res in zip(escalate, heavy_pred):
+                results[i] = res
+
+        self.frames += len(images)
+        self.escalated += len(escalate)
+        self.total_time += time.time() - t1
+        return results
+
+    def stats(self):
+        """
+        级联推理的统计。
+
+        Returns:
+            dict: 处理帧数、复检帧数、复检比例和平均每帧用时（毫秒）。
+        """
+        return {
+            "frames": self.frames,
+            "escalated": self.escalated,
+            "escalation_rate": self.escalated / self.frames if self.frames else 0.0,
+            "ms_per_frame": self.total_time / self.frames * 1000 if self.frames else 0.0,
+        }
+
+    def reset_stats(self):
+        """清零统计。"""
+        self.frames, self.escalated, self.total_time = 0, 0, 0.0
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import os
+import sys
+
+from QtFusion.path import abs_path
+
+from ModelBenchmark import evaluate_cascade
+from YOLOv8v5Model import CascadeDetector
+
+if __name__ == '__main__':  # 确保该模块被直接运行时才执行以下代码
+    # 在验证集上检查级联推理：模糊目标的召回率不应低于单独使用复检模型，同时平均每帧用时应下降
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--light", default=abs_path("weights/traffic-yolov8n.pt", path_type="current"))
+    parser.add_argument("--heavy", default=None, help="复检模型权重，默认使用轻量模型本身配合 --heavy-imgsz")
+    parser.add_argument("--heavy-imgsz", type=int, default=None)
+    parser.add_argument("--max-images", type=int, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.01, help="模糊目标召回率允许的下降幅度")
+    args = parser.parse_args()
+
+    data_name = "TrafficSign"
+    data_path = abs_path(f'datasets/{data_name}/{data_name}.yaml', path_type='current')  # 数据集的yaml的绝对路径
+
+    cascade = CascadeDetector()
+    cascade.load_model(args.light)
+    heavy_imgsz = args.heavy_imgsz or (None if args.heavy else 960)  # 同一模型复检时使用更大的输入尺寸
+    cascade.load_heavy_model(args.heavy, imgsz=heavy_imgsz)
+
+    report = evaluate_cascade(cascade, data_path, max_images=args.max_images)
+    out_dir = abs_path("runs/compare", path_type="current")
+    os.makedirs(out_dir, exist_ok=True)
+    report_path = os.path.join(out_dir, "cascade_check.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print("%d 张图像，%d 个目标，其中模糊目标 %d 个，复检比例 %.1f%%" %
+          (report["images"], report["objects"], report["ambiguous"], report["escalation_rate"] * 100))
+    for name in ("light", "heavy", "cascade"):
+        r = report[name]
+        print("%-8s 召回率 %s，模糊目标召回率 %s，精确率 %s，每帧 %s ms" %
+              (name, r["recall"], r["ambiguous_recall"], r["precision"], r["ms_per_frame"]))
+    print("检查报告已保存：" + report_path)
+
+    heavy, combined = report["heavy"], report["cascade"]
+    if heavy["ambiguous_recall"] is not None and \
+            combined["ambiguous_recall"] < heavy["ambiguous_recall"] - args.tolerance:
+        print("未通过：级联推理的模糊目标召回率低于复检模型")
+        sys.exit(1)
+    sys.exit(0)
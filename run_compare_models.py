@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import os
+
+from QtFusion.path import abs_path
+
+from ModelBenchmark import ModelBenchmark
+
+if __name__ == '__main__':  # 确保该模块被直接运行时才执行以下代码
+    data_name = "TrafficSign"
+    data_path = abs_path(f'datasets/{data_name}/{data_name}.yaml', path_type='current')  # 数据集的yaml的绝对路径
+
+    # 待比较的模型权重：项目自带的权重以及 run_train_model.py 训练得到的两组最优权重
+    candidates = [
+        abs_path("weights/traffic-yolov8n.pt", path_type="current"),
+        abs_path(f"runs/detect/train_v8_{data_name}/weights/best.pt", path_type="current"),
+        abs_path(f"runs/detect/train_v5_{data_name}/weights/best.pt", path_type="current"),
+    ]
+    weights = [w for w in candidates if os.path.exists(w)]
+
+    benchmark = ModelBenchmark(
+        weights,
+        data_path,
+        imgsz_list=(320, 480, 640),  # 测试的输入尺寸
+        batch_sizes=(1, 4),  # 测试的批大小
+        backends=("pytorch", "onnx"),  # 测试的推理后端
+        precisions=("fp32", "bf16"),  # 测试的推理精度，CPU不支持bf16时自动跳过
+        device="cpu",
+    )
+    benchmark.run()
+    json_path, chart_path = benchmark.save_report(abs_path("runs/compare", path_type="current"))
+    print("比较报告已保存：" + json_path)
+    print("精度-延迟图已保存：" + chart_path)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sys
+
+from QtFusion.path import abs_path
+
+from RegressionReplay import compare, load_golden, replay, save_golden
+from YOLOv8v5Model import YOLOv8v5Detector
+
+if __name__ == '__main__':  # 确保该模块被直接运行时才执行以下代码
+    # 用法：python run_regression_replay.py [--update]
+    # 带 --update 时重新生成基准（生成后需提交到仓库），否则与仓库中的基准比较，未通过时以非零状态退出
+    video_path = abs_path("video_2024-03-07-22-04-37.MP4", path_type="current")  # 项目自带的测试视频
+    model_path = abs_path("weights/traffic-yolov8n.pt", path_type="current")
+    golden_dir = abs_path("golden/video_2024-03-07-22-04-37", path_type="current")  # 纳入版本控制的基准
+    report_dir = abs_path("runs/golden/video_2024-03-07-22-04-37", path_type="current")
+    update = "--update" in sys.argv[1:]
+
+    # 基准不存在时直接失败，不以当前代码的输出作为基准，否则回归检查总是通过
+    if not update and not os.path.exists(os.path.join(golden_dir, "profile.json")):
+        print("基准不存在：%s，请使用 --update 生成并提交到仓库" % golden_dir)
+        sys.exit(2)
+
+    model = YOLOv8v5Detector()  # 使用默认参数，与网页端一致
+    model.load_model(model_path)
+    store, profile = replay(model, video_path)
+    print("已重放 %d 帧，检测到 %d 个目标，每帧中位用时 %.2f ms" %
+          (profile["frames"], len(store), profile["stages"]["total"]["p50_ms"]))
+
+    if update or not os.path.exists(os.path.join(golden_dir, "profile.json")):
+        save_golden(store, profile, golden_dir, model.names)
+        print("基准已保存：" + golden_dir)
+        sys.exit(0)
+
+    golden, golden_profile = load_golden(golden_dir)
+    report = compare(golden, golden_profile, store, profile)
+    golden.close()
+    os.makedirs(report_dir, exist_ok=True)
+    report_path = os.path.join(report_dir, "last_report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    acc = report["accuracy"]
+    print("召回率 %.4f，精确率 %.4f，平均IoU %.4f，置信度最大变化 %.4f，存在差异的帧 %d" %
+          (acc["recall"], acc["precision"], acc["mean_iou"], acc["max_score_delta"], acc["frames_with_diff"]))
+    for stage, t in report["timing"].items():
+        print("%-12s %8.2f ms -> %8.2f ms  (x%.2f)" % (stage, t["golden_p50_ms"], t["p50_ms"], t["speedup"]))
+    for warning in report["warnings"]:
+        print("警告：" + warning)
+    for failure in report["failures"]:
+        print("未通过：" + failure)
+    print("比较报告已保存：" + report_path)
+    sys.exit(0 if report["passed"] else 1)
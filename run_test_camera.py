@@ -9,6 +9,7 @@ from QtFusion.utils import drawRectBox, get_cls_color  # 从QtFusion库导入dra
 from PySide6 import QtWidgets, QtCore  # 导入PySide6库的QtWidgets和QtCore模块，用于创建GUI
 from QtFusion.path import abs_path
 from QtFusion.config import QF_Config
+from InferenceEngine import InferenceEngine  # 在独立线程中推理，只处理最新的帧
 from YOLOv8v5Model import YOLOv8v5Detector  # 从YOLOv8Model模块导入YOLOv8Detector类，用于物体检测
 
 QF_Config.set_verbose(False)
@@ -26,7 +27,7 @@ class MainWindow(QMainWindow):  # 定义MainWindow类，继承自FBaseWindow类
             self.close()  # 关闭窗口
 
 
-def frame_process(image):  # 定义frame_process函数，用于处理每一帧图像
+def frame_process(image):  # 定义frame_process函数，用于处理每一帧图像（在推理线程中运行）
     image = cv2.resize(image, (850, 500))  # 调整图像的大小
     pre_img = model.preprocess(image)  # 对图像进行预处理
 
@@ -47,7 +48,13 @@ def frame_process(image):  # 定义frame_process函数，用于处理每一帧
             # 画出检测到的目标物
             image = drawRectBox(image, bbox, alpha=0.2, addText=label, color=colors[cls_id])  # 在图像上绘制矩形框，并添加标签和颜色
 
-    window.dispImage(window.label, image)  # 在窗口的label控件上显示图像
+    return image  # 返回绘制结果的图像，由GUI线程显示
+
+
+def show_result(image):  # 在GUI线程中显示推理线程返回的结果
+    window.dispImage(window.label, image)
+    if engine.scheduler.processed % 30 == 0:
+        print(engine.scheduler.summary())  # 定期打印丢帧和端到端延迟统计
 
 
 cls_name = ["限速40", "限速50", "限速60", "限速70",
@@ -60,9 +67,12 @@ colors = get_cls_color(model.names)  # 获取类别颜色
 
 app = QtWidgets.QApplication(sys.argv)  # 创建QApplication对象
 window = MainWindow()  # 创建MainWindow对象
+engine = InferenceEngine(frame_process, deadline_ms=100)  # 推理线程，帧从采集到开始推理的截止时间为100毫秒
+engine.resultReady.connect(show_result)  # 推理结果回到GUI线程显示
+app.aboutToQuit.connect(engine.stop)  # 退出时停止推理线程
 
 videoHandler = MediaHandler(fps=30)  # 创建MediaHandler对象，设置帧率为30
-videoHandler.frameReady.connect(frame_process)  # 当有新的帧准备好时，调用frame_process函数
+videoHandler.frameReady.connect(engine.submit)  # 新帧放入推理线程的邮箱，GUI线程不等待推理
 videoHandler.setDevice(device=0)  # 设置设备为0，即默认的摄像头
 videoHandler.startMedia()  # 开始处理媒体流
 
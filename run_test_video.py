@@ -9,6 +9,7 @@ from QtFusion.handlers import MediaHandler  # 从QtFusion库中导入MediaHandle
 from QtFusion.utils import drawRectBox  # 从QtFusion库中导入drawRectBox函数，用于在图像上绘制矩形框
 from QtFusion.utils import get_cls_color  # 从QtFusion库中导入get_cls_color函数，用于获取类别颜色
 from PySide6 import QtWidgets, QtCore  # 导入PySide6库的QtWidgets和QtCore模块，用于创建GUI和处理Qt的核心功能
+from InferenceEngine import InferenceEngine  # 在独立线程中推理，只处理最新的帧
 from YOLOv8v5Model import YOLOv8v5Detector  # 从YOLOv8Model模块中导入YOLOv8Detector类，用于进行YOLOv8物体检测
 QF_Config.set_verbose(False)
 
@@ -25,7 +26,7 @@ class MainWindow(QMainWindow):  # 定义MainWindow类，继承自FBaseWindow类
             self.close()  # 关闭窗口
 
 
-def frame_process(image):  # 定义帧处理函数，用于处理每一帧图像
+def frame_process(image):  # 定义帧处理函数，用于处理每一帧图像（在推理线程中运行）
     image = cv2.resize(image, (850, 500))  # 将图像的大小调整为850x500
     pre_img = model.preprocess(image)  # 对图像进行预处理
 
@@ -46,7 +47,13 @@ def frame_process(image):  # 定义帧处理函数，用于处理每一帧图像
             # 画出检测到的目标物
             image = drawRectBox(image, bbox, alpha=0.2, addText=label, color=colors[cls_id])  # 在图像上绘制边界框和标签
 
-    window.dispImage(window.label, image)  # 在窗口的label上显示图像
+    return image  # 返回绘制结果的图像，由GUI线程显示
+
+
+def show_result(image):  # 在GUI线程中显示推理线程返回的结果
+    window.dispImage(window.label, image)
+    if engine.scheduler.processed % 30 == 0:
+        print(engine.scheduler.summary())  # 定期打印丢帧和端到端延迟统计
 
 
 cls_name = ["限速40", "限速50", "限速60", "限速70",
@@ -59,10 +66,13 @@ colors = get_cls_color(model.names)  # 获取类别颜色
 
 app = QtWidgets.QApplication(sys.argv)  # 创建QApplication对象
 window = MainWindow()  # 创建MainWindow对象
+engine = InferenceEngine(frame_process, deadline_ms=100)  # 推理线程，帧从采集到开始推理的截止时间为100毫秒
+engine.resultReady.connect(show_result)  # 推理结果回到GUI线程显示
+app.aboutToQuit.connect(engine.stop)  # 退出时停止推理线程
 
 filename = abs_path("test_media/交通标志.mp4", path_type="current")  # 定义视频文件的路径
 videoHandler = MediaHandler(fps=30)  # 创建MediaHandler对象，设置帧率为30fps
-videoHandler.frameReady.connect(frame_process)  # 当有新的帧准备好时，调用frame_process函数进行处理
+videoHandler.frameReady.connect(engine.submit)  # 新帧放入推理线程的邮箱，GUI线程不等待推理
 videoHandler.setDevice(filename)  # 设置视频源
 videoHandler.startMedia()  # 开始处理媒体
 
@@ -1,13 +1,15 @@
 import os
+import sys
 
 import torch
 import yaml
-from ultralytics import YOLO  # 导入YOLO模型
 from QtFusion.path import abs_path
+
+from DatasetCache import DatasetCache
+from TrainScheduler import TrainScheduler, load_configs
 device = "0" if torch.cuda.is_available() else "cpu"
 
 if __name__ == '__main__':  # 确保该模块被直接运行时才执行以下代码
-    workers = 1
     batch = 8
 
     data_name = "TrafficSign"
@@ -26,26 +28,35 @@ if __name__ == '__main__':  # 确保该模块被直接运行时才执行以下
         with open(data_path, 'w') as file:
             yaml.safe_dump(data, file, sort_keys=False)
 
-    model = YOLO(abs_path('./weights/yolov8n.pt'), task='detect')  # 加载预训练的YOLOv8模型
-    results2 = model.train(  # 开始训练模型
-        data=data_path,  # 指定训练数据的配置文件路径
-        device=device,  # 自动选择进行训练
-        workers=workers,  # 指定使用2个工作进程加载数据
-        imgsz=640,  # 指定输入图像的大小为640x640
-        epochs=120,  # 指定训练100个epoch
-        batch=batch,  # 指定每个批次的大小为8
-        name='train_v8_' + data_name  # 指定训练任务的名称
-    )
-
-    model = YOLO(abs_path('./weights/yolov5nu.pt', path_type='current'), task='detect')  # 加载预训练的YOLOv8模型
-    # model = YOLO('./weights/yolov5.yaml', task='detect').load('./weights/yolov5nu.pt')  # 加载预训练的YOLOv8模型
-    # Training.
-    results = model.train(  # 开始训练模型
-        data=data_path,  # 指定训练数据的配置文件路径
-        device=device,  # 自动选择进行训练
-        workers=workers,  # 指定使用2个工作进程加载数据
-        imgsz=640,  # 指定输入图像的大小为640x640
-        epochs=120,  # 指定训练100个epoch
-        batch=batch,  # 指定每个批次的大小为8
-        name='train_v5_' + data_name  # 指定训练任务的名称
-    )
+    if len(sys.argv) > 1:
+        # 可以通过YAML/JSON文件传入训练配置列表
+        configs = load_configs(sys.argv[1])
+    else:
+        configs = [
+            {
+                'name': 'train_v8_' + data_name,  # 指定训练任务的名称
+                'model': abs_path('./weights/yolov8n.pt', path_type='current'),  # 加载预训练的YOLOv8模型
+                'imgsz': 640,  # 指定输入图像的大小为640x640
+                'epochs': 120,  # 指定训练120个epoch
+                'batch': batch,  # 指定每个批次的大小为8
+                'dataset_cache': True,  # 读取预先解码并letterbox的数据集缓存
+            },
+            {
+                'name': 'train_v5_' + data_name,
+                'model': abs_path('./weights/yolov5nu.pt', path_type='current'),  # 加载预训练的YOLOv5模型
+                'imgsz': 640,
+                'epochs': 120,
+                'batch': batch,
+                'dataset_cache': True,
+            },
+        ]
+
+    # 在并发训练开始前统一准备数据集缓存，每个imgsz只解码一次，数据未变化时直接复用
+    for imgsz in sorted({config.get('imgsz', 640) for config in configs if config.get('dataset_cache')}):
+        DatasetCache(data_path, imgsz).prepare_all()
+
+    # 所有训练同时进行，每个训练分得一部分CPU核心和数据加载进程，中断后再次运行会从 last.pt 继续
+    scheduler = TrainScheduler(configs, data_path, device, project=abs_path('runs/detect', path_type='current'))
+    for summary in scheduler.run():
+        print(summary)
+    print("训练汇总已保存：" + scheduler.summary_path)
@@ -1,11 +1,12 @@
 import os
 
-import cv2
 import pandas as pd
 import streamlit as st
 from PIL import Image
 from QtFusion.path import abs_path
 
+from CameraDiscovery import camera_discovery
+
 
 def save_uploaded_file(uploaded_file):
     """
@@ -77,16 +78,11 @@ def get_camera_names():
     获取可用摄像头名称列表。
 
     Returns:
-        list: 返回包含“未启用摄像头”和可用摄像头索引号的列表。
+        list: 返回包含“未启用摄像头”和可用摄像头索引号（以及配置的视频流）的列表。
+
+    设备探测在后台并行完成并缓存（见 CameraDiscovery），本函数立即返回最近一次的结果。
     """
-    camera_names = ["未启用摄像头", "0"]
-    max_test_cameras = 3  # 定义要测试的最大摄像头数量，可以根据需要调整
-
-    for i in range(max_test_cameras):
-        cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
-        if cap.isOpened() and str(i) not in camera_names:
-            camera_names.append(str(i))
-            cap.release()
+    camera_names = ["未启用摄像头"] + camera_discovery().get()
     if len(camera_names) == 1:
         st.write("未找到可用的摄像头")
     return camera_names